@@ -1,23 +1,83 @@
+import contextvars
+import logging
 import uuid
-from typing import Any
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Any
+from datetime import datetime, timedelta
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from google.cloud import firestore
 
 from app.utils.auth import CurrentUser, SessionDep
+from app.utils.assignments import (
+    ASSIGNMENT_DATE_FORMAT,
+    add_to_index,
+    assignment_index,
+    assignments_on,
+    canonical_date,
+    find_assignment,
+    index_updates,
+    parse_assignment_date,
+    remove_from_index,
+)
+from app.utils.documents import WRITE_BATCH_SIZE, get_documents
+from app.utils.exercise_refs import write_activity
+from app.utils.exercise_summaries import (
+    SUMMARIES_FIELD,
+    day_exercises,
+    exercise_summary,
+    summaries_for,
+    summary_field,
+)
+from app.utils.progress import performance_written
+from app.utils.query_cache import cached_query, viewer_role
+from app.utils.user_stats import (
+    STATS_COLLECTION,
+    apply_changes,
+    build_stats,
+    performance_changes,
+    is_complete,
+    mirror_updates,
+    performance_snapshot,
+    read_stats,
+)
+from app.utils.schedules import (
+    cancel_update,
+    merge_day,
+    occurrence_count,
+    schedule_field,
+    scheduled_occurrence,
+    scheduled_on,
+    schedules_of,
+)
 from app.models.activity import (
     Activity,
     ActivityCreate,
     ActivityPublic,
     ActivitiesPublic,
     ActivityUpdate,
+    ActivityCalendar,
+    BulkAssignRequest,
+    BulkAssignResult,
+    Recurrence,
+    ScheduleCreate,
+    SchedulePublic,
+    SchedulesPublic,
 )
 from app.config import settings
 from app.models.message import Message
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["activities"])
 
+CALENDAR_MAX_DAYS = 366
+BULK_ASSIGN_MAX_DATES = 366
+BULK_ASSIGN_WORKERS = 4
+SCHEDULE_MAX_DAYS = 731
+
+
 @router.get("/", response_model=ActivitiesPublic)
 def read_activities(
     session: SessionDep, current_user: CurrentUser, user_id: str = None, skip: int = 0, limit: int = 100
@@ -26,8 +86,8 @@ def read_activities(
     Retrieve activities.
     If user_id is provided as a query param, filter activities for that user.
     Otherwise, get activities based on current user permissions.
+    Pages are cached until the next activity write.
     """
-    print(f"Retrieving activities for user_id: {user_id}")
     if not session:
         raise HTTPException(status_code=500, detail="Database not available")
     activities_ref = session.collection("activities")
@@ -39,25 +99,30 @@ def read_activities(
             or user_id == str(current_user.id)
         ):
             raise HTTPException(status_code=403, detail="Not enough privileges")
-        query = activities_ref.where("user_id", "==", user_id).offset(skip).limit(limit)
-        activities_docs = list(query.stream())
-        user_activities = list(activities_ref.where("user_id", "==", user_id).stream())
-        count = len(user_activities)
-    elif current_user.is_superuser:
-        query = activities_ref.offset(skip).limit(limit)
-        activities_docs = list(query.stream())
-        all_activities = list(activities_ref.stream())
-        count = len(all_activities)
-    else:
-        query = activities_ref.where("user_id", "==", str(current_user.id)).offset(skip).limit(limit)
-        activities_docs = list(query.stream())
-        user_activities = list(activities_ref.where("user_id", "==", str(current_user.id)).stream())
-        count = len(user_activities)
-    activities = []
-    for doc in activities_docs:
-        activity_data = doc.to_dict()
-        activity_data["id"] = doc.id
-        activities.append(ActivityPublic(**activity_data))
+    elif not current_user.is_superuser:
+        user_id = str(current_user.id)
+
+    def run() -> tuple[list[ActivityPublic], int]:
+        if user_id:
+            query = activities_ref.where("user_id", "==", user_id).offset(skip).limit(limit)
+            activities_docs = list(query.stream())
+            user_activities = list(activities_ref.where("user_id", "==", user_id).stream())
+            count = len(user_activities)
+        else:
+            query = activities_ref.offset(skip).limit(limit)
+            activities_docs = list(query.stream())
+            all_activities = list(activities_ref.stream())
+            count = len(all_activities)
+        activities = []
+        for doc in activities_docs:
+            activity_data = doc.to_dict()
+            activity_data["id"] = doc.id
+            activities.append(ActivityPublic(**activity_data))
+        return activities, count
+
+    activities, count = cached_query(
+        session, "activities", (user_id, skip, limit, viewer_role(current_user)), run
+    )
     return ActivitiesPublic(data=activities, count=count)
 
 
@@ -93,8 +158,6 @@ def create_activity(
     """
     Create new activity.
     """
-    print(f"Creating activity with data: {activity_in}")
-    
     if not db_client:
         raise HTTPException(status_code=500, detail="Database not available")
     
@@ -109,10 +172,12 @@ def create_activity(
         activity_data["exercises"] = [str(eid) for eid in activity_data["exercises"]]
     else:
         activity_data["exercises"] = []
+    activity_data[SUMMARIES_FIELD] = summaries_for(db_client, activity_data["exercises"])
    
     # Add to Firestore
     activities_ref = db_client.collection("activities")
-    doc_ref = activities_ref.add(activity_data)[1]  # add() returns (timestamp, doc_ref)
+    doc_ref = activities_ref.document()
+    write_activity(db_client, doc_ref, data=activity_data)
     
     # Get the created document
     created_doc = doc_ref.get()
@@ -201,7 +266,11 @@ def update_activity(
     # Ensure exercises is a list of strings (exercise document IDs)
     if "exercises" in update_dict and update_dict["exercises"] is not None:
         update_dict["exercises"] = [str(eid) for eid in update_dict["exercises"]]
-    doc_ref.update(update_dict)
+        # Summaries of kept exercises are reused, new ones are fetched
+        update_dict[SUMMARIES_FIELD] = summaries_for(
+            session, update_dict["exercises"], activity_data.get(SUMMARIES_FIELD)
+        )
+    write_activity(session, doc_ref, update=update_dict)
     
     # Get updated document
     updated_doc = doc_ref.get()
@@ -244,7 +313,7 @@ def delete_activity(
     _update_user_exercises_on_activity_delete(session, activity.user_id, exercise_ids)
     
     # Delete the document
-    doc_ref.delete()
+    write_activity(session, doc_ref, delete=True)
     
     return Message(message="Activity deleted successfully")
 
@@ -329,7 +398,10 @@ def add_exercise_to_activity(
     current_exercises = activity_data.get("exercises", [])
     if exercise_id not in current_exercises:
         current_exercises.append(exercise_id)
-        doc_ref.update({"exercises": current_exercises})
+        write_activity(session, doc_ref, update={
+            "exercises": current_exercises,
+            summary_field(exercise_id): exercise_summary(exercise_doc.to_dict()),
+        })
         
         # Add exercise to user's exercises field
         _update_user_exercises_on_activity_create(session, activity.user_id, [exercise_id])
@@ -375,7 +447,10 @@ def remove_exercise_from_activity(
     current_exercises = activity_data.get("exercises", [])
     if exercise_id in current_exercises:
         current_exercises.remove(exercise_id)
-        doc_ref.update({"exercises": current_exercises})
+        write_activity(
+            session, doc_ref,
+            update={"exercises": current_exercises, summary_field(exercise_id): firestore.DELETE_FIELD},
+        )
         
         # Remove exercise from user's exercises field (only if no performance data)
         _update_user_exercises_on_activity_delete(session, activity.user_id, [exercise_id])
@@ -421,32 +496,43 @@ def assign_activity_to_user(
         raise HTTPException(status_code=404, detail="User not found")
     
     user_data = user_doc.to_dict()
-    current_activities = user_data.get("activities", [])
+    index = assignment_index(user_data)
     current_exercises = user_data.get("exercises", [])
     
     # Check if activity is already assigned for this date
-    for existing_activity in current_activities:
-        if (isinstance(existing_activity, dict) and 
-            existing_activity.get("id") == activity_id and 
-            existing_activity.get("date") == date):
-            raise HTTPException(status_code=400, detail="Activity already assigned for this date")
+    if find_assignment(index, date, activity_id):
+        raise HTTPException(status_code=400, detail="Activity already assigned for this date")
+    stats_ref, stats = read_stats(session, str(current_user.id), user_data)
     
     # Add new activity assignment
     new_activity_assignment = {
         "id": activity_id,
         "date": date
     }
-    current_activities.append(new_activity_assignment)
+    add_to_index(index, new_activity_assignment)
     
     # Update user's exercises with performance tracking
     activity_exercise_ids = activity_data.get("exercises", [])
+    before = performance_snapshot(current_exercises, activity_exercise_ids, [date])
     updated_exercises = _update_user_exercises_with_performance(current_exercises, activity_exercise_ids, date)
     
-    # Update user document with both activities and exercises
-    user_doc_ref.update({
-        "activities": current_activities,
-        "exercises": updated_exercises
+    apply_changes(
+        stats,
+        performance_changes(before, updated_exercises, activity_exercise_ids, [date]),
+        updated_exercises,
+        assigned=[new_activity_assignment],
+    )
+    
+    # Update user document with both activities and exercises, and its stats
+    batch = session.batch()
+    batch.update(user_doc_ref, {
+        "activities": firestore.ArrayUnion([new_activity_assignment]),
+        "exercises": updated_exercises,
+        **performance_written(),
+        **index_updates(user_data, index, date),
     })
+    batch.set(stats_ref, stats)
+    batch.commit()
     
     return Message(message=f"Activity assigned to {date} successfully")
 
@@ -457,41 +543,165 @@ def _update_user_exercises_with_performance(current_exercises: list, exercise_id
     - If exercise doesn't exist, add it with performance[date] = 0
     - If exercise exists, add new date entry with same value as last performance or 0 if no previous performance
     """
+    return _seed_performance(current_exercises, exercise_ids, [date])
+
+
+def _seed_performance(current_exercises: list, exercise_ids: list[str], dates: list[str]) -> list:
+    """
+    Add performance entries for several dates in one pass per exercise.
+    Every new date gets the value of the latest existing date (or 0), which
+    is what assigning the dates one by one would leave behind.
+    """
     # Convert current exercises to a dict for easier manipulation
     exercises_dict = {}
     for exercise in current_exercises:
         if isinstance(exercise, dict) and "id" in exercise:
             exercises_dict[exercise["id"]] = exercise
     
-    # Process each exercise in the activity
     for exercise_id in exercise_ids:
         if exercise_id in exercises_dict:
-            # Exercise already exists - add new date entry
-            existing_exercise = exercises_dict[exercise_id]
-            performance = existing_exercise.get("performance", {})
-            
-            if performance:
-                # Sort date keys as actual dates
-                date_keys = sorted(performance.keys(), key=lambda d: (d and len(d) > 0) and (datetime.strptime(d, "%a %b %d %Y")) or datetime.min)
-                last_date = date_keys[-1] if date_keys else None
-                last_performance = performance[last_date] if last_date else 0.0
-                performance[date] = last_performance
-            else:
-                # No previous performance, start with 0
-                performance[date] = 0.0
-            
-            exercises_dict[exercise_id]["performance"] = performance
+            performance = exercises_dict[exercise_id].get("performance") or {}
         else:
-            # New exercise - add with initial performance
-            exercises_dict[exercise_id] = {
-                "id": exercise_id,
-                "performance": {date: 0.0}
-            }
+            performance = {}
+            exercises_dict[exercise_id] = {"id": exercise_id}
+        
+        if performance:
+            # Latest date by calendar order, unparseable dates first
+            last_date = max(performance, key=lambda d: parse_assignment_date(d) or datetime.min)
+            seed_value = performance[last_date]
+        else:
+            seed_value = 0.0
+        for date in dates:
+            performance[date] = seed_value
+        exercises_dict[exercise_id]["performance"] = performance
     
     # Convert back to list
     return list(exercises_dict.values())
 
 
+def _expand_recurrence(recurrence: Recurrence) -> list[str]:
+    start = parse_assignment_date(recurrence.start)
+    end = parse_assignment_date(recurrence.end)
+    if not start or not end or end < start:
+        raise HTTPException(status_code=400, detail="Invalid recurrence range")
+    if (end - start).days >= BULK_ASSIGN_MAX_DATES * 7:
+        raise HTTPException(status_code=400, detail="Recurrence range is too long")
+    weekdays = set(recurrence.weekdays)
+    days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+    return [day.strftime(ASSIGNMENT_DATE_FORMAT) for day in days if day.weekday() in weekdays]
+
+
+@router.post("/assign/{activity_id}/bulk", response_model=BulkAssignResult)
+def bulk_assign_activity(
+    session: SessionDep, current_user: CurrentUser, activity_id: str, request: BulkAssignRequest
+) -> Any:
+    """
+    Assign an activity to many users on many dates (trainers only).
+    Dates come as a list and/or a weekly recurrence. Each user document is
+    read once (batched) and written once, with the writes committed as
+    parallel batches. Results are reported per (user, date).
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    
+    if not (current_user.is_superuser or getattr(current_user, "role", None) == "trainer"):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+    
+    activity_doc = session.collection("activities").document(activity_id).get()
+    if not activity_doc.exists:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    activity_exercise_ids = activity_doc.to_dict().get("exercises", [])
+    
+    # Requested dates, one per calendar day, in request order
+    dates = list(request.dates)
+    if request.recurrence:
+        dates += _expand_recurrence(request.recurrence)
+    dates = list({canonical_date(date): date for date in reversed(dates)}.values())[::-1]
+    if not dates:
+        raise HTTPException(status_code=400, detail="No dates to assign")
+    if len(dates) > BULK_ASSIGN_MAX_DATES:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_ASSIGN_MAX_DATES} dates per request")
+    
+    user_ids = list(dict.fromkeys(request.user_ids))
+    users = get_documents(session, "users", user_ids)
+    users_ref = session.collection("users")
+    stats_ref = session.collection(STATS_COLLECTION)
+    stats_docs = get_documents(session, STATS_COLLECTION, users)
+    
+    results: dict[str, list[dict]] = {}
+    updates = []
+    for user_id in user_ids:
+        user_data = users.get(user_id)
+        if user_data is None:
+            results[user_id] = [{"user_id": user_id, "date": date, "status": "user_not_found"} for date in dates]
+            continue
+        index = assignment_index(user_data)
+        new_assignments = []
+        results[user_id] = []
+        for date in dates:
+            if find_assignment(index, date, activity_id):
+                results[user_id].append({"user_id": user_id, "date": date, "status": "already_assigned"})
+                continue
+            assignment = {"id": activity_id, "date": date}
+            add_to_index(index, assignment)
+            new_assignments.append(assignment)
+            results[user_id].append({"user_id": user_id, "date": date, "status": "assigned"})
+        if not new_assignments:
+            continue
+        new_dates = [assignment["date"] for assignment in new_assignments]
+        current_exercises = user_data.get("exercises", [])
+        before = performance_snapshot(current_exercises, activity_exercise_ids, new_dates)
+        exercises = _seed_performance(current_exercises, activity_exercise_ids, new_dates)
+        stats = stats_docs.get(user_id)
+        if stats is not None and is_complete(stats):
+            stats.pop("id", None)
+            apply_changes(
+                stats,
+                performance_changes(before, exercises, activity_exercise_ids, new_dates),
+                exercises,
+                assigned=new_assignments,
+            )
+        else:
+            activities = user_data.get("activities", []) + new_assignments
+            stats = build_stats(user_id, {**user_data, "activities": activities, "exercises": exercises})
+        updates.append((user_id, {
+            "activities": firestore.ArrayUnion(new_assignments),
+            "exercises": exercises,
+            **performance_written(),
+            **index_updates(user_data, index, *new_dates),
+        }, stats))
+    
+    def commit(chunk: list) -> None:
+        batch = session.batch()
+        for user_id, update, stats in chunk:
+            batch.update(users_ref.document(user_id), update)
+            batch.set(stats_ref.document(user_id), stats)
+        batch.commit()
+    
+    # Two writes per user: the user document and its stats document
+    chunk_size = WRITE_BATCH_SIZE // 2
+    chunks = [updates[i:i + chunk_size] for i in range(0, len(updates), chunk_size)]
+    with ThreadPoolExecutor(max_workers=BULK_ASSIGN_WORKERS) as executor:
+        futures = [
+            (chunk, executor.submit(contextvars.copy_context().run, commit, chunk))
+            for chunk in chunks
+        ]
+        for chunk, future in futures:
+            if future.exception() is not None:
+                logger.warning("Bulk assignment batch failed", exc_info=future.exception())
+                for user_id, _, _ in chunk:
+                    for result in results[user_id]:
+                        if result["status"] == "assigned":
+                            result["status"] = "failed"
+    
+    flat = [result for user_id in user_ids for result in results[user_id]]
+    return BulkAssignResult(
+        activity_id=activity_id,
+        assigned=sum(result["status"] == "assigned" for result in flat),
+        results=flat,
+    )
+
+
 @router.delete("/unassign/{activity_id}")
 def unassign_activity_from_user(
     session: SessionDep, current_user: CurrentUser, activity_id: str, date: str
@@ -521,34 +731,44 @@ def unassign_activity_from_user(
         raise HTTPException(status_code=404, detail="User not found")
     
     user_data = user_doc.to_dict()
-    current_activities = user_data.get("activities", [])
+    index = assignment_index(user_data)
     current_exercises = user_data.get("exercises", [])
     
-    # Find and remove the specific activity assignment
-    updated_activities = []
-    found = False
-    
-    for activity in current_activities:
-        if (isinstance(activity, dict) and 
-            activity.get("id") == activity_id and 
-            activity.get("date") == date):
-            found = True
-            # Skip this activity (effectively removing it)
-            continue
-        else:
-            updated_activities.append(activity)
-    
-    if not found:
-        raise HTTPException(status_code=404, detail="Activity assignment not found for this date")
+    # Find the specific activity assignment (as stored, for ArrayRemove)
+    assignment = find_assignment(index, date, activity_id)
+    if not assignment:
+        # An occurrence of a schedule has nothing stored to remove: cancel it
+        occurrence = scheduled_occurrence(user_data, date, activity_id)
+        if not occurrence:
+            raise HTTPException(status_code=404, detail="Activity assignment not found for this date")
+        cancellation = cancel_update(occurrence["schedule_id"], parse_assignment_date(date).date())
+        user_doc_ref.update(cancellation)
+        mirror_updates(session, str(current_user.id), cancellation)
+        return Message(message=f"Activity unassigned from {date} successfully")
+    remove_from_index(index, assignment)
+    stats_ref, stats = read_stats(session, str(current_user.id), user_data)
     
     # Remove performance data for the specified date from all exercises in the activity
-    updated_exercises = _remove_performance_for_date(current_exercises, activity_exercise_ids, date)
-    
-    # Update user document with both updated activities and exercises
-    user_doc_ref.update({
-        "activities": updated_activities,
-        "exercises": updated_exercises
+    before = performance_snapshot(current_exercises, activity_exercise_ids, [assignment["date"]])
+    updated_exercises = _remove_performance_for_date(current_exercises, activity_exercise_ids, assignment["date"])
+    
+    apply_changes(
+        stats,
+        performance_changes(before, updated_exercises, activity_exercise_ids, [assignment["date"]]),
+        updated_exercises,
+        unassigned=[assignment],
+    )
+    
+    # Update user document with both updated activities and exercises, and its stats
+    batch = session.batch()
+    batch.update(user_doc_ref, {
+        "activities": firestore.ArrayRemove([assignment]),
+        "exercises": updated_exercises,
+        **performance_written(),
+        **index_updates(user_data, index, date),
     })
+    batch.set(stats_ref, stats)
+    batch.commit()
     
     return Message(message=f"Activity unassigned from {date} successfully")
 
@@ -613,43 +833,73 @@ def update_activity_assignment(
         raise HTTPException(status_code=404, detail="User not found")
     
     user_data = user_doc.to_dict()
-    current_activities = user_data.get("activities", [])
+    index = assignment_index(user_data)
     current_exercises = user_data.get("exercises", [])
     
     # Check if new date already has this activity assigned
-    for activity in current_activities:
-        if (isinstance(activity, dict) and 
-            activity.get("id") == activity_id and 
-            activity.get("date") == new_date):
-            raise HTTPException(status_code=400, detail="Activity already assigned for the new date")
-    
-    # Find and update the specific activity assignment
-    updated_activities = []
-    found = False
-    
-    for activity in current_activities:
-        if (isinstance(activity, dict) and 
-            activity.get("id") == activity_id and 
-            activity.get("date") == old_date):
-            found = True
-            # Update the date
-            updated_activity = activity.copy()
-            updated_activity["date"] = new_date
-            updated_activities.append(updated_activity)
-        else:
-            updated_activities.append(activity)
-    
-    if not found:
-        raise HTTPException(status_code=404, detail="Activity assignment not found for the old date")
+    if find_assignment(index, new_date, activity_id):
+        raise HTTPException(status_code=400, detail="Activity already assigned for the new date")
+    
+    # Find the specific activity assignment
+    old_assignment = find_assignment(index, old_date, activity_id)
+    new_assignment = {"id": activity_id, "date": new_date}
+    stats_ref, stats = read_stats(session, str(current_user.id), user_data)
+    if not old_assignment:
+        # Moving an occurrence of a schedule cancels it and assigns the new date
+        occurrence = scheduled_occurrence(user_data, old_date, activity_id)
+        if not occurrence:
+            raise HTTPException(status_code=404, detail="Activity assignment not found for the old date")
+        add_to_index(index, new_assignment)
+        before = performance_snapshot(current_exercises, activity_exercise_ids, [new_date])
+        updated_exercises = _seed_performance(current_exercises, activity_exercise_ids, [new_date])
+        cancellation = cancel_update(occurrence["schedule_id"], parse_assignment_date(old_date).date())
+        apply_changes(
+            stats,
+            performance_changes(before, updated_exercises, activity_exercise_ids, [new_date]),
+            updated_exercises,
+            assigned=[new_assignment],
+        )
+        batch = session.batch()
+        batch.update(user_doc_ref, {
+            "activities": firestore.ArrayUnion([new_assignment]),
+            "exercises": updated_exercises,
+            **performance_written(),
+            **index_updates(user_data, index, new_date),
+            **cancellation,
+        })
+        batch.set(stats_ref, stats)
+        batch.update(stats_ref, cancellation)
+        batch.commit()
+        return Message(message=f"Activity assignment updated from {old_date} to {new_date} successfully")
+    remove_from_index(index, old_assignment)
+    add_to_index(index, new_assignment)
     
     # Move performance data from old_date to new_date for exercises in this activity
-    updated_exercises = _move_performance_date(current_exercises, activity_exercise_ids, old_date, new_date)
-    
-    # Update user document with both updated activities and exercises
-    user_doc_ref.update({
-        "activities": updated_activities,
-        "exercises": updated_exercises
+    moved_dates = [old_assignment["date"], new_date]
+    before = performance_snapshot(current_exercises, activity_exercise_ids, moved_dates)
+    updated_exercises = _move_performance_date(current_exercises, activity_exercise_ids, old_assignment["date"], new_date)
+    
+    apply_changes(
+        stats,
+        performance_changes(before, updated_exercises, activity_exercise_ids, moved_dates),
+        updated_exercises,
+        assigned=[new_assignment],
+        unassigned=[old_assignment],
+    )
+    
+    # Update user document: both array transforms can't go in one update,
+    # so the entry is swapped with two writes in one atomic batch, together
+    # with the stats.
+    batch = session.batch()
+    batch.update(user_doc_ref, {
+        "activities": firestore.ArrayRemove([old_assignment]),
+        "exercises": updated_exercises,
+        **performance_written(),
+        **index_updates(user_data, index, old_date, new_date),
     })
+    batch.update(user_doc_ref, {"activities": firestore.ArrayUnion([new_assignment])})
+    batch.set(stats_ref, stats)
+    batch.commit()
     
     return Message(message=f"Activity assignment updated from {old_date} to {new_date} successfully")
 
@@ -700,15 +950,18 @@ def _move_performance_date(current_exercises: list, exercise_ids: list[str], old
 
 @router.get("/exercises/{user_id}/{date}")
 def get_exercises_for_day(
-    session: SessionDep, current_user: CurrentUser, user_id: str, date: str
+    session: SessionDep, current_user: CurrentUser, user_id: str, date: str, summary: bool = False
 ) -> Any:
     """
     Retrieve exercises for a specific user on a specific date.
     Logic: 
-    1. Get the user's activities array
-    2. Find activity assigned to the given date
-    3. Fetch the activity details to get exercises
-    4. Return the exercises list
+    1. Get the user's document
+    2. Look up the activities assigned to the given date in its date index,
+       plus the ones the user's schedules put on that date
+    3. Fetch those activities and their exercises with batched reads
+    4. Return the exercises list (each exercise once)
+    With summary=true the exercises are the summaries embedded in the
+    activities, and only exercises without one are fetched.
     """
     if not session:
         raise HTTPException(status_code=500, detail="Database not available")
@@ -726,63 +979,129 @@ def get_exercises_for_day(
         raise HTTPException(status_code=404, detail="User not found")
     
     user_data = user_doc.to_dict()
-    user_activities = user_data.get("activities", [])
-    
-    # Find activity assigned to the given date
-    assigned_activity_id = None
-    for activity_assignment in user_activities:
-        print(f"checking {activity_assignment.get('date')} against {date}")
-        if (isinstance(activity_assignment, dict) and
-            activity_assignment.get("date") == date):
-            print(f"Found matching activity: {activity_assignment.get('id')}")
-            assigned_activity_id = activity_assignment.get("id")
-            break
-    
-    if not assigned_activity_id:
+    
+    # Find the activities assigned or scheduled on the given date
+    parsed_date = parse_assignment_date(date)
+    scheduled = scheduled_on(user_data, parsed_date.date()) if parsed_date else []
+    assigned_activity_ids = [
+        a["id"] for a in merge_day(assignments_on(assignment_index(user_data), date), scheduled)
+    ]
+    
+    if not assigned_activity_ids:
         return {
             "date": date,
             "activity": None,
+            "activities": [],
             "exercises": [],
             "message": "No activity assigned for this date"
         }
     
     # Fetch the activity details to get exercises
-    activities_ref = session.collection("activities")
-    activity_doc = activities_ref.document(assigned_activity_id).get()
-    
-    if not activity_doc.exists:
+    activity_docs = get_documents(session, "activities", assigned_activity_ids)
+    if not activity_docs:
         raise HTTPException(status_code=404, detail="Assigned activity not found")
-    
-    activity_data = activity_doc.to_dict()
-    activity_data["id"] = activity_doc.id
-    activity = Activity(**activity_data)
-    
-    # Get exercise IDs from the activity
-    exercise_ids = activity_data.get("exercises", [])
-    
-    # Fetch exercise details for each exercise ID
-    exercises = []
-    if exercise_ids:
-        exercises_ref = session.collection("exercises")
-        for exercise_id in exercise_ids:
-            exercise_doc = exercises_ref.document(exercise_id).get()
-            if exercise_doc.exists:
-                exercise_data = exercise_doc.to_dict()
-                exercise_data["id"] = exercise_doc.id
-                exercises.append(exercise_data)
-    
+    activities = [
+        Activity(**activity_docs[activity_id])
+        for activity_id in assigned_activity_ids
+        if activity_id in activity_docs
+    ]
+    
+    if summary:
+        exercises, missing = day_exercises(activity_docs[activity.id] for activity in activities)
+        exercise_docs = get_documents(session, "exercises", missing) if missing else {}
+        exercises += [
+            {"id": exercise_id, **exercise_summary(exercise_docs[exercise_id])}
+            for exercise_id in missing
+            if exercise_id in exercise_docs
+        ]
+    else:
+        # Fetch exercise details for every exercise of the day's activities, once each
+        exercise_ids = dict.fromkeys(
+            exercise_id for activity in activities for exercise_id in activity.exercises or []
+        )
+        exercise_docs = get_documents(session, "exercises", exercise_ids)
+        exercises = [exercise_docs[exercise_id] for exercise_id in exercise_ids if exercise_id in exercise_docs]
+    
+    activities_summary = [
+        {"id": activity.id, "title": activity.title, "user_id": activity.user_id}
+        for activity in activities
+    ]
     return {
         "date": date,
-        "activity": {
-            "id": activity.id,
-            "title": activity.title,
-            "user_id": activity.user_id
-        },
+        # First activity of the day, kept for clients that expect only one
+        "activity": activities_summary[0],
+        "activities": activities_summary,
         "exercises": exercises,
         "exercises_count": len(exercises)
     }
 
 
+@router.get("/calendar/{user_id}", response_model=ActivityCalendar, response_model_exclude_none=True)
+def get_activity_calendar(
+    session: SessionDep,
+    current_user: CurrentUser,
+    user_id: str,
+    start: Annotated[str, Query(alias="from")],
+    end: Annotated[str, Query(alias="to")],
+) -> Any:
+    """
+    Retrieve every activity assignment of a user between two dates (inclusive),
+    including the occurrences of their schedules.
+    Each assigned activity and each of their exercises is returned once, so a
+    month view costs three reads instead of one get_exercises_for_day per day.
+    Dates are accepted as "Mon Jan 06 2025" or "2025-01-06".
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+
+    # Same rule as get_exercises_for_day
+    if not current_user.is_superuser and user_id != str(current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+
+    start_date = parse_assignment_date(start)
+    end_date = parse_assignment_date(end)
+    if not start_date or not end_date:
+        raise HTTPException(status_code=400, detail="Invalid date")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end_date - start_date).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {CALENDAR_MAX_DAYS} days")
+
+    user_doc = session.collection("users").document(user_id).get()
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # One index lookup and one schedule expansion per day of the range
+    user_data = user_doc.to_dict()
+    index = assignment_index(user_data)
+    assignments = []
+    for offset in range((end_date - start_date).days + 1):
+        day = (start_date + timedelta(days=offset)).date()
+        assignments += merge_day(index.get(day.isoformat(), []), scheduled_on(user_data, day))
+
+    activities = get_documents(session, "activities", dict.fromkeys(a["id"] for a in assignments))
+    exercise_ids = dict.fromkeys(
+        exercise_id
+        for activity in activities.values()
+        for exercise_id in activity.get("exercises") or []
+    )
+    exercises = get_documents(session, "exercises", exercise_ids)
+
+    return ActivityCalendar(
+        user_id=user_id,
+        start=start,
+        end=end,
+        # Assignments whose activity was deleted are left out
+        assignments=[
+            {"date": a["date"], "activity_id": a["id"], "schedule_id": a.get("schedule_id")}
+            for a in assignments
+            if a["id"] in activities
+        ],
+        activities={activity_id: ActivityPublic(**data) for activity_id, data in activities.items()},
+        exercises=exercises,
+    )
+
+
 @router.get("/user", response_model=ActivitiesPublic)
 def get_activities_for_user(
     session: SessionDep, current_user: CurrentUser, user_id: str, skip: int = 0, limit: int = 100
@@ -810,4 +1129,116 @@ def get_activities_for_user(
         activity_data = doc.to_dict()
         activity_data["id"] = doc.id
         activities.append(ActivityPublic(**activity_data))
-    return ActivitiesPublic(data=activities, count=count)
\ No newline at end of file
+    return ActivitiesPublic(data=activities, count=count)
+
+def _schedule_public(schedule_id: str, user_id: str, schedule: dict) -> SchedulePublic:
+    return SchedulePublic(
+        id=schedule_id,
+        user_id=user_id,
+        occurrences=occurrence_count(schedule),
+        **schedule,
+    )
+
+
+@router.post("/schedules", response_model=SchedulePublic)
+def create_schedule(
+    session: SessionDep, current_user: CurrentUser, schedule_in: ScheduleCreate
+) -> Any:
+    """
+    Schedule an activity for a user on some weekdays between two dates.
+    The schedule is stored once on the user document and expanded when days
+    are read; an occurrence only becomes a regular assignment once the user
+    logs performance for it or moves it.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+
+    is_trainer = current_user.is_superuser or getattr(current_user, "role", None) == "trainer"
+    if not is_trainer and schedule_in.user_id != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    activity_doc = session.collection("activities").document(schedule_in.activity_id).get()
+    if not activity_doc.exists:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    # Same rule as assign_activity_to_user for users scheduling themselves
+    if not is_trainer and activity_doc.to_dict().get("user_id") != str(current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+
+    start = parse_assignment_date(schedule_in.start)
+    end = parse_assignment_date(schedule_in.end)
+    if not start or not end or end < start:
+        raise HTTPException(status_code=400, detail="Invalid schedule range")
+    if (end - start).days >= SCHEDULE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Schedules are limited to {SCHEDULE_MAX_DAYS} days")
+
+    user_doc_ref = session.collection("users").document(schedule_in.user_id)
+    if not user_doc_ref.get().exists:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    schedule_id = str(uuid.uuid4())
+    schedule = {
+        "activity_id": schedule_in.activity_id,
+        "weekdays": sorted(set(schedule_in.weekdays)),
+        "start": start.date().isoformat(),
+        "end": end.date().isoformat(),
+        "cancelled": [],
+    }
+    user_doc_ref.update({schedule_field(schedule_id): schedule})
+    mirror_updates(session, schedule_in.user_id, {schedule_field(schedule_id): schedule})
+    return _schedule_public(schedule_id, schedule_in.user_id, schedule)
+
+
+@router.get("/schedules/{user_id}", response_model=SchedulesPublic)
+def read_schedules(session: SessionDep, current_user: CurrentUser, user_id: str) -> Any:
+    """
+    Retrieve the schedules of a user.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (
+        current_user.is_superuser
+        or getattr(current_user, "role", None) == "trainer"
+        or user_id == str(current_user.id)
+    ):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    user_doc = session.collection("users").document(user_id).get()
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    schedules = [
+        _schedule_public(schedule_id, user_id, schedule)
+        for schedule_id, schedule in sorted(
+            schedules_of(user_doc.to_dict()).items(), key=lambda item: item[1]["start"]
+        )
+    ]
+    return SchedulesPublic(data=schedules, count=len(schedules))
+
+
+@router.delete("/schedules/{user_id}/{schedule_id}")
+def delete_schedule(
+    session: SessionDep, current_user: CurrentUser, user_id: str, schedule_id: str
+) -> Message:
+    """
+    Delete a schedule. Occurrences that were materialized (performance
+    logged or moved) stay as regular assignments; the others disappear.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (
+        current_user.is_superuser
+        or getattr(current_user, "role", None) == "trainer"
+        or user_id == str(current_user.id)
+    ):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    user_doc_ref = session.collection("users").document(user_id)
+    user_doc = user_doc_ref.get()
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    if schedule_id not in schedules_of(user_doc.to_dict()):
+        raise HTTPException(status_code=404, detail="Schedule not found")
+
+    user_doc_ref.update({schedule_field(schedule_id): firestore.DELETE_FIELD})
+    mirror_updates(session, user_id, {schedule_field(schedule_id): firestore.DELETE_FIELD})
+    return Message(message="Schedule deleted successfully")
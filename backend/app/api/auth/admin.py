@@ -1,9 +1,11 @@
 from typing import Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
-from app.utils.auth import  SessionDep
+from app.utils.auth import  SessionDep, get_current_active_superuser
+from app.profiling import get_profile_store
 from app.security import get_password_hash
 from app.models.user import (
     User,
@@ -44,4 +46,24 @@ def create_user(user_in: AdminUserCreate, session: SessionDep) -> Any:
     doc_ref.set(user_data)
 
     # Return User object
-    return User(**user_data)
\ No newline at end of file
+    return User(**user_data)
+
+
+@router.get("/profiles/", dependencies=[Depends(get_current_active_superuser)])
+def read_profiles() -> Any:
+    """
+    List stored request profiles, newest first.
+    """
+    profiles = get_profile_store().list()
+    return sorted(profiles, key=lambda p: p["created"], reverse=True)
+
+
+@router.get("/profiles/{name}", dependencies=[Depends(get_current_active_superuser)])
+def read_profile(name: str) -> Any:
+    """
+    Download a stored profile (speedscope JSON or collapsed stacks).
+    """
+    path = get_profile_store().path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path)
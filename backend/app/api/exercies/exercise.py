@@ -1,15 +1,29 @@
 import uuid
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
 from app.utils.auth import CurrentUser, SessionDep
+from app.utils.documents import get_documents
+from app.utils.exercise_refs import empty_refs, exercise_refs
+from app.utils.exercise_search import ensure_exercise_index, exercise_index, exercise_written
+from app.utils.exercise_summaries import exercise_summary, fan_out_summary, summary_changed
+from app.utils.query_cache import cached_query, collection_written, viewer_role
 from app.models.exercise import (
+    Difficulty,
     Exercise,
+    ExerciseCategory,
     ExerciseCreate,
+    ExerciseFacets,
     ExercisePublic,
+    ExerciseSearchHit,
+    ExerciseSearchResults,
     ExercisesPublic,
     ExerciseUpdate,
+    ExerciseUsage,
+    MuscleGroup,
+    SimilarExercise,
+    SimilarExercises,
 )
 from app.config import settings
 from app.models.message import Message
@@ -20,47 +34,83 @@ router = APIRouter(tags=["exercises"])
 
 @router.get("/", response_model=ExercisesPublic)
 def read_exercises(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[ExerciseCategory] = None,
+    muscle_group: Optional[MuscleGroup] = None,
+    difficulty: Optional[Difficulty] = None,
 ) -> Any:
     """
-    Retrieve active exercises only.
+    Retrieve active exercises only, optionally filtered by category, muscle
+    group and difficulty. The count and the facet counts (per value of each
+    field, under the filters on the other fields) come from the in-memory
+    exercise index; pages are cached until the next exercise write.
     """
-    print("Retrieving active exercises")
-    
     if not session:
         raise HTTPException(status_code=500, detail="Database not available")
 
+    filters = {
+        "category": category.value if category else None,
+        "muscle_group": muscle_group.value if muscle_group else None,
+        "difficulty": difficulty.value if difficulty else None,
+    }
+
     # Reference to the exercises collection
-    exercises_ref = session.collection("exercises")
-    
+    query = session.collection("exercises").where("is_active", "==", True)
     if current_user.is_superuser:
-        # Get all active exercises for superuser
-        query = exercises_ref.where("is_active", "==", True).offset(skip).limit(limit)
-        exercises_docs = list(query.stream())
-        
-        # Get total count of active exercises
-        all_active_exercises = list(exercises_ref.where("is_active", "==", True).stream())
-        count = len(all_active_exercises)
+        # All active exercises for superuser
+        owner_id = None
     else:
-        # Get active exercises only for current user
-        query = exercises_ref.where("owner_id", "==", str(current_user.id)) \
-                           .where("is_active", "==", True) \
-                           .offset(skip).limit(limit)
-        exercises_docs = list(query.stream())
-        
-        # Get count of active exercises for current user
-        user_active_exercises = list(exercises_ref.where("owner_id", "==", str(current_user.id))
-                                   .where("is_active", "==", True).stream())
-        count = len(user_active_exercises)
-    
-    # Convert Firestore documents to Exercise objects
-    exercises = []
-    for doc in exercises_docs:
-        exercise_data = doc.to_dict()
-        exercise_data["id"] = doc.id
-        exercises.append(ExercisePublic(**exercise_data))
-
-    return ExercisesPublic(data=exercises, count=count)
+        # Active exercises only for current user
+        owner_id = str(current_user.id)
+        query = query.where("owner_id", "==", owner_id)
+    for field, value in filters.items():
+        if value is not None:
+            query = query.where(field, "==", value)
+
+    def run() -> list[ExercisePublic]:
+        # Convert Firestore documents to Exercise objects
+        exercises = []
+        for doc in query.offset(skip).limit(limit).stream():
+            exercise_data = doc.to_dict()
+            exercise_data["id"] = doc.id
+            exercises.append(ExercisePublic(**exercise_data))
+        return exercises
+
+    key = (owner_id, *filters.values(), skip, limit, viewer_role(current_user))
+    exercises = cached_query(session, "exercises", key, run)
+    count, facets = ensure_exercise_index(session).facet_counts(filters, owner_id=owner_id)
+
+    return ExercisesPublic(data=exercises, count=count, facets=ExerciseFacets(**facets))
+
+
+@router.get("/search", response_model=ExerciseSearchResults)
+def search_exercises(
+    session: SessionDep,
+    current_user: CurrentUser,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+) -> Any:
+    """
+    Search active exercises by title and description, best matches first.
+    The last word also matches as a prefix and longer words tolerate a typo.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+
+    owner_id = None if current_user.is_superuser else str(current_user.id)
+    hits, count = ensure_exercise_index(session).search(q, owner_id=owner_id, limit=limit)
+
+    # One batched read for the hits; exercises deactivated since are left out
+    documents = get_documents(session, "exercises", [exercise_id for exercise_id, _ in hits])
+    data = [
+        ExerciseSearchHit(**documents[exercise_id], score=score)
+        for exercise_id, score in hits
+        if documents.get(exercise_id, {}).get("is_active", False)
+    ]
+    return ExerciseSearchResults(data=data, count=count)
 
 
 @router.get("/{id}", response_model=ExercisePublic)
@@ -86,6 +136,71 @@ def read_exercise(session: SessionDep, current_user: CurrentUser, id: str) -> An
     return exercise
 
 
+@router.get("/{id}/similar", response_model=SimilarExercises)
+def read_similar_exercises(
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: str,
+    limit: int = Query(default=10, ge=1, le=50),
+) -> Any:
+    """
+    Substitutes for an exercise: the active exercises closest to it by
+    category, muscle group, difficulty, reps, sets, duration and title.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+
+    doc = session.collection("exercises").document(id).get()
+    exercise_data = doc.to_dict() if doc.exists else None
+    if not exercise_data or not exercise_data.get("is_active", True):
+        raise HTTPException(status_code=404, detail="Exercise not found")
+
+    if not current_user.is_superuser and exercise_data.get("owner_id") != str(current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+
+    owner_id = None if current_user.is_superuser else str(current_user.id)
+    index = ensure_exercise_index(session)
+    neighbours = index.similar(id, owner_id=owner_id, limit=limit)
+    if neighbours is None:
+        # Written by another worker since the last refresh
+        index.upsert(id, exercise_data)
+        neighbours = index.similar(id, owner_id=owner_id, limit=limit)
+
+    documents = get_documents(session, "exercises", [exercise_id for exercise_id, _ in neighbours])
+    data = [
+        SimilarExercise(**documents[exercise_id], similarity=similarity)
+        for exercise_id, similarity in neighbours
+        if documents.get(exercise_id, {}).get("is_active", False)
+    ]
+    return SimilarExercises(data=data, count=len(data))
+
+
+@router.get("/{id}/usage", response_model=ExerciseUsage)
+def read_exercise_usage(session: SessionDep, current_user: CurrentUser, id: str) -> Any:
+    """
+    Activities containing an exercise and users with it in an activity.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+
+    doc = session.collection("exercises").document(id).get()
+    if not doc.exists:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+
+    if not current_user.is_superuser and doc.to_dict().get("owner_id") != str(current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+
+    refs = exercise_refs(session, id) or empty_refs(id)
+    return ExerciseUsage(
+        exercise_id=id,
+        activity_count=refs["activity_count"],
+        user_count=refs["user_count"],
+        activity_ids=refs["activity_ids"],
+        activity_ids_complete=refs["activity_ids_complete"],
+        user_ids=list(refs["users"]),
+    )
+
+
 @router.post("/", response_model=ExercisePublic)
 def create_exercise(
     *, db_client: SessionDep, current_user: CurrentUser, exercise_in: ExerciseCreate
@@ -93,8 +208,6 @@ def create_exercise(
     """
     Create new exercise.
     """
-    print(f"Creating exercise with data: {exercise_in}")
-    
     if not db_client:
         raise HTTPException(status_code=500, detail="Database not available")
     
@@ -113,17 +226,18 @@ def create_exercise(
         exercise_data["muscle_group"] = exercise_data["muscle_group"].value
     if "difficulty" in exercise_data and exercise_data["difficulty"]:
         exercise_data["difficulty"] = exercise_data["difficulty"].value
-    
-    print(f"Exercise data to save: {exercise_data}")
+    exercise_data.update(exercise_written())
     
     # Add to Firestore
     exercises_ref = db_client.collection("exercises")
     doc_ref = exercises_ref.add(exercise_data)[1]  # add() returns (timestamp, doc_ref)
+    collection_written(db_client, "exercises")
     
     # Get the created document
     created_doc = doc_ref.get()
     created_data = created_doc.to_dict()
     created_data["id"] = created_doc.id
+    exercise_index.upsert(created_doc.id, created_data)
     
     return Exercise(**created_data)
 
@@ -172,12 +286,18 @@ def update_exercise(
     if "difficulty" in update_dict and update_dict["difficulty"]:
         update_dict["difficulty"] = update_dict["difficulty"].value
     
-    doc_ref.update(update_dict)
+    doc_ref.update({**update_dict, **exercise_written()})
+    collection_written(session, "exercises")
     
     # Get updated document
     updated_doc = doc_ref.get()
     updated_data = updated_doc.to_dict()
     updated_data["id"] = updated_doc.id
+    exercise_index.upsert(updated_doc.id, updated_data)
+
+    # Activities embed a summary of their exercises
+    if summary_changed(update_dict):
+        fan_out_summary(session, id, exercise_summary(updated_data))
     
     return Exercise(**updated_data)
 
@@ -211,6 +331,8 @@ def delete_exercise(
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
     # Soft delete: set is_active to False instead of deleting the document
-    doc_ref.update({"is_active": False})
+    doc_ref.update({"is_active": False, **exercise_written()})
+    collection_written(session, "exercises")
+    exercise_index.remove(id)
     
     return Message(message="Exercise deactivated successfully")
\ No newline at end of file
@@ -5,6 +5,7 @@ from typing import List
 from fastapi import APIRouter, HTTPException
 
 from app.utils.auth import CurrentUser, SessionDep
+from app.utils.query_cache import cached_query, collection_written, viewer_role
 from app.models.item import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate
 from app.config import settings
 from app.models.message import Message
@@ -20,38 +21,40 @@ def read_items(
     """
     Retrieve items.
     """
-    print("Retrieving items")
-    
     if not session:
         raise HTTPException(status_code=500, detail="Database not available")
 
     # Reference to the items collection
     items_ref = session.collection("items")
-    
-    if current_user.is_superuser:
-        # Get all items for superuser
-        query = items_ref.offset(skip).limit(limit)
-        items_docs = list(query.stream())
-        
-        # Get total count
-        all_items = list(items_ref.stream())
-        count = len(all_items)
-    else:
-        # Get items only for current user
-        query = items_ref.where("owner_id", "==", str(current_user.id)).offset(skip).limit(limit)
-        items_docs = list(query.stream())
+    owner_id = None if current_user.is_superuser else str(current_user.id)
+
+    def run() -> tuple[list[ItemPublic], int]:
+        if owner_id is None:
+            # Get all items for superuser
+            query = items_ref.offset(skip).limit(limit)
+            items_docs = list(query.stream())
+            
+            # Get total count
+            all_items = list(items_ref.stream())
+            count = len(all_items)
+        else:
+            # Get items only for current user
+            query = items_ref.where("owner_id", "==", owner_id).offset(skip).limit(limit)
+            items_docs = list(query.stream())
+            
+            # Get count for current user
+            user_items = list(items_ref.where("owner_id", "==", owner_id).stream())
+            count = len(user_items)
         
-        # Get count for current user
-        user_items = list(items_ref.where("owner_id", "==", str(current_user.id)).stream())
-        count = len(user_items)
-    
-    # Convert Firestore documents to Item objects
-    items = []
-    for doc in items_docs:
-        item_data = doc.to_dict()
-        item_data["id"] = doc.id
-        items.append(ItemPublic(**item_data))
-
+        # Convert Firestore documents to Item objects
+        items = []
+        for doc in items_docs:
+            item_data = doc.to_dict()
+            item_data["id"] = doc.id
+            items.append(ItemPublic(**item_data))
+        return items, count
+
+    items, count = cached_query(session, "items", (owner_id, skip, limit, viewer_role(current_user)), run)
     return ItemsPublic(data=items, count=count)
 
 
@@ -97,6 +100,7 @@ def create_item(
     # Add to Firestore
     items_ref = session.collection("items")
     doc_ref = items_ref.add(item_data)[1]  # add() returns (timestamp, doc_ref)
+    collection_written(session, "items")
     
     # Get the created document
     created_doc = doc_ref.get()
@@ -138,6 +142,7 @@ def update_item(
     # Update the document
     update_dict = item_in.model_dump(exclude_unset=True)
     doc_ref.update(update_dict)
+    collection_written(session, "items")
     
     # Get updated document
     updated_doc = doc_ref.get()
@@ -173,5 +178,6 @@ def delete_item(
     
     # Delete the document
     doc_ref.delete()
+    collection_written(session, "items")
     
     return Message(message="Item deleted successfully")
\ No newline at end of file
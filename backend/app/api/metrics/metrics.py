@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from starlette.responses import PlainTextResponse
+
+from app.config import settings
+from app import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics() -> PlainTextResponse:
+    """
+    Prometheus scrape endpoint.
+    """
+    # Runs on the event loop, where the threadpool limiter can be sampled.
+    metrics.collect_threadpool()
+    snapshot = metrics.collect(settings.METRICS_MULTIPROC_DIR)
+    return PlainTextResponse(
+        metrics.render(snapshot),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
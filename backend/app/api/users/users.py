@@ -1,7 +1,13 @@
+import logging
+import math
 import uuid
-from typing import Any
+from datetime import date, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+import numpy as np
+from typing import Annotated, Any, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from google.cloud import firestore
 from sqlmodel import col, delete, func, select
 
 from app.crud.auth import user as crud_user
@@ -21,13 +27,51 @@ from app.models.user import (
     UserUpdate,
     UserUpdateMe,
     UpdateExercisePerformanceRequest,
+    BulkExercisePerformanceRequest,
+    BulkExercisePerformanceResult,
+    ExercisePerformanceResult,
+    UserProgress,
+    ExerciseChart,
+    UserStats,
+    TrainerRoster,
+    TrainingLoadRoster,
 )
 
 
+from app.metrics import record_cache
+from app.utils.assignments import parse_assignment_date
+from app.utils.documents import get_documents
+from app.utils.downsampling import lttb, min_max
+from app.utils.progress import (
+    PERFORMANCE_VERSION_FIELD,
+    cache_progress,
+    cached_progress,
+    exercise_progress,
+    exercise_series,
+    performance_written,
+)
+from app.utils.query_cache import collection_written
+from app.utils.schedules import materialize_updates
+from app.utils.training_load import RISK_ORDER, TRAINING_LOAD_COLLECTION
+from app.utils.user_stats import (
+    STATS_COLLECTION,
+    apply_changes,
+    build_stats,
+    client_summary,
+    is_complete,
+    logged_updates,
+    mirror_updates,
+    read_stats,
+)
 from app.utils.email import generate_new_account_email, send_email
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["users"])
 
+# Clients returned by one roster query
+ROSTER_MAX_CLIENTS = 500
+
 
 @router.get(
     "/",
@@ -76,7 +120,6 @@ def create_user(*, session: SessionDep, current_user: CurrentUser, user_in: User
     """
     Create new user.
     """
-    print(f"Creating user with email: {user_in.email}")
       # Only allow superuser or trainer
     if not (current_user.is_superuser or getattr(current_user, "role", None) == "trainer"):
         raise HTTPException(status_code=403, detail="Not enough privileges")
@@ -90,7 +133,7 @@ def create_user(*, session: SessionDep, current_user: CurrentUser, user_in: User
         )
 
     user = crud_user.create_user(session=session, user_create=user_in)
-    print(f"User created successfully: {user.id}")
+    logger.info("User created", extra={"user_id": str(user.id)})
     
     # Send email if enabled
     if settings.emails_enabled and user_in.email:
@@ -141,6 +184,11 @@ def update_user_me(
     updated_user_data = updated_doc.to_dict()
     updated_user_data["id"] = updated_doc.id
 
+    # Trainers' rosters show the name and email from the stats document
+    profile = {key: user_data[key] for key in ("full_name", "email") if key in user_data}
+    if profile and updated_user_data.get("trainer_ids"):
+        mirror_updates(session, str(current_user.id), profile)
+
     return UserPublic(**updated_user_data)
 
 
@@ -170,6 +218,110 @@ def update_password_me(
     return Message(message="Password updated successfully")
 
 
+@router.get("/me/clients", response_model=TrainerRoster)
+def read_my_clients(session: SessionDep, current_user: CurrentUser) -> Any:
+    """
+    Trainer dashboard: adherence summary of every client of the current
+    trainer, read from the clients' stats documents with one query.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (current_user.is_superuser or getattr(current_user, "role", None) == "trainer"):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    query = (
+        session.collection(STATS_COLLECTION)
+        .where("trainer_ids", "array_contains", str(current_user.id))
+        .limit(ROSTER_MAX_CLIENTS)
+    )
+    today = date.today()
+    clients = [client_summary(doc.to_dict(), today) for doc in query.stream()]
+    clients.sort(key=lambda client: (client["full_name"] or client["email"] or "").lower())
+    return TrainerRoster(
+        trainer_id=str(current_user.id),
+        week_start=(today - timedelta(days=today.weekday())).isoformat(),
+        count=len(clients),
+        clients=clients,
+    )
+
+
+@router.get("/me/clients/training-load", response_model=TrainingLoadRoster)
+def read_my_clients_training_load(session: SessionDep, current_user: CurrentUser) -> Any:
+    """
+    Trainer dashboard: acute:chronic workload ratio, monotony and strain of
+    every client, as last computed by ``python -m app.compute_training_load``,
+    highest injury risk first.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (current_user.is_superuser or getattr(current_user, "role", None) == "trainer"):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    query = (
+        session.collection(TRAINING_LOAD_COLLECTION)
+        .where("trainer_ids", "array_contains", str(current_user.id))
+        .limit(ROSTER_MAX_CLIENTS)
+    )
+    clients = [doc.to_dict() for doc in query.stream()]
+    clients.sort(key=lambda client: (RISK_ORDER[client.get("risk")], -(client.get("acwr") or 0)))
+    return TrainingLoadRoster(trainer_id=str(current_user.id), count=len(clients), clients=clients)
+
+
+@router.post("/me/clients/{client_id}", response_model=Message)
+def add_my_client(client_id: str, session: SessionDep, current_user: CurrentUser) -> Any:
+    """
+    Add a user to the current trainer's clients.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (current_user.is_superuser or getattr(current_user, "role", None) == "trainer"):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    trainer_id = str(current_user.id)
+    client_ref = session.collection("users").document(client_id)
+    client_doc = client_ref.get()
+    if not client_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    client_ref.update({"trainer_ids": firestore.ArrayUnion([trainer_id])})
+
+    # The membership index lives in the stats documents the roster reads
+    stats_ref = session.collection(STATS_COLLECTION).document(client_id)
+    stats_doc = stats_ref.get()
+    if stats_doc.exists and is_complete(stats_doc.to_dict()):
+        stats_ref.update({"trainer_ids": firestore.ArrayUnion([trainer_id])})
+    else:
+        client_data = client_doc.to_dict()
+        client_data["trainer_ids"] = list(dict.fromkeys((client_data.get("trainer_ids") or []) + [trainer_id]))
+        stats_ref.set(build_stats(client_id, client_data))
+    mirror_updates(
+        session, client_id, {"trainer_ids": firestore.ArrayUnion([trainer_id])}, TRAINING_LOAD_COLLECTION
+    )
+    return Message(message="Client added successfully")
+
+
+@router.delete("/me/clients/{client_id}", response_model=Message)
+def remove_my_client(client_id: str, session: SessionDep, current_user: CurrentUser) -> Any:
+    """
+    Remove a user from the current trainer's clients.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (current_user.is_superuser or getattr(current_user, "role", None) == "trainer"):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    client_ref = session.collection("users").document(client_id)
+    client_doc = client_ref.get()
+    if not client_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    if str(current_user.id) not in (client_doc.to_dict().get("trainer_ids") or []):
+        raise HTTPException(status_code=404, detail="Not a client of this trainer")
+    removal = {"trainer_ids": firestore.ArrayRemove([str(current_user.id)])}
+    client_ref.update(removal)
+    mirror_updates(session, client_id, removal)
+    mirror_updates(session, client_id, removal, TRAINING_LOAD_COLLECTION)
+    return Message(message="Client removed successfully")
+
+
 @router.get("/me", response_model=UserPublic)
 def read_user_me(current_user: CurrentUser) -> Any:
     """
@@ -190,13 +342,18 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
     
     # Delete user's items from Firestore
     items_ref = session.collection("items")
-    user_items = items_ref.where("owner_id", "==", current_user.id).stream()
+    user_items = list(items_ref.where("owner_id", "==", current_user.id).stream())
     for item_doc in user_items:
         item_doc.reference.delete()
+    if user_items:
+        collection_written(session, "items")
     
-    # Delete the user document
-    users_ref = session.collection("users")
-    users_ref.document(current_user.id).delete()
+    # Delete the user document together with its stats and training load
+    batch = session.batch()
+    batch.delete(session.collection("users").document(current_user.id))
+    batch.delete(session.collection(STATS_COLLECTION).document(current_user.id))
+    batch.delete(session.collection(TRAINING_LOAD_COLLECTION).document(current_user.id))
+    batch.commit()
     
     return Message(message="User deleted successfully")
 
@@ -231,6 +388,152 @@ def read_user_by_id(
     return user
 
 
+@router.get("/{user_id}/progress", response_model=UserProgress)
+def read_user_progress(
+    user_id: str,
+    session: SessionDep,
+    current_user: CurrentUser,
+    window: Annotated[int, Query(ge=1, le=365)] = 7,
+) -> Any:
+    """
+    Get per-exercise progress analytics of a user: personal bests, rolling
+    average, week-over-week deltas, trend slope and volume.
+    Results are cached until the user's next performance write.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (
+        current_user.is_superuser
+        or getattr(current_user, "role", None) == "trainer"
+        or user_id == str(current_user.id)
+    ):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    user_doc = session.collection("users").document(user_id).get()
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_data = user_doc.to_dict()
+
+    key = ("progress", user_id, user_data.get(PERFORMANCE_VERSION_FIELD, 0), window)
+    progress = cached_progress(key)
+    record_cache("progress", progress is not None)
+    if progress is not None:
+        return progress
+
+    performances = {
+        exercise["id"]: exercise.get("performance") or {}
+        for exercise in user_data.get("exercises", [])
+        if isinstance(exercise, dict) and exercise.get("id")
+    }
+    # Exercise details (title, reps, sets) only for exercises with data
+    exercise_docs = get_documents(
+        session, "exercises", [exercise_id for exercise_id, performance in performances.items() if performance]
+    )
+    exercises = [
+        result
+        for exercise_id, performance in performances.items()
+        if (result := exercise_progress(exercise_id, performance, exercise_docs.get(exercise_id), window))
+    ]
+    progress = UserProgress(
+        user_id=user_id,
+        window=window,
+        data_points=sum(exercise["data_points"] for exercise in exercises),
+        total_volume=sum(exercise["total_volume"] for exercise in exercises),
+        exercises=exercises,
+    )
+    cache_progress(key, progress)
+    return progress
+
+
+@router.get("/{user_id}/stats", response_model=UserStats)
+def read_user_stats(user_id: str, session: SessionDep, current_user: CurrentUser) -> Any:
+    """
+    Get the materialized stats of a user (sessions, streaks, personal
+    records). Built from the user document the first time.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (
+        current_user.is_superuser
+        or getattr(current_user, "role", None) == "trainer"
+        or user_id == str(current_user.id)
+    ):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    stats_ref = session.collection(STATS_COLLECTION).document(user_id)
+    stats_doc = stats_ref.get()
+    if stats_doc.exists and is_complete(stats_doc.to_dict()):
+        return UserStats(**stats_doc.to_dict())
+
+    user_doc = session.collection("users").document(user_id).get()
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    stats = build_stats(user_id, user_doc.to_dict())
+    stats_ref.set(stats)
+    return UserStats(**stats)
+
+
+@router.get("/{user_id}/exercises/{exercise_id}/chart", response_model=ExerciseChart)
+def read_exercise_chart(
+    user_id: str,
+    exercise_id: str,
+    session: SessionDep,
+    current_user: CurrentUser,
+    points: Annotated[int, Query(ge=3, le=5000)] = 500,
+    method: Literal["lttb", "minmax"] = "lttb",
+    start: Annotated[Optional[str], Query(alias="from")] = None,
+    end: Annotated[Optional[str], Query(alias="to")] = None,
+) -> Any:
+    """
+    Get the performance series of one exercise for a chart, downsampled to
+    at most `points` points (Largest-Triangle-Three-Buckets, or the min and
+    max of each bucket), optionally restricted to a date range.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not (
+        current_user.is_superuser
+        or getattr(current_user, "role", None) == "trainer"
+        or user_id == str(current_user.id)
+    ):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    bounds = []
+    for value in (start, end):
+        parsed = parse_assignment_date(value) if value is not None else None
+        if value is not None and parsed is None:
+            raise HTTPException(status_code=400, detail="Invalid date")
+        bounds.append(np.datetime64(parsed.date(), "D") if parsed else None)
+
+    user_doc = session.collection("users").document(user_id).get()
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    series = exercise_series(user_id, user_doc.to_dict(), exercise_id)
+    if series is None:
+        raise HTTPException(status_code=404, detail="Exercise not found for this user")
+
+    # The series is sorted: the range is two binary searches
+    days, values = series
+    lo = int(np.searchsorted(days, bounds[0], side="left")) if bounds[0] is not None else 0
+    hi = int(np.searchsorted(days, bounds[1], side="right")) if bounds[1] is not None else len(days)
+    days, values = days[lo:hi], values[lo:hi]
+
+    if method == "lttb":
+        kept = lttb(days.astype(np.int64), values, points)
+    else:
+        kept = min_max(values, points)
+    return ExerciseChart(
+        user_id=user_id,
+        exercise_id=exercise_id,
+        method=method,
+        total_points=len(values),
+        points=[
+            {"date": str(day), "value": float(value)}
+            for day, value in zip(days[kept], values[kept])
+        ],
+    )
+
+
 @router.patch(
     "/{user_id}",
     dependencies=[Depends(get_current_active_superuser)],
@@ -300,12 +603,18 @@ def delete_user(
     
     # Delete user's items from Firestore (if you have items collection)
     items_ref = session.collection("items")
-    user_items = items_ref.where("owner_id", "==", user_id).stream()
+    user_items = list(items_ref.where("owner_id", "==", user_id).stream())
     for item_doc in user_items:
         item_doc.reference.delete()
+    if user_items:
+        collection_written(session, "items")
     
-    # Delete the user document
-    users_ref.document(user_id).delete()
+    # Delete the user document together with its stats and training load
+    batch = session.batch()
+    batch.delete(users_ref.document(user_id))
+    batch.delete(session.collection(STATS_COLLECTION).document(user_id))
+    batch.delete(session.collection(TRAINING_LOAD_COLLECTION).document(user_id))
+    batch.commit()
     
     return Message(message="User deleted successfully")
 
@@ -319,6 +628,7 @@ def update_exercise_performance(
 ) -> Any:
     """
     Update exercise performance for the current user on a specific date.
+    Scheduled occurrences of that date become regular assignments.
     """
     if not session:
         raise HTTPException(status_code=500, detail="Database not available")
@@ -332,10 +642,12 @@ def update_exercise_performance(
         raise HTTPException(status_code=404, detail="User not found")
     
     user_data = user_doc.to_dict()
+    stats_ref, stats = read_stats(session, str(current_user.id), user_data)
     current_exercises = user_data.get("exercises", [])
     
     # Find the exercise in user's exercises array
     exercise_found = False
+    previous = None
     updated_exercises = []
     
     for exercise in current_exercises:
@@ -343,6 +655,7 @@ def update_exercise_performance(
             exercise_found = True
             # Update the performance for the specific date
             performance = exercise.get("performance", {})
+            previous = performance.get(request.date)
             performance[request.date] = request.performance
             exercise["performance"] = performance
             updated_exercises.append(exercise)
@@ -357,7 +670,112 @@ def update_exercise_performance(
         }
         updated_exercises.append(new_exercise)
     
-    # Update user document with new exercises data
-    user_doc_ref.update({"exercises": updated_exercises})
+    # Update user document with new exercises data, and its stats
+    materialized, assigned = materialize_updates(user_data, request.date)
+    apply_changes(
+        stats,
+        [(request.exercise_id, request.date, previous, request.performance)],
+        updated_exercises,
+        assigned=assigned,
+        logged=[request.date],
+    )
+    batch = session.batch()
+    batch.update(user_doc_ref, {
+        "exercises": updated_exercises,
+        **performance_written(),
+        **logged_updates(request.date),
+        **materialized,
+    })
+    batch.set(stats_ref, stats)
+    batch.commit()
     
     return Message(message=f"Exercise performance updated successfully for {request.date}")
+
+
+@router.patch("/me/exercise-performance/bulk", response_model=BulkExercisePerformanceResult)
+def update_exercise_performance_bulk(
+    *,
+    session: SessionDep,
+    request: BulkExercisePerformanceRequest,
+    current_user: CurrentUser
+) -> Any:
+    """
+    Update many exercise performances for the current user in one transaction
+    (one read and one write of the user document, however many entries).
+    The response reports what happened to each entry. Scheduled occurrences
+    of the dates written become regular assignments.
+    """
+    if not session:
+        raise HTTPException(status_code=500, detail="Database not available")
+
+    user_doc_ref = session.collection("users").document(str(current_user.id))
+    # The last valid entry for an exercise and date wins
+    last_index = {
+        (entry.exercise_id, entry.date): i
+        for i, entry in enumerate(request.entries)
+        if math.isfinite(entry.performance)
+    }
+
+    @firestore.transactional
+    def apply(transaction) -> list[ExercisePerformanceResult]:
+        user_doc = next(transaction.get(user_doc_ref))
+        if not user_doc.exists:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        user_data = user_doc.to_dict()
+        stats_ref, stats = read_stats(session, str(current_user.id), user_data, transaction)
+        current_exercises = user_data.get("exercises", [])
+        exercises_by_id = {
+            exercise["id"]: exercise
+            for exercise in current_exercises
+            if isinstance(exercise, dict) and "id" in exercise
+        }
+        results = []
+        changes = []
+        for i, entry in enumerate(request.entries):
+            if not math.isfinite(entry.performance):
+                status = "invalid"
+            elif last_index[(entry.exercise_id, entry.date)] != i:
+                status = "superseded"
+            else:
+                exercise = exercises_by_id.get(entry.exercise_id)
+                if exercise is None:
+                    # Exercise not found in user's exercises, add it
+                    exercise = {"id": entry.exercise_id, "performance": {}}
+                    exercises_by_id[entry.exercise_id] = exercise
+                    current_exercises.append(exercise)
+                performance = exercise.get("performance") or {}
+                previous = performance.get(entry.date)
+                if previous == entry.performance:
+                    status = "unchanged"
+                else:
+                    status = "created" if previous is None else "updated"
+                    performance[entry.date] = entry.performance
+                    exercise["performance"] = performance
+                    changes.append((entry.exercise_id, entry.date, previous, entry.performance))
+            results.append(ExercisePerformanceResult(
+                exercise_id=entry.exercise_id,
+                date=entry.date,
+                performance=entry.performance if status != "invalid" else None,
+                applied=status in ("created", "updated", "unchanged"),
+                status=status,
+            ))
+
+        if changes:
+            dates = list(dict.fromkeys(change[1] for change in changes))
+            materialized, assigned = materialize_updates(user_data, *dates)
+            transaction.update(user_doc_ref, {
+                "exercises": current_exercises,
+                **performance_written(),
+                **logged_updates(*dates),
+                **materialized,
+            })
+            apply_changes(stats, changes, current_exercises, assigned=assigned, logged=dates)
+            transaction.set(stats_ref, stats)
+        return results
+
+    results = apply(session.transaction())
+    return BulkExercisePerformanceResult(
+        applied=sum(result.applied for result in results),
+        results=results,
+    )
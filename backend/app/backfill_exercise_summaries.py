@@ -0,0 +1,59 @@
+"""
+Embed exercise summaries in activities written before they were kept.
+
+    python -m app.backfill_exercise_summaries
+
+Activities are streamed once, the exercises they reference are fetched
+with batched reads, and only activities missing a summary are rewritten.
+"""
+import argparse
+import logging
+from typing import Any
+
+from app.database_engine import get_firestore_client
+from app.logging_config import setup_logging
+from app.utils.documents import BatchWriter, get_documents
+from app.utils.exercise_summaries import SUMMARIES_FIELD, exercise_summary
+from app.utils.query_cache import collection_written
+
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_exercise_summaries(session: Any) -> int:
+    """Write the summaries map of every activity lacking one of its exercises."""
+    stale = []
+    for doc in session.collection("activities").stream():
+        data = doc.to_dict() or {}
+        summaries = data.get(SUMMARIES_FIELD) or {}
+        if any(exercise_id not in summaries for exercise_id in data.get("exercises") or []):
+            stale.append((doc.reference, data.get("exercises") or [], summaries))
+    exercise_ids = dict.fromkeys(i for _, ids, _ in stale for i in ids)
+    summaries = {
+        exercise_id: exercise_summary(data)
+        for exercise_id, data in get_documents(session, "exercises", exercise_ids).items()
+    }
+
+    batch = BatchWriter(session)
+    for reference, ids, current in stale:
+        embedded = {i: summaries[i] for i in ids if i in summaries}
+        # Nothing to add when only exercises that no longer exist are missing
+        if embedded == current:
+            continue
+        batch.update(reference, {SUMMARIES_FIELD: embedded})
+    written = batch.commit()
+    if written:
+        collection_written(session, "activities")
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+    setup_logging()
+    count = backfill_exercise_summaries(get_firestore_client())
+    logger.info("Embedded exercise summaries in %d activities", count)
+
+
+if __name__ == "__main__":
+    main()
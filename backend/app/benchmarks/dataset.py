@@ -0,0 +1,186 @@
+"""
+Deterministic synthetic gym dataset for benchmarks.
+
+The same ``DatasetSpec`` (including ``seed``) always produces the same
+documents, so results from different runs and branches are comparable.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Any
+
+from app.models.exercise import Difficulty, ExerciseCategory, MuscleGroup
+from app.security import get_password_hash
+from app.utils.assignments import INDEX_FIELD, build_assignment_index
+
+
+# Same format the frontend sends (JavaScript ``Date.toDateString()``).
+DATE_FORMAT = "%a %b %d %Y"
+BENCHMARK_PASSWORD = "benchmark-password"
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    trainers: int = 2
+    clients: int = 20
+    exercises: int = 50
+    days: int = 30
+    activities_per_client: int = 3
+    exercises_per_activity: int = 6
+    training_days_per_week: int = 4
+    start: date = date(2025, 1, 6)
+    seed: int = 42
+
+    def describe(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["start"] = self.start.isoformat()
+        return data
+
+
+@dataclass
+class Dataset:
+    spec: DatasetSpec
+    # collection name -> document id -> document data
+    collections: dict[str, dict[str, dict]] = field(default_factory=dict)
+    trainer_ids: list[str] = field(default_factory=list)
+    client_ids: list[str] = field(default_factory=list)
+    superuser_id: str = "superuser"
+
+    @property
+    def document_count(self) -> int:
+        return sum(len(docs) for docs in self.collections.values())
+
+    def training_dates(self) -> list[str]:
+        return [format_date(d) for d in _training_days(self.spec)]
+
+
+def format_date(day: date) -> str:
+    return day.strftime(DATE_FORMAT)
+
+
+def _training_days(spec: DatasetSpec) -> list[date]:
+    # Training weekdays are spaced 7 // n apart, e.g. Mon/Wed/Fri for n=3.
+    step = max(1, 7 // max(1, spec.training_days_per_week))
+    weekdays = set(range(0, 7, step)[: spec.training_days_per_week])
+    days = (spec.start + timedelta(days=i) for i in range(spec.days))
+    return [d for d in days if d.weekday() in weekdays]
+
+
+def generate(spec: DatasetSpec) -> Dataset:
+    """Build every document for ``spec`` in memory."""
+    rng = random.Random(spec.seed)
+    # bcrypt is deliberately slow; hash once and share it across users.
+    hashed_password = get_password_hash(BENCHMARK_PASSWORD)
+    dataset = Dataset(spec=spec)
+    users: dict[str, dict] = {}
+    exercises: dict[str, dict] = {}
+    activities: dict[str, dict] = {}
+
+    users[dataset.superuser_id] = {
+        "email": "bench-admin@example.com",
+        "hashed_password": hashed_password,
+        "full_name": "Benchmark Admin",
+        "is_active": True,
+        "is_superuser": True,
+        "role": "admin",
+        "exercises": [],
+        "activities": [],
+    }
+
+    for t in range(spec.trainers):
+        trainer_id = f"trainer-{t:04d}"
+        dataset.trainer_ids.append(trainer_id)
+        users[trainer_id] = {
+            "email": f"trainer{t}@bench.example.com",
+            "hashed_password": hashed_password,
+            "full_name": f"Trainer {t}",
+            "is_active": True,
+            "is_superuser": False,
+            "role": "trainer",
+            "exercises": [],
+            "activities": [],
+        }
+
+    categories = list(ExerciseCategory)
+    muscle_groups = list(MuscleGroup)
+    difficulties = list(Difficulty)
+    for e in range(spec.exercises):
+        exercise_id = f"exercise-{e:05d}"
+        owner = dataset.trainer_ids[e % len(dataset.trainer_ids)] if dataset.trainer_ids else dataset.superuser_id
+        exercises[exercise_id] = {
+            "title": f"Exercise {e} {rng.choice(muscle_groups).value}",
+            "description": f"Synthetic exercise number {e}",
+            "category": rng.choice(categories).value,
+            "muscle_group": rng.choice(muscle_groups).value,
+            "difficulty": rng.choice(difficulties).value,
+            "reps": rng.randint(5, 15),
+            "sets": rng.randint(2, 5),
+            "duration": rng.choice([None, 30, 60, 300]),
+            "image_url": None,
+            "video_url": None,
+            "is_active": True,
+            "owner_id": owner,
+        }
+
+    exercise_ids = list(exercises)
+    days = _training_days(spec)
+    for c in range(spec.clients):
+        client_id = f"client-{c:05d}"
+        dataset.client_ids.append(client_id)
+
+        client_activity_ids = []
+        for a in range(spec.activities_per_client):
+            activity_id = f"activity-{c:05d}-{a:02d}"
+            client_activity_ids.append(activity_id)
+            activities[activity_id] = {
+                "title": f"Workout {chr(ord('A') + a % 26)} for client {c}",
+                "exercises": rng.sample(exercise_ids, min(spec.exercises_per_activity, len(exercise_ids))),
+                "user_id": client_id,
+            }
+
+        assignments = []
+        performance: dict[str, dict[str, float]] = {}
+        for i, day in enumerate(days):
+            activity_id = client_activity_ids[i % len(client_activity_ids)] if client_activity_ids else None
+            if activity_id is None:
+                break
+            day_str = format_date(day)
+            assignments.append({"id": activity_id, "date": day_str})
+            for exercise_id in activities[activity_id]["exercises"]:
+                series = performance.setdefault(exercise_id, {})
+                previous = series[next(reversed(series))] if series else rng.uniform(10, 60)
+                series[day_str] = round(max(0.0, previous + rng.uniform(-2.0, 3.0)), 1)
+
+        users[client_id] = {
+            "email": f"client{c}@bench.example.com",
+            "hashed_password": hashed_password,
+            "full_name": f"Client {c}",
+            "is_active": True,
+            "is_superuser": False,
+            "role": "user",
+            "exercises": [{"id": eid, "performance": perf} for eid, perf in performance.items()],
+            "activities": assignments,
+            INDEX_FIELD: build_assignment_index(assignments),
+        }
+
+    dataset.collections = {"users": users, "exercises": exercises, "activities": activities}
+    return dataset
+
+
+def seed(client: Any, dataset: Dataset, batch_size: int = 500) -> None:
+    """Write ``dataset`` to ``client`` using batched writes."""
+    batch = client.batch()
+    pending = 0
+    for collection_name, documents in dataset.collections.items():
+        collection_ref = client.collection(collection_name)
+        for doc_id, data in documents.items():
+            batch.set(collection_ref.document(doc_id), data)
+            pending += 1
+            if pending >= batch_size:
+                batch.commit()
+                batch = client.batch()
+                pending = 0
+    if pending:
+        batch.commit()
@@ -0,0 +1,272 @@
+"""
+Endpoint benchmarks against a seeded synthetic gym dataset.
+
+Drives the FastAPI app through its routers (via ``TestClient``) for each
+dataset scale and reports p50/p95/p99 latency, throughput and Firestore
+operations per request, so scaling behaviour can be compared across runs.
+
+Usage:
+    python -m app.benchmarks.endpoints --scales xs,s,m --requests 200 --output bench.json
+    python -m app.benchmarks.endpoints --scales s --compare bench.json
+
+Operation counts come from the ``Server-Timing`` header added by
+``FirestoreTimingMiddleware``. ``--backend memory`` (default) runs fully offline. ``--backend firestore``
+seeds the configured Firestore project with synthetic documents; only use
+it against a disposable project.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from fastapi.testclient import TestClient
+
+from app.benchmarks.dataset import Dataset, DatasetSpec, format_date, generate, seed
+from app.config import settings
+from app.database_engine import get_firestore_client, set_firestore_client
+from app.database_instrumentation import parse_server_timing
+from app.security import create_access_token
+
+
+SCALES: dict[str, DatasetSpec] = {
+    "xs": DatasetSpec(trainers=1, clients=5, exercises=20, days=14),
+    "s": DatasetSpec(trainers=2, clients=20, exercises=50, days=30),
+    "m": DatasetSpec(trainers=5, clients=100, exercises=200, days=90),
+    "l": DatasetSpec(trainers=10, clients=500, exercises=1000, days=365),
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    user_id: str
+    params: Optional[dict[str, Any]] = None
+    json: Any = None
+
+
+# A scenario builds the i-th request to send for a dataset.
+Scenario = Callable[[Dataset, random.Random, int], Request]
+
+API = settings.API_V1_STR
+
+
+def _read_activities(dataset: Dataset, rng: random.Random, i: int) -> Request:
+    return Request(
+        "GET",
+        f"{API}/activities/",
+        rng.choice(dataset.trainer_ids),
+        params={"user_id": rng.choice(dataset.client_ids)},
+    )
+
+
+def _get_exercises_for_day(dataset: Dataset, rng: random.Random, i: int) -> Request:
+    client_id = rng.choice(dataset.client_ids)
+    # Late dates are the worst case for the linear scan over assignments.
+    day = rng.choice(dataset.training_dates()[-7:])
+    return Request("GET", f"{API}/activities/exercises/{client_id}/{day}", client_id)
+
+
+def _assign_activity_to_user(dataset: Dataset, rng: random.Random, i: int) -> Request:
+    client_id = dataset.client_ids[i % len(dataset.client_ids)]
+    activity_id = f"activity-{client_id.split('-', 1)[1]}-00"
+    # Dates past the generated history never collide with existing entries.
+    spec = dataset.spec
+    day = spec.start + timedelta(days=spec.days + i)
+    return Request(
+        "POST",
+        f"{API}/activities/assign/{activity_id}",
+        client_id,
+        params={"date": format_date(day)},
+    )
+
+
+def _activity_calendar(dataset: Dataset, rng: random.Random, i: int) -> Request:
+    client_id = rng.choice(dataset.client_ids)
+    # The last four weeks of history: what a month view loads at once.
+    end = dataset.spec.start + timedelta(days=dataset.spec.days - 1)
+    start = max(dataset.spec.start, end - timedelta(days=27))
+    return Request(
+        "GET",
+        f"{API}/activities/calendar/{client_id}",
+        client_id,
+        params={"from": start.isoformat(), "to": end.isoformat()},
+    )
+
+
+def _read_users(dataset: Dataset, rng: random.Random, i: int) -> Request:
+    return Request("GET", f"{API}/users/", rng.choice(dataset.trainer_ids), params={"limit": 100})
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "read_activities": _read_activities,
+    "get_exercises_for_day": _get_exercises_for_day,
+    "assign_activity_to_user": _assign_activity_to_user,
+    "read_users": _read_users,
+    "activity_calendar": _activity_calendar,
+}
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(
+    client: TestClient,
+    dataset: Dataset,
+    name: str,
+    requests: int,
+    warmup: int = 5,
+) -> dict[str, Any]:
+    scenario = SCENARIOS[name]
+    rng = random.Random(dataset.spec.seed)
+    tokens: dict[str, str] = {}
+
+    def send(i: int) -> tuple[float, int, dict[str, float]]:
+        req = scenario(dataset, rng, i)
+        if req.user_id not in tokens:
+            tokens[req.user_id] = create_access_token(req.user_id, timedelta(hours=1))
+        headers = {"Authorization": f"Bearer {tokens[req.user_id]}"}
+        start = time.perf_counter()
+        response = client.request(req.method, req.path, params=req.params, json=req.json, headers=headers)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code, parse_server_timing(response.headers.get("server-timing", ""))
+
+    for i in range(warmup):
+        send(requests + i)
+
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    ops: Counter = Counter()
+    started = time.perf_counter()
+    for i in range(requests):
+        elapsed, status, request_ops = send(i)
+        latencies.append(elapsed)
+        statuses[status] += 1
+        ops.update(request_ops)
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "scenario": name,
+        "requests": requests,
+        "latency_ms": {
+            "p50": percentile(ms, 50),
+            "p95": percentile(ms, 95),
+            "p99": percentile(ms, 99),
+            "mean": sum(ms) / len(ms) if ms else 0.0,
+            "max": ms[-1] if ms else 0.0,
+        },
+        "throughput_rps": requests / total if total else 0.0,
+        "ops_per_request": {k: v / requests for k, v in sorted(ops.items())} if ops else None,
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def _backend_for(kind: str) -> Any:
+    if kind == "memory":
+        from app.database_memory import MemoryFirestoreClient
+
+        backend = MemoryFirestoreClient()
+        set_firestore_client(backend)
+        return backend
+    return get_firestore_client()
+
+
+def run(
+    scales: list[str],
+    scenarios: list[str],
+    requests: int,
+    backend_kind: str = "memory",
+) -> dict[str, Any]:
+    from app.main import create_app
+
+    # TestClient logs every request through httpx at INFO.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = []
+    for scale in scales:
+        spec = SCALES[scale]
+        dataset = generate(spec)
+        backend = _backend_for(backend_kind)
+        seed(backend, dataset)
+        with TestClient(create_app()) as client:
+            for name in scenarios:
+                result = run_scenario(client, dataset, name, requests)
+                result.update(scale=scale, spec=spec.describe(), documents=dataset.document_count)
+                results.append(result)
+        for result in results[-len(scenarios):]:
+            _print_result(result)
+    return {
+        "benchmark": "endpoints",
+        "created": datetime.now(timezone.utc).isoformat(),
+        "backend": backend_kind,
+        "results": results,
+    }
+
+
+def _print_result(result: dict[str, Any]) -> None:
+    lat = result["latency_ms"]
+    ops = result["ops_per_request"] or {}
+    ops_str = " ".join(f"{k}={v:.1f}" for k, v in ops.items()) or "n/a"
+    print(
+        f"{result['scale']:>3} {result['scenario']:<24} "
+        f"p50={lat['p50']:8.2f}ms p95={lat['p95']:8.2f}ms p99={lat['p99']:8.2f}ms "
+        f"{result['throughput_rps']:8.1f} req/s  ops/req: {ops_str}  status: {result['status_codes']}"
+    )
+
+
+def compare(current: dict[str, Any], previous: dict[str, Any]) -> None:
+    """Print p50/p95 changes against a previous results file."""
+    before = {(r["scale"], r["scenario"]): r for r in previous.get("results", [])}
+    print("\nComparison with previous run (negative is faster):")
+    for result in current["results"]:
+        old = before.get((result["scale"], result["scenario"]))
+        if not old:
+            continue
+        deltas = []
+        for q in ("p50", "p95"):
+            new_v, old_v = result["latency_ms"][q], old["latency_ms"][q]
+            change = (new_v - old_v) / old_v * 100 if old_v else 0.0
+            deltas.append(f"{q} {old_v:.2f} -> {new_v:.2f}ms ({change:+.1f}%)")
+        print(f"{result['scale']:>3} {result['scenario']:<24} " + "  ".join(deltas))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints on synthetic data.")
+    parser.add_argument("--scales", default="xs,s", help=f"comma separated, from {','.join(SCALES)}")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--backend", choices=["memory", "firestore"], default="memory")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    args = parser.parse_args()
+
+    result = run(
+        scales=[s for s in args.scales.split(",") if s],
+        scenarios=[s for s in args.scenarios.split(",") if s],
+        requests=args.requests,
+        backend_kind=args.backend,
+    )
+    if args.compare:
+        compare(result, json.loads(args.compare.read_text()))
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Measure cold-start (import) time of the API.
+
+Each run imports the target module in a fresh interpreter with
+``-X importtime`` and reports the wall time plus the slowest top-level
+imports, so regressions such as eager database connections show up early.
+
+Usage:
+    python -m app.benchmarks.import_time [--module app.main] [--runs 5] [--output results.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int]]:
+    """Return (module, cumulative microseconds) for top-level imports."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        # Nested imports are indented below their parent; keep top-level only.
+        if name.startswith("  "):
+            continue
+        entries.append((name.strip(), int(cumulative_us)))
+    return entries
+
+
+def measure_import(module: str) -> dict[str, Any]:
+    """Import ``module`` once in a subprocess and return timings."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    return {"wall_seconds": wall, "imports": _parse_importtime(proc.stderr)}
+
+
+def run(module: str = "app.main", runs: int = 5, top: int = 10) -> dict[str, Any]:
+    samples = [measure_import(module) for _ in range(runs)]
+    walls = [s["wall_seconds"] for s in samples]
+    slowest = sorted(samples[-1]["imports"], key=lambda e: e[1], reverse=True)[:top]
+    return {
+        "benchmark": "import_time",
+        "module": module,
+        "runs": runs,
+        "wall_seconds": {
+            "min": min(walls),
+            "median": statistics.median(walls),
+            "max": max(walls),
+        },
+        "slowest_imports": [
+            {"module": name, "cumulative_ms": us / 1000} for name, us in slowest
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    result = run(args.module, args.runs, args.top)
+    wall = result["wall_seconds"]
+    print(
+        f"import {result['module']}: median {wall['median'] * 1000:.1f} ms "
+        f"(min {wall['min'] * 1000:.1f}, max {wall['max'] * 1000:.1f}) over {result['runs']} runs"
+    )
+    for entry in result["slowest_imports"]:
+        print(f"  {entry['cumulative_ms']:9.1f} ms  {entry['module']}")
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Recompute the training load of every user for the trainer dashboard.
+
+    python -m app.compute_training_load
+
+Exercises and users are each streamed once; the loads of all users are
+computed together (see app.utils.training_load) and written with batched
+writes, one document per user in ``training_load``. Documents of users that
+no longer exist are deleted in the same batches.
+"""
+import argparse
+import logging
+from datetime import date
+from typing import Any, Optional
+
+from app.database_engine import get_firestore_client
+from app.logging_config import setup_logging
+from app.utils.documents import BatchWriter
+from app.utils.training_load import (
+    TRAINING_LOAD_COLLECTION,
+    LoadColumns,
+    exercise_multipliers,
+    load_documents,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def compute_training_load(session: Any, today: Optional[date] = None) -> int:
+    """
+    Recompute and overwrite the training load documents of all users and
+    delete those of deleted users; returns the number of writes.
+    """
+    today = today or date.today()
+    multipliers = exercise_multipliers(
+        (doc.id, doc.to_dict() or {}) for doc in session.collection("exercises").stream()
+    )
+    columns = LoadColumns(today)
+    # Copied so the dashboard can query a trainer's clients directly
+    profiles = {}
+    for doc in session.collection("users").stream():
+        user_data = doc.to_dict() or {}
+        columns.add_user(doc.id, user_data, multipliers)
+        profiles[doc.id] = {
+            "full_name": user_data.get("full_name"),
+            "email": user_data.get("email"),
+            "trainer_ids": user_data.get("trainer_ids", []),
+        }
+
+    load_ref = session.collection(TRAINING_LOAD_COLLECTION)
+    batch = BatchWriter(session)
+    for user_id, document in load_documents(columns, today):
+        batch.set(load_ref.document(user_id), {**document, **profiles[user_id]})
+    for reference in load_ref.list_documents():
+        if reference.id not in profiles:
+            batch.delete(reference)
+    return batch.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+    setup_logging()
+    count = compute_training_load(get_firestore_client())
+    logger.info("Wrote %d training load documents", count)
+
+
+if __name__ == "__main__":
+    main()
@@ -63,6 +63,62 @@ class Settings(BaseSettings):
     FIREBASE_PROJECT_ID: Union[str, None] = None
     FIREBASE_CREDENTIALS_PATH: Union[str, None] = None
     FIRST_SUPERUSER_ID: str="superuser"
+    # "memory" swaps Firestore for the in-process store in app.database_memory
+    # (offline tests and benchmarks); data is lost when the process exits.
+    FIRESTORE_BACKEND: Literal["firestore", "memory"] = "firestore"
+    # Count Firestore reads/writes per request (Server-Timing header, logs)
+    FIRESTORE_INSTRUMENTATION: bool = True
+    # Merge concurrent identical reads into one backend call
+    # (see app.database_coalescing)
+    FIRESTORE_SINGLE_FLIGHT: bool = True
+
+    # Prometheus-style /metrics endpoint (request counts, latency, Firestore ops)
+    METRICS_ENABLED: bool = True
+    # Shared directory for per-worker snapshots when running several workers;
+    # /metrics then reports the sum over all workers.
+    METRICS_MULTIPROC_DIR: Union[str, None] = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Logging (see app.logging_config); LOG_LEVELS overrides single loggers,
+    # e.g. "app.request=DEBUG,httpx=WARNING".
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    # Share of DEBUG records that are kept (1.0 keeps all)
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0
+
+    # Sampling profiler (see app.profiling). Superusers can always request a
+    # profile; PROFILE_SLOW_REQUEST_MS also profiles every slower request.
+    PROFILING_ENABLED: bool = True
+    PROFILE_SLOW_REQUEST_MS: Union[float, None] = None
+    PROFILE_INTERVAL_MS: float = 5.0
+    # Defaults to <tmp>/gym-api-profiles; oldest files go past PROFILE_MAX_BYTES
+    PROFILE_DIR: Union[str, None] = None
+    PROFILE_MAX_BYTES: int = 50 * 1024 * 1024
+
+    # Tracing (see app.tracing): "file" appends OTLP/JSON to TRACING_FILE,
+    # "otlp" posts to an OTLP/HTTP collector at TRACING_OTLP_ENDPOINT.
+    TRACING_EXPORTER: Literal["none", "file", "otlp"] = "none"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: Union[HttpUrl, None] = None
+    TRACES_SAMPLE_RATE: float = 1.0
+
+    # Per-user progress analytics kept in memory until the next performance
+    # write (see app.utils.progress); the TTL bounds staleness of exercise
+    # details such as reps and sets.
+    PROGRESS_CACHE_SIZE: int = 1024
+    PROGRESS_CACHE_TTL_SECONDS: float = 600.0
+
+    # Exercise search index (see app.utils.exercise_search), built at startup;
+    # exercises written by other workers are picked up at this interval
+    # (0 disables the refresh, e.g. with a single worker).
+    EXERCISE_SEARCH_REFRESH_SECONDS: float = 30.0
+
+    # List query results kept in memory until the next write to their
+    # collection (see app.utils.query_cache); the TTL bounds staleness after
+    # writes made outside the API.
+    QUERY_CACHE_SIZE: int = 2048
+    QUERY_CACHE_TTL_SECONDS: float = 300.0
     
     # PostgreSQL Configuration (Legacy)
     POSTGRES_SERVER: str
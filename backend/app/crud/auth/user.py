@@ -1,8 +1,19 @@
+import logging
 import uuid
 from typing import Any
 
+from google.cloud import firestore
+
 from app.security import get_password_hash, verify_password
 from app.models.user import User, UserCreate, UserUpdate
+from app.utils.assignments import INDEX_FIELD, build_assignment_index
+from app.utils.progress import performance_written
+from app.utils.user_stats import STATS_COLLECTION, build_stats
+
+logger = logging.getLogger(__name__)
+
+# User fields the user_stats document is built from
+STATS_FIELDS = ("exercises", "activities", "full_name", "email")
 
 
 def create_user(*, session: Any, user_create: UserCreate) -> User:
@@ -38,10 +49,21 @@ def update_user(*, session: Any, db_user: User, user_in: UserUpdate) -> User:
     if "date_of_birth" in user_data and user_data["date_of_birth"] is not None:
         user_data["date_of_birth"] = str(user_data["date_of_birth"])
     
+    # Keep the date index in step with a replaced activities list
+    if "activities" in user_data:
+        user_data[INDEX_FIELD] = build_assignment_index(user_data["activities"] or [])
+    
+    # Replaced performance values invalidate the cached progress and charts
+    if "exercises" in user_data:
+        user_data.update(performance_written())
+    
     # Update in Firestore
     users_ref = session.collection("users")
     doc_ref = users_ref.document(db_user.id)
-    doc_ref.update(user_data)
+    if any(field in user_data for field in STATS_FIELDS):
+        _update_with_stats(session, doc_ref, user_data)
+    else:
+        doc_ref.update(user_data)
     
     # Get updated document
     updated_doc = doc_ref.get()
@@ -51,6 +73,20 @@ def update_user(*, session: Any, db_user: User, user_in: UserUpdate) -> User:
     return User(**updated_data)
 
 
+def _update_with_stats(session: Any, doc_ref: Any, user_data: dict) -> None:
+    """Update a user and rebuild its stats document in one transaction."""
+    stats_ref = session.collection(STATS_COLLECTION).document(doc_ref.id)
+
+    @firestore.transactional
+    def apply(transaction) -> None:
+        snapshot = next(transaction.get(doc_ref))
+        updated = {**(snapshot.to_dict() or {}), **user_data}
+        transaction.update(doc_ref, user_data)
+        transaction.set(stats_ref, build_stats(doc_ref.id, updated))
+
+    apply(session.transaction())
+
+
 def get_user_by_email(*, session: Any, email: str) -> User | None:
     """Get user by email from Firestore"""
     # Query the users collection where email equals the given value
@@ -78,24 +114,13 @@ def get_user_by_email(*, session: Any, email: str) -> User | None:
 
 def authenticate(*, session: Any, email: str, password: str) -> User | None:
     """Authenticate user with email and password"""
-    print(f"Authenticating user with email: {email}")
     db_user = get_user_by_email(session=session, email=email)
-    print(f"Retrieved user: {db_user}")
-    
     if not db_user:
-        print("User not found")
+        logger.debug("Login for unknown email")
         return None
-    
-    print(f"Stored hash: {db_user.hashed_password}")
-    print(f"Plain password: {password}")
-    
+
     if not verify_password(password, db_user.hashed_password):
-        print("Password verification failed")
-        # Let's also test what hash we get for this password
-        from app.security import get_password_hash
-        new_hash = get_password_hash(password)
-        print(f"Hash for '{password}' would be: {new_hash}")
+        logger.debug("Password verification failed", extra={"user_id": str(db_user.id)})
         return None
-    
-    print("Password verification successful")
+
     return db_user
\ No newline at end of file
@@ -2,6 +2,7 @@ import uuid
 from typing import Any
 
 from app.models.item import Item, ItemCreate
+from app.utils.query_cache import collection_written
 
 
 def create_item(*, session: Any, item_in: ItemCreate, owner_id: str) -> Item:
@@ -15,6 +16,7 @@ def create_item(*, session: Any, item_in: ItemCreate, owner_id: str) -> Item:
     items_ref = session.collection("items")
     doc_ref = items_ref.document(item_data["id"])
     doc_ref.set(item_data)
+    collection_written(session, "items")
     
     # Return Item object
     return Item(**item_data)
\ No newline at end of file
@@ -1,14 +1,17 @@
-from google.cloud import firestore
+import logging
+
 from sqlmodel import Session
 from datetime import date
 from typing import Optional
 from app.config import settings
 from app.models.user import User, UserCreate
-from app.database_engine import firestore_client
+from app.database_engine import get_firestore_client
 from app.security import get_password_hash
 
 import app.crud.auth.user as crud
 
+logger = logging.getLogger(__name__)
+
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
 # for more details: https://github.com/fastapi/full-stack-fastapi-template/issues/28
@@ -17,6 +20,7 @@ import app.crud.auth.user as crud
 def init_db(session: Session = None) -> None:
     if settings.USE_FIREBASE:
         # Firestore initialization
+        firestore_client = get_firestore_client()
         if not firestore_client:
             raise Exception("Firestore client not initialized")
         
@@ -56,11 +60,7 @@ def init_db(session: Session = None) -> None:
             # Use a fixed document ID for the superuser to prevent duplicates
             superuser_doc_ref = users_ref.document("superuser")
             superuser_doc_ref.set(user_data)
-            print(f"Superuser {settings.FIRST_SUPERUSER} created in Firestore.")
+            logger.info("Superuser created in Firestore", extra={"email": settings.FIRST_SUPERUSER})
         else:
-            print(f"Superuser {settings.FIRST_SUPERUSER} already exists in Firestore.")
-            # Debug: Let's see what superuser documents exist
-            all_superusers = list(query.stream())
-            for doc in all_superusers:
-                print(f"Found superuser doc ID: {doc.id}, hash: {doc.to_dict().get('hashed_password', 'NO_HASH')}")
+            logger.info("Superuser already exists in Firestore", extra={"email": settings.FIRST_SUPERUSER})
    
\ No newline at end of file
@@ -0,0 +1,359 @@
+"""
+Single-flight coalescing of identical Firestore reads.
+
+``get_db`` wraps the shared client in ``CoalescingClient``. Document gets,
+batched ``get_all`` reads and query streams issued while an identical call
+is already in flight (same documents, or same collection, filters, order,
+cursor and limit) wait for that call and share its snapshots instead of
+issuing their own, so dozens of clients opening a newly published activity
+cost one read. Snapshots are shared read-only; ``to_dict`` returns a copy.
+
+Reads only join calls that started after the last write to their collection
+made through this layer: writes bump a per-collection generation that is
+part of every key. Reads inside transactions are never coalesced. Sync
+callers (the thread pool) and async callers (``get_async``) share the same
+flights: the first caller runs the backend call (in an executor thread for
+async callers) and every other caller waits on its future. Calls are
+recorded in ``firestore_single_flight_total`` as issued or coalesced.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from datetime import date, datetime
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+from app.metrics import record_flight
+
+
+class _Unkeyable(Exception):
+    """A query argument with no value-based identity; the read is not coalesced."""
+
+
+def _freeze(value: Any) -> Hashable:
+    if value is None or isinstance(value, (str, int, float, bool, bytes, date, datetime)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    # FieldFilter
+    if all(hasattr(value, name) for name in ("field_path", "op_string", "value")):
+        return ("filter", value.field_path, value.op_string, _freeze(value.value))
+    # Or / And of filters
+    if hasattr(value, "filters") and hasattr(value, "operator"):
+        return ("composite", str(value.operator), _freeze(list(value.filters)))
+    # Snapshot used as a cursor
+    reference = getattr(value, "reference", None)
+    if reference is not None and hasattr(reference, "path"):
+        return ("cursor", reference.path)
+    raise _Unkeyable(type(value).__name__)
+
+
+def _unwrap(value: Any) -> Any:
+    return getattr(value, "_wrapped", value)
+
+
+def _collection_of(path: str) -> str:
+    return path.rsplit("/", 1)[0]
+
+
+class SingleFlight:
+    """Calls in flight by key, and write generations by collection path."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._generations: dict[str, int] = {}
+
+    def generation(self, collection_path: str) -> int:
+        return self._generations.get(collection_path, 0)
+
+    def written(self, collection_paths: Any) -> None:
+        with self._lock:
+            for path in set(collection_paths):
+                self._generations[path] = self._generations.get(path, 0) + 1
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _landed(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def _run(self, key: Hashable, future: Future, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._landed(key, future)
+            future.set_exception(exc)
+            raise
+        self._landed(key, future)
+        future.set_result(result)
+        return result
+
+    def do(self, op: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Result of ``fn``, or of the identical call already in flight."""
+        future, leader = self._join(key)
+        record_flight(op, coalesced=not leader)
+        if leader:
+            return self._run(key, future, fn)
+        return future.result()
+
+    async def do_async(self, op: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """``do`` for the event loop: the backend call runs in a worker thread."""
+        future, leader = self._join(key)
+        record_flight(op, coalesced=not leader)
+        if leader:
+            # On the loop's default executor rather than the AnyIO thread
+            # pool, whose threads may all be sync waiters of this very call;
+            # the call completes there even if the leading task is cancelled
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._run, key, future, fn)
+        return await asyncio.wrap_future(future)
+
+
+flights = SingleFlight()
+
+
+class _Proxy:
+    __slots__ = ("_wrapped",)
+
+    def __init__(self, wrapped: Any) -> None:
+        self._wrapped = wrapped
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._wrapped, name)
+
+    def __eq__(self, other: object) -> bool:
+        return self._wrapped == _unwrap(other)
+
+    def __hash__(self) -> int:
+        return hash(self._wrapped)
+
+
+class CoalescingSnapshot(_Proxy):
+    __slots__ = ()
+
+    @property
+    def reference(self) -> "CoalescingDocumentReference":
+        return CoalescingDocumentReference(self._wrapped.reference)
+
+
+class CoalescingDocumentReference(_Proxy):
+    __slots__ = ()
+
+    def _key(self, field_paths: Any) -> Hashable:
+        path = self._wrapped.path
+        return ("get", path, _freeze(field_paths), flights.generation(_collection_of(path)))
+
+    def get(self, field_paths: Any = None, **kwargs: Any) -> CoalescingSnapshot:
+        if kwargs:
+            # Transactional and other option-carrying reads go straight through
+            return CoalescingSnapshot(self._wrapped.get(field_paths, **kwargs))
+        snapshot = flights.do("get", self._key(field_paths), lambda: self._wrapped.get(field_paths))
+        return CoalescingSnapshot(snapshot)
+
+    async def get_async(self, field_paths: Any = None) -> CoalescingSnapshot:
+        snapshot = await flights.do_async(
+            "get", self._key(field_paths), lambda: self._wrapped.get(field_paths)
+        )
+        return CoalescingSnapshot(snapshot)
+
+    def _write(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return getattr(self._wrapped, method)(*args, **kwargs)
+        finally:
+            flights.written([_collection_of(self._wrapped.path)])
+
+    def set(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("set", *args, **kwargs)
+
+    def create(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("create", *args, **kwargs)
+
+    def update(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("update", *args, **kwargs)
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("delete", *args, **kwargs)
+
+    def collection(self, collection_id: str) -> "CoalescingQuery":
+        return CoalescingQuery(
+            self._wrapped.collection(collection_id), f"{self._wrapped.path}/{collection_id}", ()
+        )
+
+
+class CoalescingQuery(_Proxy):
+    """Wraps collection references and queries alike, remembering how they were built."""
+
+    __slots__ = ("_path", "_chain")
+
+    def __init__(self, wrapped: Any, path: str, chain: tuple) -> None:
+        super().__init__(wrapped)
+        self._path = path
+        self._chain = chain
+
+    def _then(self, method: str, *args: Any, **kwargs: Any) -> "CoalescingQuery":
+        wrapped = getattr(self._wrapped, method)(*(_unwrap(a) for a in args), **kwargs)
+        try:
+            step = (method, _freeze(args), _freeze(kwargs))
+        except _Unkeyable:
+            step = None
+        chain = None if self._chain is None or step is None else (*self._chain, step)
+        return CoalescingQuery(wrapped, self._path, chain)
+
+    def where(self, *args: Any, **kwargs: Any) -> "CoalescingQuery":
+        return self._then("where", *args, **kwargs)
+
+    def order_by(self, *args: Any, **kwargs: Any) -> "CoalescingQuery":
+        return self._then("order_by", *args, **kwargs)
+
+    def offset(self, *args: Any, **kwargs: Any) -> "CoalescingQuery":
+        return self._then("offset", *args, **kwargs)
+
+    def limit(self, *args: Any, **kwargs: Any) -> "CoalescingQuery":
+        return self._then("limit", *args, **kwargs)
+
+    def select(self, *args: Any, **kwargs: Any) -> "CoalescingQuery":
+        return self._then("select", *args, **kwargs)
+
+    def start_after(self, *args: Any, **kwargs: Any) -> "CoalescingQuery":
+        return self._then("start_after", *args, **kwargs)
+
+    def document(self, *args: Any, **kwargs: Any) -> CoalescingDocumentReference:
+        return CoalescingDocumentReference(self._wrapped.document(*args, **kwargs))
+
+    def add(self, *args: Any, **kwargs: Any) -> tuple[Any, CoalescingDocumentReference]:
+        try:
+            write_time, doc_ref = self._wrapped.add(*args, **kwargs)
+        finally:
+            flights.written([self._path])
+        return write_time, CoalescingDocumentReference(doc_ref)
+
+    def _key(self) -> Optional[Hashable]:
+        if self._chain is None:
+            return None
+        return ("query", self._path, self._chain, flights.generation(self._path))
+
+    def stream(self, *args: Any, **kwargs: Any) -> Iterator[CoalescingSnapshot]:
+        key = self._key()
+        if key is None or args or kwargs:
+            snapshots = self._wrapped.stream(*args, **kwargs)
+        else:
+            snapshots = flights.do("query", key, lambda: list(self._wrapped.stream()))
+        for snapshot in snapshots:
+            yield CoalescingSnapshot(snapshot)
+
+    def get(self, *args: Any, **kwargs: Any) -> list[CoalescingSnapshot]:
+        return list(self.stream(*args, **kwargs))
+
+    async def get_async(self) -> list[CoalescingSnapshot]:
+        key = self._key()
+        if key is None:
+            loop = asyncio.get_running_loop()
+            snapshots = await loop.run_in_executor(None, lambda: list(self._wrapped.stream()))
+        else:
+            snapshots = await flights.do_async("query", key, lambda: list(self._wrapped.stream()))
+        return [CoalescingSnapshot(snapshot) for snapshot in snapshots]
+
+
+class CoalescingWriteBatch(_Proxy):
+    """Passes unwrapped references to the batch and bumps generations on commit."""
+
+    __slots__ = ("_collections",)
+
+    def __init__(self, wrapped: Any) -> None:
+        super().__init__(wrapped)
+        self._collections: list[str] = []
+
+    def _queue(self, method: str, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        reference = _unwrap(reference)
+        self._collections.append(_collection_of(reference.path))
+        return getattr(self._wrapped, method)(reference, *args, **kwargs)
+
+    def set(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("set", reference, *args, **kwargs)
+
+    def create(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("create", reference, *args, **kwargs)
+
+    def update(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("update", reference, *args, **kwargs)
+
+    def delete(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("delete", reference, *args, **kwargs)
+
+    def _committed(self) -> None:
+        collections, self._collections = self._collections, []
+        flights.written(collections)
+
+    def commit(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return self._wrapped.commit(*args, **kwargs)
+        finally:
+            self._committed()
+
+
+class CoalescingTransaction(CoalescingWriteBatch):
+    """
+    Usable with ``google.cloud.firestore.transactional``; its reads are
+    never coalesced.
+    """
+
+    __slots__ = ()
+
+    def get(self, ref_or_query: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._wrapped.get(_unwrap(ref_or_query), *args, **kwargs)
+
+    def get_all(self, references: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._wrapped.get_all([_unwrap(r) for r in references], *args, **kwargs)
+
+    def _commit(self) -> Any:
+        try:
+            return self._wrapped._commit()
+        finally:
+            self._committed()
+
+    def _rollback(self) -> Any:
+        self._collections = []
+        return self._wrapped._rollback()
+
+
+class CoalescingClient(_Proxy):
+    """Drop-in wrapper for a Firestore (or in-memory) client."""
+
+    __slots__ = ()
+
+    def collection(self, collection_path: str) -> CoalescingQuery:
+        return CoalescingQuery(self._wrapped.collection(collection_path), collection_path.strip("/"), ())
+
+    def document(self, *args: Any, **kwargs: Any) -> CoalescingDocumentReference:
+        return CoalescingDocumentReference(self._wrapped.document(*args, **kwargs))
+
+    def get_all(self, references: Any, *args: Any, **kwargs: Any) -> Iterator[CoalescingSnapshot]:
+        references = [_unwrap(r) for r in references]
+        if args or kwargs:
+            snapshots = self._wrapped.get_all(references, *args, **kwargs)
+        else:
+            paths = tuple(r.path for r in references)
+            generations = tuple(flights.generation(_collection_of(p)) for p in paths)
+            snapshots = flights.do(
+                "get_all", ("get_all", paths, generations),
+                lambda: list(self._wrapped.get_all(references)),
+            )
+        for snapshot in snapshots:
+            yield CoalescingSnapshot(snapshot)
+
+    def batch(self) -> CoalescingWriteBatch:
+        return CoalescingWriteBatch(self._wrapped.batch())
+
+    def transaction(self, *args: Any, **kwargs: Any) -> CoalescingTransaction:
+        return CoalescingTransaction(self._wrapped.transaction(*args, **kwargs))
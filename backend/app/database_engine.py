@@ -1,20 +1,97 @@
-from google.cloud import firestore
-import os
+import threading
+from typing import Any
+
 from app.config import settings
 
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
+
+# The Firestore client is created lazily on first use instead of at import
+# time, so importing the app (tests, CLI scripts, workers) does not pay the
+# firebase_admin / gRPC start-up cost until a database call is actually made.
+_client: Any = None
+_client_owned = False
+# The firebase_admin app of ``_client`` and whether it was initialized here;
+# firebase_admin caches one Firestore client per app
+_firebase_app: Any = None
+_firebase_app_owned = False
+_client_lock = threading.Lock()
+
+
+def _create_firestore_client() -> Any:
+    """Initialize firebase_admin (if needed) and return a Firestore client."""
+    global _firebase_app, _firebase_app_owned
+    if settings.FIRESTORE_BACKEND == "memory":
+        from app.database_memory import MemoryFirestoreClient
+
+        return MemoryFirestoreClient()
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    if not settings.FIREBASE_CREDENTIALS_PATH:
+        raise RuntimeError("FIREBASE_CREDENTIALS_PATH is not configured")
+
+    try:
+        app, owned = firebase_admin.get_app(), False
+    except ValueError:
+        cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+        app, owned = firebase_admin.initialize_app(cred), True
+    _firebase_app, _firebase_app_owned = app, owned
+    return firestore.client(app)
+
+
+def get_firestore_client() -> Any:
+    """Return the process-wide Firestore client, creating it on first call."""
+    global _client, _client_owned
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_firestore_client()
+                _client_owned = True
+            client = _client
+    return client
+
+
+def set_firestore_client(client: Any) -> None:
+    """Swap the process-wide client, e.g. for an in-memory backend in tests.
+
+    An injected client is owned by the caller and survives
+    ``close_firestore_client``.
+    """
+    global _client, _client_owned
+    with _client_lock:
+        _client = client
+        _client_owned = False
 
 
-print("Connecting to Firebase Firestore")
-# Initialize Firestore client
-if settings.FIREBASE_CREDENTIALS_PATH:
+def close_firestore_client() -> None:
+    """Close and drop a client created by ``get_firestore_client``.
 
-    cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+    A client of the firebase_admin app initialized here is closed and the
+    app deleted, so the next call builds a fresh app and client; a client of
+    an app initialized elsewhere is only dropped, as firebase_admin would
+    hand the same (closed) client back.
+    """
+    global _client, _client_owned, _firebase_app, _firebase_app_owned
+    with _client_lock:
+        if not _client_owned:
+            return
+        client, _client, _client_owned = _client, None, False
+        app, app_owned = _firebase_app, _firebase_app_owned
+        _firebase_app, _firebase_app_owned = None, False
+    if app is not None and not app_owned:
+        return
+    close = getattr(client, "close", None)
+    if callable(close):
+        close()
+    if app is not None:
+        import firebase_admin
 
-    app = firebase_admin.initialize_app(cred)
+        firebase_admin.delete_app(app)
 
-    firestore_client = firestore.client()
-    
 
+def __getattr__(name: str) -> Any:
+    # Backwards compatible ``from app.database_engine import firestore_client``.
+    if name == "firestore_client":
+        return get_firestore_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,390 @@
+"""
+Per-request Firestore operation accounting.
+
+``get_db`` wraps the shared client in ``InstrumentedClient`` which counts
+reads, writes, queries, documents returned and time spent in the backend
+into the current request's ``OpStats``. ``FirestoreTimingMiddleware`` creates
+that ``OpStats`` per request, reports it as a ``Server-Timing`` header and
+logs it as structured fields on the ``app.request`` logger. Each operation
+is also recorded as a ``firestore.<op>`` span when the request is traced.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from app.metrics import record_firestore
+from app.tracing import current_span, record_span
+
+
+logger = logging.getLogger("app.request")
+
+
+class OpStats:
+    """Counters for the Firestore work done on behalf of one request."""
+
+    __slots__ = ("reads", "writes", "queries", "documents", "seconds", "_lock")
+
+    def __init__(self) -> None:
+        self.reads = 0  # documents fetched by key
+        self.writes = 0  # documents written or deleted
+        self.queries = 0  # queries and aggregations run
+        self.documents = 0  # documents returned by queries
+        self.seconds = 0.0  # wall time spent in backend calls
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, reads: int = 0, writes: int = 0, queries: int = 0, documents: int = 0) -> None:
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.queries += queries
+            self.documents += documents
+            self.seconds += seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "reads": self.reads,
+            "writes": self.writes,
+            "queries": self.queries,
+            "documents": self.documents,
+            "ms": round(self.seconds * 1000, 3),
+        }
+
+
+_current_stats: ContextVar[Optional[OpStats]] = ContextVar("firestore_op_stats", default=None)
+
+
+def current_op_stats() -> OpStats:
+    """Stats of the request being served, or a detached instance outside one."""
+    return _current_stats.get() or OpStats()
+
+
+def _unwrap(value: Any) -> Any:
+    return getattr(value, "_wrapped", value)
+
+
+def _collection_of(target: Any) -> str:
+    """Collection id of a document reference, collection or query."""
+    target = _unwrap(target)
+    collection_path = getattr(target, "_collection_path", None)  # in-memory backend
+    if collection_path is not None:
+        return collection_path.rsplit("/", 1)[-1]
+    path = getattr(target, "_path", None) or getattr(getattr(target, "_parent", None), "_path", ())
+    if not path:
+        return ""
+    # Document paths have an even number of segments: (..., collection, id).
+    return path[-2] if len(path) % 2 == 0 else path[-1]
+
+
+def _observe(stats: OpStats, elapsed: float, op: str, target: Any = None, **counts: int) -> None:
+    """Record an operation that just finished after ``elapsed`` seconds in the backend."""
+    stats.record(elapsed, **counts)
+    if current_span() is not None:
+        attributes: dict[str, Any] = {"db.system": "firestore", "db.operation": op}
+        if target is not None:
+            attributes["db.collection"] = _collection_of(target)
+        attributes.update({f"db.firestore.{k}": v for k, v in counts.items() if v})
+        record_span(f"firestore.{op}", int(elapsed * 1e9), attributes)
+
+
+class _Proxy:
+    __slots__ = ("_wrapped", "_stats")
+
+    def __init__(self, wrapped: Any, stats: OpStats) -> None:
+        self._wrapped = wrapped
+        self._stats = stats
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._wrapped, name)
+
+    def __eq__(self, other: object) -> bool:
+        return self._wrapped == _unwrap(other)
+
+    def __hash__(self) -> int:
+        return hash(self._wrapped)
+
+
+class InstrumentedSnapshot(_Proxy):
+    __slots__ = ()
+
+    @property
+    def reference(self) -> "InstrumentedDocumentReference":
+        return InstrumentedDocumentReference(self._wrapped.reference, self._stats)
+
+
+class InstrumentedDocumentReference(_Proxy):
+    __slots__ = ()
+
+    def _write(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return getattr(self._wrapped, method)(*args, **kwargs)
+        finally:
+            _observe(self._stats, time.perf_counter() - start, method, self._wrapped, writes=1)
+
+    def get(self, *args: Any, **kwargs: Any) -> InstrumentedSnapshot:
+        start = time.perf_counter()
+        try:
+            snapshot = self._wrapped.get(*args, **kwargs)
+        finally:
+            _observe(self._stats, time.perf_counter() - start, "get", self._wrapped, reads=1)
+        return InstrumentedSnapshot(snapshot, self._stats)
+
+    def set(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("set", *args, **kwargs)
+
+    def create(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("create", *args, **kwargs)
+
+    def update(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("update", *args, **kwargs)
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        return self._write("delete", *args, **kwargs)
+
+    def collection(self, collection_id: str) -> "InstrumentedQuery":
+        return InstrumentedQuery(self._wrapped.collection(collection_id), self._stats)
+
+
+class InstrumentedAggregation(_Proxy):
+    __slots__ = ("_query",)
+
+    def __init__(self, wrapped: Any, stats: OpStats, query: Any = None) -> None:
+        super().__init__(wrapped, stats)
+        self._query = query
+
+    def get(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._wrapped.get(*args, **kwargs)
+        finally:
+            _observe(self._stats, time.perf_counter() - start, "count", self._query, queries=1)
+
+
+class InstrumentedQuery(_Proxy):
+    """Wraps collection references and queries alike."""
+
+    __slots__ = ()
+
+    def _chain(self, method: str, *args: Any, **kwargs: Any) -> "InstrumentedQuery":
+        return InstrumentedQuery(getattr(self._wrapped, method)(*args, **kwargs), self._stats)
+
+    def where(self, *args: Any, **kwargs: Any) -> "InstrumentedQuery":
+        return self._chain("where", *args, **kwargs)
+
+    def order_by(self, *args: Any, **kwargs: Any) -> "InstrumentedQuery":
+        return self._chain("order_by", *args, **kwargs)
+
+    def offset(self, *args: Any, **kwargs: Any) -> "InstrumentedQuery":
+        return self._chain("offset", *args, **kwargs)
+
+    def limit(self, *args: Any, **kwargs: Any) -> "InstrumentedQuery":
+        return self._chain("limit", *args, **kwargs)
+
+    def select(self, *args: Any, **kwargs: Any) -> "InstrumentedQuery":
+        return self._chain("select", *args, **kwargs)
+
+    def start_after(self, snapshot: Any) -> "InstrumentedQuery":
+        return self._chain("start_after", _unwrap(snapshot))
+
+    def count(self, *args: Any, **kwargs: Any) -> InstrumentedAggregation:
+        return InstrumentedAggregation(self._wrapped.count(*args, **kwargs), self._stats, self._wrapped)
+
+    def document(self, *args: Any, **kwargs: Any) -> InstrumentedDocumentReference:
+        return InstrumentedDocumentReference(self._wrapped.document(*args, **kwargs), self._stats)
+
+    def add(self, *args: Any, **kwargs: Any) -> tuple[Any, InstrumentedDocumentReference]:
+        start = time.perf_counter()
+        try:
+            write_time, doc_ref = self._wrapped.add(*args, **kwargs)
+        finally:
+            _observe(self._stats, time.perf_counter() - start, "add", self._wrapped, writes=1)
+        return write_time, InstrumentedDocumentReference(doc_ref, self._stats)
+
+    def stream(self, *args: Any, **kwargs: Any) -> Iterator[InstrumentedSnapshot]:
+        stats = self._stats
+        start = time.perf_counter()
+        iterator = iter(self._wrapped.stream(*args, **kwargs))
+        elapsed = time.perf_counter() - start
+        returned = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    snapshot = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                returned += 1
+                yield InstrumentedSnapshot(snapshot, stats)
+        finally:
+            _observe(stats, elapsed, "query", self._wrapped, queries=1, documents=returned)
+
+    def get(self, *args: Any, **kwargs: Any) -> list[InstrumentedSnapshot]:
+        return list(self.stream(*args, **kwargs))
+
+
+class InstrumentedWriteBatch(_Proxy):
+    __slots__ = ("_pending",)
+
+    def __init__(self, wrapped: Any, stats: OpStats) -> None:
+        super().__init__(wrapped, stats)
+        self._pending = 0
+
+    def _queue(self, method: str, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        self._pending += 1
+        return getattr(self._wrapped, method)(_unwrap(reference), *args, **kwargs)
+
+    def set(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("set", reference, *args, **kwargs)
+
+    def create(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("create", reference, *args, **kwargs)
+
+    def update(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("update", reference, *args, **kwargs)
+
+    def delete(self, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._queue("delete", reference, *args, **kwargs)
+
+    def commit(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._wrapped.commit(*args, **kwargs)
+        finally:
+            _observe(self._stats, time.perf_counter() - start, "commit", writes=self._pending)
+            self._pending = 0
+
+
+class InstrumentedTransaction(InstrumentedWriteBatch):
+    """
+    Usable with ``google.cloud.firestore.transactional``: private transaction
+    hooks fall through to the wrapped transaction, writes are counted when
+    queued.
+    """
+
+    __slots__ = ()
+
+    def _queue(self, method: str, reference: Any, *args: Any, **kwargs: Any) -> Any:
+        _observe(self._stats, 0.0, f"transaction.{method}", reference, writes=1)
+        return getattr(self._wrapped, method)(_unwrap(reference), *args, **kwargs)
+
+    def get(self, ref_or_query: Any, *args: Any, **kwargs: Any) -> Iterator[InstrumentedSnapshot]:
+        start = time.perf_counter()
+        snapshots = list(self._wrapped.get(_unwrap(ref_or_query), *args, **kwargs))
+        is_query = not hasattr(_unwrap(ref_or_query), "collection")
+        _observe(
+            self._stats,
+            time.perf_counter() - start,
+            "transaction.get",
+            ref_or_query,
+            reads=0 if is_query else len(snapshots),
+            queries=1 if is_query else 0,
+            documents=len(snapshots) if is_query else 0,
+        )
+        return iter([InstrumentedSnapshot(s, self._stats) for s in snapshots])
+
+    def get_all(self, references: Any, *args: Any, **kwargs: Any) -> Iterator[InstrumentedSnapshot]:
+        start = time.perf_counter()
+        snapshots = list(self._wrapped.get_all([_unwrap(r) for r in references], *args, **kwargs))
+        _observe(self._stats, time.perf_counter() - start, "get_all", snapshots[0].reference if snapshots else None, reads=len(snapshots))
+        return iter([InstrumentedSnapshot(s, self._stats) for s in snapshots])
+
+
+class InstrumentedClient(_Proxy):
+    """Drop-in wrapper for a Firestore (or in-memory) client."""
+
+    __slots__ = ()
+
+    def collection(self, *args: Any, **kwargs: Any) -> InstrumentedQuery:
+        return InstrumentedQuery(self._wrapped.collection(*args, **kwargs), self._stats)
+
+    def document(self, *args: Any, **kwargs: Any) -> InstrumentedDocumentReference:
+        return InstrumentedDocumentReference(self._wrapped.document(*args, **kwargs), self._stats)
+
+    def get_all(self, references: Any, *args: Any, **kwargs: Any) -> Iterator[InstrumentedSnapshot]:
+        start = time.perf_counter()
+        snapshots = list(self._wrapped.get_all([_unwrap(r) for r in references], *args, **kwargs))
+        _observe(self._stats, time.perf_counter() - start, "get_all", snapshots[0].reference if snapshots else None, reads=len(snapshots))
+        return iter([InstrumentedSnapshot(s, self._stats) for s in snapshots])
+
+    def batch(self) -> InstrumentedWriteBatch:
+        return InstrumentedWriteBatch(self._wrapped.batch(), self._stats)
+
+    def transaction(self, *args: Any, **kwargs: Any) -> InstrumentedTransaction:
+        return InstrumentedTransaction(self._wrapped.transaction(*args, **kwargs), self._stats)
+
+
+def server_timing(stats: OpStats, total_seconds: float) -> str:
+    desc = f"reads={stats.reads} writes={stats.writes} queries={stats.queries} docs={stats.documents}"
+    return (
+        f'firestore;dur={stats.seconds * 1000:.3f};desc="{desc}", '
+        f"app;dur={total_seconds * 1000:.3f}"
+    )
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """Inverse of ``server_timing``: {"reads": .., "writes": .., "queries": .., "docs": .., "ms": ..}."""
+    ops: dict[str, float] = {}
+    for metric in header.split(","):
+        name, *params = [p.strip() for p in metric.split(";")]
+        if name != "firestore":
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key == "dur":
+                ops["ms"] = float(value)
+            elif key == "desc":
+                for pair in value.strip('"').split():
+                    k, _, v = pair.partition("=")
+                    ops[k] = float(v)
+    return ops
+
+
+class FirestoreTimingMiddleware:
+    """ASGI middleware attaching per-request Firestore stats to the response."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = OpStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", server_timing(stats, time.perf_counter() - start).encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            record_firestore(stats)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "request",
+                    extra={
+                        "method": scope.get("method"),
+                        "path": scope.get("path"),
+                        "status_code": status_code,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                        "firestore": stats.as_dict(),
+                    },
+                )
@@ -0,0 +1,531 @@
+"""
+In-memory implementation of the subset of the Firestore client API used by
+the app, so the API test suite and benchmarks can run offline.
+
+Select it with ``FIRESTORE_BACKEND=memory``. Documents are stored as plain
+dicts and copied on every read and write, like a network round-trip would, so
+callers mutating ``to_dict()`` results cannot corrupt the store.
+"""
+from __future__ import annotations
+
+import itertools
+import random
+import string
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Optional
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+from google.cloud.firestore_v1.base_aggregation import AggregationResult
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+
+
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+
+def _auto_id() -> str:
+    return "".join(random.choices(_AUTO_ID_CHARS, k=20))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _copy(value: Any) -> Any:
+    # Faster than copy.deepcopy for the JSON-like values stored here.
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+_MISSING = object()
+
+
+def _split(field_path: str) -> tuple[str, ...]:
+    # Segments that aren't plain identifiers are quoted: a.`2025-01-06`
+    if "`" in field_path:
+        return FieldPath.from_string(field_path).parts
+    return tuple(field_path.split("."))
+
+
+def _get_field(data: dict, field_path: str) -> Any:
+    value: Any = data
+    for part in _split(field_path):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _apply_transform(current: Any, value: Any) -> Any:
+    if value is transforms.SERVER_TIMESTAMP:
+        return _now()
+    if isinstance(value, transforms.Increment):
+        base = current if isinstance(current, (int, float)) else 0
+        return base + value.value
+    if isinstance(value, transforms.Maximum):
+        return value.value if not isinstance(current, (int, float)) else max(current, value.value)
+    if isinstance(value, transforms.Minimum):
+        return value.value if not isinstance(current, (int, float)) else min(current, value.value)
+    if isinstance(value, transforms.ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if item not in result:
+                result.append(_copy(item))
+        return result
+    if isinstance(value, transforms.ArrayRemove):
+        result = list(current) if isinstance(current, list) else []
+        return [item for item in result if item not in value.values]
+    return _copy(value)
+
+
+def _set_field(data: dict, field_path: str, value: Any) -> None:
+    parts = _split(field_path)
+    target = data
+    for part in parts[:-1]:
+        child = target.get(part)
+        if not isinstance(child, dict):
+            child = {}
+            target[part] = child
+        target = child
+    if value is transforms.DELETE_FIELD:
+        target.pop(parts[-1], None)
+    else:
+        target[parts[-1]] = _apply_transform(target.get(parts[-1]), value)
+
+
+def _merge(target: dict, updates: dict) -> None:
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif value is transforms.DELETE_FIELD:
+            target.pop(key, None)
+        else:
+            target[key] = _apply_transform(target.get(key), value)
+
+
+def _resolve(data: dict) -> dict:
+    # Apply sentinels/transforms found in a plain ``set`` payload.
+    resolved: dict = {}
+    _merge(resolved, data)
+    return resolved
+
+
+def _matches(actual: Any, op: str, expected: Any) -> bool:
+    if op == "==":
+        return actual is not _MISSING and actual == expected
+    if op == "!=":
+        return actual is not _MISSING and actual != expected
+    if op == "in":
+        return actual is not _MISSING and actual in expected
+    if op == "not-in":
+        return actual is not _MISSING and actual not in expected
+    if op == "array_contains":
+        return isinstance(actual, list) and expected in actual
+    if op == "array_contains_any":
+        return isinstance(actual, list) and any(v in actual for v in expected)
+    if actual is _MISSING or actual is None:
+        return False
+    try:
+        if op == "<":
+            return actual < expected
+        if op == "<=":
+            return actual <= expected
+        if op == ">":
+            return actual > expected
+        if op == ">=":
+            return actual >= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class MemoryDocumentSnapshot:
+    def __init__(
+        self,
+        reference: "MemoryDocumentReference",
+        data: Optional[dict],
+        create_time: Optional[datetime] = None,
+        update_time: Optional[datetime] = None,
+    ) -> None:
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = _now()
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return _copy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        if self._data is None:
+            return None
+        value = _get_field(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return _copy(value)
+
+
+class MemoryDocumentReference:
+    def __init__(self, client: "MemoryFirestoreClient", collection_path: str, document_id: str) -> None:
+        self._client = client
+        self._collection_path = collection_path
+        self.id = document_id
+
+    @property
+    def path(self) -> str:
+        return f"{self._collection_path}/{self.id}"
+
+    @property
+    def parent(self) -> "MemoryCollectionReference":
+        return MemoryCollectionReference(self._client, self._collection_path)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MemoryDocumentReference) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def collection(self, collection_id: str) -> "MemoryCollectionReference":
+        return MemoryCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction: Any = None, **kwargs: Any) -> MemoryDocumentSnapshot:
+        return self._client._read(self)
+
+    def create(self, document_data: dict) -> datetime:
+        return self._client._write(self, "create", document_data)
+
+    def set(self, document_data: dict, merge: bool = False) -> datetime:
+        return self._client._write(self, "merge" if merge else "set", document_data)
+
+    def update(self, field_updates: dict, option: Any = None) -> datetime:
+        return self._client._write(self, "update", field_updates)
+
+    def delete(self, option: Any = None) -> datetime:
+        return self._client._write(self, "delete", None)
+
+
+class MemoryAggregationQuery:
+    def __init__(self, query: "MemoryQuery", alias: str) -> None:
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction: Any = None, **kwargs: Any) -> list[list[AggregationResult]]:
+        count = sum(1 for _ in self._query._iter_docs(apply_window=True))
+        return [[AggregationResult(alias=self._alias, value=count, read_time=_now())]]
+
+    def stream(self, transaction: Any = None, **kwargs: Any) -> Iterator[list[AggregationResult]]:
+        yield from self.get()
+
+
+class MemoryQuery:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(
+        self,
+        client: "MemoryFirestoreClient",
+        collection_path: str,
+        filters: tuple = (),
+        orders: tuple = (),
+        offset: int = 0,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+    ) -> None:
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._offset = offset
+        self._limit = limit
+        self._start_after = start_after
+
+    def _copy_with(self, **changes: Any) -> "MemoryQuery":
+        params = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "offset": self._offset,
+            "limit": self._limit,
+            "start_after": self._start_after,
+        }
+        params.update(changes)
+        return MemoryQuery(self._client, self._collection_path, **params)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter: Optional[FieldFilter] = None) -> "MemoryQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        op_string = op_string.replace("-", "_") if op_string.startswith("array") else op_string
+        return self._copy_with(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "MemoryQuery":
+        return self._copy_with(orders=self._orders + ((field_path, direction),))
+
+    def offset(self, num_to_skip: int) -> "MemoryQuery":
+        return self._copy_with(offset=num_to_skip)
+
+    def limit(self, count: int) -> "MemoryQuery":
+        return self._copy_with(limit=count)
+
+    def start_after(self, document_fields_or_snapshot: Any) -> "MemoryQuery":
+        cursor = getattr(document_fields_or_snapshot, "id", None)
+        if cursor is None:
+            raise ValueError("start_after requires a document snapshot")
+        return self._copy_with(start_after=cursor)
+
+    def count(self, alias: Optional[str] = None) -> MemoryAggregationQuery:
+        return MemoryAggregationQuery(self, alias or "field_1")
+
+    def _iter_docs(self, apply_window: bool = True) -> Iterator[MemoryDocumentSnapshot]:
+        rows = self._client._scan(self._collection_path)
+        rows = [
+            (doc_id, entry)
+            for doc_id, entry in rows
+            if all(_matches(_get_field(entry["data"], f), op, v) for f, op, v in self._filters)
+        ]
+        for field_path, direction in reversed(self._orders):
+            rows = [r for r in rows if _get_field(r[1]["data"], field_path) is not _MISSING]
+            rows.sort(
+                key=lambda r: _get_field(r[1]["data"], field_path),
+                reverse=direction == self.DESCENDING,
+            )
+        if self._start_after is not None:
+            ids = [doc_id for doc_id, _ in rows]
+            if self._start_after in ids:
+                rows = rows[ids.index(self._start_after) + 1:]
+        if apply_window:
+            end = None if self._limit is None else self._offset + self._limit
+            rows = rows[self._offset:end]
+        collection = MemoryCollectionReference(self._client, self._collection_path)
+        for doc_id, entry in rows:
+            yield MemoryDocumentSnapshot(
+                collection.document(doc_id),
+                _copy(entry["data"]),
+                entry["create_time"],
+                entry["update_time"],
+            )
+
+    def stream(self, transaction: Any = None, **kwargs: Any) -> Iterator[MemoryDocumentSnapshot]:
+        return self._iter_docs()
+
+    def get(self, transaction: Any = None, **kwargs: Any) -> list[MemoryDocumentSnapshot]:
+        return list(self._iter_docs())
+
+
+class MemoryCollectionReference(MemoryQuery):
+    def __init__(self, client: "MemoryFirestoreClient", collection_path: str) -> None:
+        super().__init__(client, collection_path)
+
+    @property
+    def id(self) -> str:
+        return self._collection_path.rsplit("/", 1)[-1]
+
+    @property
+    def path(self) -> str:
+        return self._collection_path
+
+    def document(self, document_id: Optional[str] = None) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self._client, self._collection_path, document_id or _auto_id())
+
+    def add(self, document_data: dict, document_id: Optional[str] = None) -> tuple[datetime, MemoryDocumentReference]:
+        doc_ref = self.document(document_id)
+        write_time = doc_ref.create(document_data)
+        return write_time, doc_ref
+
+    def list_documents(self, page_size: Optional[int] = None) -> Iterator[MemoryDocumentReference]:
+        for doc_id, _ in self._client._scan(self._collection_path):
+            yield self.document(doc_id)
+
+
+class MemoryWriteBatch:
+    """Collects writes and applies them atomically on ``commit``."""
+
+    def __init__(self, client: "MemoryFirestoreClient") -> None:
+        self._client = client
+        self._writes: list[tuple[MemoryDocumentReference, str, Optional[dict]]] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def create(self, reference: MemoryDocumentReference, document_data: dict) -> None:
+        self._writes.append((reference, "create", _copy(document_data)))
+
+    def set(self, reference: MemoryDocumentReference, document_data: dict, merge: bool = False) -> None:
+        self._writes.append((reference, "merge" if merge else "set", _copy(document_data)))
+
+    def update(self, reference: MemoryDocumentReference, field_updates: dict, option: Any = None) -> None:
+        self._writes.append((reference, "update", _copy(field_updates)))
+
+    def delete(self, reference: MemoryDocumentReference, option: Any = None) -> None:
+        self._writes.append((reference, "delete", None))
+
+    def commit(self, **kwargs: Any) -> list[datetime]:
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+
+class MemoryTransaction(MemoryWriteBatch):
+    """
+    Transaction compatible with ``google.cloud.firestore.transactional``.
+
+    Reads go straight to the store; the client lock is held from the first
+    read until commit or rollback, so transactions are serialized.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, client: "MemoryFirestoreClient", max_attempts: int = 5, read_only: bool = False) -> None:
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id: Optional[bytes] = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    @property
+    def id(self) -> Optional[bytes]:
+        return self._id
+
+    def _clean_up(self) -> None:
+        self._writes = []
+        if self._id is not None:
+            self._id = None
+            self._client._lock.release()
+
+    def _begin(self, retry_id: Optional[bytes] = None) -> None:
+        self._client._lock.acquire()
+        self._id = str(next(self._ids)).encode()
+
+    def _rollback(self) -> None:
+        self._clean_up()
+
+    def _commit(self) -> list[datetime]:
+        try:
+            return self.commit()
+        finally:
+            self._clean_up()
+
+    def get(self, ref_or_query: Any, **kwargs: Any) -> Any:
+        if isinstance(ref_or_query, MemoryDocumentReference):
+            return iter([ref_or_query.get()])
+        return ref_or_query.stream()
+
+    def get_all(self, references: list, **kwargs: Any) -> Iterator[MemoryDocumentSnapshot]:
+        return self._client.get_all(references)
+
+
+class MemoryFirestoreClient:
+    """Thread-safe, process-local stand-in for ``google.cloud.firestore.Client``."""
+
+    def __init__(self, project: str = "memory") -> None:
+        self.project = project
+        # collection path -> document id -> {"data", "create_time", "update_time"}
+        self._collections: dict[str, dict[str, dict]] = {}
+        self._lock = threading.RLock()
+
+    def collection(self, collection_path: str) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self, collection_path.strip("/"))
+
+    def collections(self) -> list[MemoryCollectionReference]:
+        with self._lock:
+            names = [path for path, docs in self._collections.items() if "/" not in path and docs]
+        return [self.collection(name) for name in names]
+
+    def document(self, document_path: str) -> MemoryDocumentReference:
+        collection_path, document_id = document_path.strip("/").rsplit("/", 1)
+        return MemoryDocumentReference(self, collection_path, document_id)
+
+    def get_all(self, references: Iterable[MemoryDocumentReference], field_paths: Any = None, transaction: Any = None, **kwargs: Any) -> Iterator[MemoryDocumentSnapshot]:
+        with self._lock:
+            snapshots = [self._read(ref) for ref in references]
+        yield from snapshots
+
+    def batch(self) -> MemoryWriteBatch:
+        return MemoryWriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False) -> MemoryTransaction:
+        return MemoryTransaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    def close(self) -> None:
+        pass
+
+    def clear(self) -> None:
+        """Drop every document (used to reset state between test sessions)."""
+        with self._lock:
+            self._collections.clear()
+
+    def _scan(self, collection_path: str) -> list[tuple[str, dict]]:
+        with self._lock:
+            return list(self._collections.get(collection_path, {}).items())
+
+    def _read(self, reference: MemoryDocumentReference) -> MemoryDocumentSnapshot:
+        with self._lock:
+            entry = self._collections.get(reference._collection_path, {}).get(reference.id)
+            if entry is None:
+                return MemoryDocumentSnapshot(reference, None)
+            return MemoryDocumentSnapshot(
+                reference, _copy(entry["data"]), entry["create_time"], entry["update_time"]
+            )
+
+    def _write(self, reference: MemoryDocumentReference, kind: str, data: Optional[dict]) -> datetime:
+        return self._commit([(reference, kind, _copy(data))])[0]
+
+    def _commit(self, writes: list[tuple[MemoryDocumentReference, str, Optional[dict]]]) -> list[datetime]:
+        with self._lock:
+            # Validate first so a failing write leaves the store untouched.
+            staged: dict[tuple[str, str], Optional[dict]] = {}
+
+            def current(ref: MemoryDocumentReference) -> Optional[dict]:
+                key = (ref._collection_path, ref.id)
+                if key in staged:
+                    return staged[key]
+                entry = self._collections.get(ref._collection_path, {}).get(ref.id)
+                return None if entry is None else entry["data"]
+
+            for ref, kind, data in writes:
+                existing = current(ref)
+                if kind == "create":
+                    if existing is not None:
+                        raise AlreadyExists(f"Document already exists: {ref.path}")
+                    new = _resolve(data)
+                elif kind == "set":
+                    new = _resolve(data)
+                elif kind == "merge":
+                    new = _copy(existing) if existing is not None else {}
+                    _merge(new, data)
+                elif kind == "update":
+                    if existing is None:
+                        raise NotFound(f"No document to update: {ref.path}")
+                    new = _copy(existing)
+                    for field_path, value in data.items():
+                        _set_field(new, field_path, value)
+                else:
+                    new = None
+                staged[(ref._collection_path, ref.id)] = new
+
+            write_time = _now()
+            for (collection_path, doc_id), data in staged.items():
+                docs = self._collections.setdefault(collection_path, {})
+                if data is None:
+                    docs.pop(doc_id, None)
+                    continue
+                previous = docs.get(doc_id)
+                docs[doc_id] = {
+                    "data": data,
+                    "create_time": previous["create_time"] if previous else write_time,
+                    "update_time": write_time,
+                }
+            return [write_time] * len(writes)
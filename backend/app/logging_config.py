@@ -0,0 +1,164 @@
+"""
+Structured, non-blocking logging.
+
+``setup_logging()`` points the root logger at a ``QueueHandler``: request
+threads only redact, sample and enqueue records, while a ``QueueListener``
+thread formats them (JSON lines or plain text) and writes them out.
+
+Modules keep using ``logging.getLogger(__name__)``. Levels come from
+``LOG_LEVEL`` and ``LOG_LEVELS`` (``"app.request=DEBUG,httpx=WARNING"``);
+``LOG_DEBUG_SAMPLE_RATE`` keeps only a share of DEBUG records.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.config import settings
+
+
+REDACTED = "***"
+
+# Attribute / dict keys whose values are never written out.
+_SECRET_KEY = re.compile(r"pass(word)?|secret|token|authorization|cookie|hash|api_?key", re.IGNORECASE)
+# Secrets embedded in free-form messages: "password=...", "Bearer ...", JWTs.
+_SECRET_TEXT = [
+    (re.compile(r"(?i)\b(password|passwd|secret|token|api_?key)(\s*[=:]\s*)('[^']*'|\"[^\"]*\"|\S+)"), r"\1\2" + REDACTED),
+    (re.compile(r"(?i)\bbearer\s+[\w\-.~+/]+=*"), "Bearer " + REDACTED),
+    (re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]+"), REDACTED),
+    (re.compile(r"\$2[aby]\$\d{2}\$[./\w]{53}"), REDACTED),  # bcrypt hashes
+]
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def redact_text(text: str) -> str:
+    for pattern, replacement in _SECRET_TEXT:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def redact_value(key: str, value: Any) -> Any:
+    if _SECRET_KEY.search(key):
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: redact_value(str(k), v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_value("", v) for v in value]
+    if isinstance(value, str):
+        return redact_text(value)
+    return value
+
+
+class RedactingFilter(logging.Filter):
+    """Masks secrets in the message and in ``extra`` fields, in place."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        redacted = redact_text(message)
+        if redacted != message or record.args:
+            record.msg, record.args = redacted, None
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            setattr(record, key, redact_value(key, getattr(record, key)))
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps a random ``rate`` share of DEBUG records; other levels pass."""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            data[key] = getattr(record, key)
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {key: getattr(record, key) for key in sorted(set(vars(record)) - _RECORD_ATTRS)}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """``"app.request=DEBUG, httpx=WARNING"`` -> ``{"app.request": "DEBUG", ...}``."""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_lock = threading.Lock()
+
+
+def setup_logging(stream: Any = None) -> None:
+    """Install the queue handler and start the writer thread (idempotent)."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _queue_handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+        _queue_handler.addFilter(RedactingFilter())
+
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        for name, level in parse_levels(settings.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = _queue_handler = None
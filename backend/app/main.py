@@ -1,9 +1,19 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 from app.config import settings
+from app.database_engine import close_firestore_client, get_firestore_client
+from app.database_instrumentation import FirestoreTimingMiddleware
+from app.logging_config import setup_logging
+from app.metrics import MetricsMiddleware, SnapshotWriter
+from app.profiling import ProfilingMiddleware
+from app.tracing import TracingMiddleware, shutdown_tracing
+from app.utils.exercise_search import IndexRefresher, build_exercise_index
 #from app.api.auth.login.router import router as login_router
 from app.api.items.item import router as items_router
 from app.api.auth.login import router as login_router
@@ -11,9 +21,39 @@ from app.api.auth.admin import router as admin_router
 from app.api.users.users import router as users_router
 from app.api.exercies.exercise import router as exercises_router
 from app.api.activities.activity import router as activities_router
+from app.api.metrics.metrics import router as metrics_router
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the database client once the server starts (not at import time)
+    # so the first request doesn't pay for it, and release it on shutdown.
+    refresher = None
+    if settings.USE_FIREBASE:
+        client = get_firestore_client()
+        build_exercise_index(client)
+        if settings.EXERCISE_SEARCH_REFRESH_SECONDS > 0:
+            refresher = IndexRefresher(client, settings.EXERCISE_SEARCH_REFRESH_SECONDS)
+            refresher.start()
+    writer = None
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR:
+        writer = SnapshotWriter(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_SECONDS)
+        writer.start()
+    yield
+    if writer is not None:
+        writer.stop()
+    if refresher is not None:
+        refresher.stop()
+    shutdown_tracing()
+    close_firestore_client()
+
 
 def create_app() -> FastAPI:
+    setup_logging()
     app = FastAPI(
+        lifespan=lifespan,
         title="My Cool API",
         version=settings.APP_VERSION,
         openapi_url="/openapi.json" if settings.ENVIRONMENT in {"local", "staging"} else None,
@@ -28,7 +68,18 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],  # This allows ALL methods including OPTIONS
         allow_headers=["*"],
-    )    # Routers
+    )
+    if settings.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)
+    if settings.FIRESTORE_INSTRUMENTATION:
+        app.add_middleware(FirestoreTimingMiddleware)
+    if settings.TRACING_EXPORTER != "none":
+        app.add_middleware(TracingMiddleware)
+    if settings.METRICS_ENABLED:
+        # Added last so it is outermost and also times the other middleware.
+        app.add_middleware(MetricsMiddleware)
+
+    # Routers
     app.include_router(login_router, prefix=f"{settings.API_V1_STR}", tags=["auth"])
     app.include_router(admin_router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
     app.include_router(users_router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
@@ -36,38 +87,37 @@ def create_app() -> FastAPI:
     app.include_router(items_router, prefix=f"{settings.API_V1_STR}/items", tags=["items"])
     app.include_router(exercises_router, prefix=f"{settings.API_V1_STR}/exercises", tags=["exercises"])
     app.include_router(activities_router, prefix=f"{settings.API_V1_STR}/activities", tags=["activities"])
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router)
     
     
 
     # Exception handlers
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
+        logger.exception("Unhandled error", extra={"method": request.method, "path": request.url.path})
         return JSONResponse(
             status_code=500,
             content={"detail": "Internal server error"},
         )
 
-    # Add 422 validation error handler for debugging
     from fastapi.exceptions import RequestValidationError
-    
+
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
-        print(f"=== VALIDATION ERROR DEBUG ===")
-        print(f"URL: {request.url}")
-        print(f"Method: {request.method}")
-        print(f"Headers: {dict(request.headers)}")
-        
-        # Try to get the request body
-        try:
-            body = await request.body()
-            print(f"Request body: {body}")
-        except Exception as e:
-            print(f"Could not read body: {e}")
-            
-        print(f"Validation errors: {exc.errors()}")
-        print(f"Raw errors: {exc}")
-        print("=== END VALIDATION ERROR ===")
-        
+        # Submitted values ("input") may hold passwords; log locations only.
+        logger.info(
+            "Validation error",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "errors": [
+                    {k: v for k, v in error.items() if k not in ("input", "ctx")}
+                    for error in exc.errors()
+                ],
+            },
+        )
+
         return JSONResponse(
             status_code=422,
             content={"detail": exc.errors(), "body": "Validation error"}
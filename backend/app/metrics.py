@@ -0,0 +1,382 @@
+"""
+Low-overhead in-process metrics with Prometheus text exposition.
+
+Metrics live in a process-local ``REGISTRY``. With several workers, set
+``METRICS_MULTIPROC_DIR``: every worker then dumps a JSON snapshot there
+periodically (and the scraped worker right before rendering), and
+``/metrics`` merges all snapshots. Counters and histograms of workers that
+have exited are kept so totals never go backwards; their gauges are dropped.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> list[list[Any]]:
+        with self._lock:
+            return [[list(key), self._copy_value(value)] for key, value in self._values.items()]
+
+    def _copy_value(self, value: Any) -> Any:
+        return value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts + the +Inf bucket, sum.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _copy_value(self, value: Any) -> Any:
+        return {"buckets": list(value[0]), "sum": value[1]}
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Any] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Any) -> None:
+        """Register a callable run before every snapshot (e.g. to set gauges)."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict[str, Any]:
+        for collector in list(self._collectors):
+            collector()
+        return {
+            "pid": os.getpid(),
+            "metrics": {
+                metric.name: {
+                    "type": metric.kind,
+                    "help": metric.documentation,
+                    "labels": list(metric.labelnames),
+                    "buckets": list(getattr(metric, "buckets", ())),
+                    "samples": metric.snapshot(),
+                }
+                for metric in list(self._metrics.values())
+            },
+        }
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests served.", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method",)
+)
+THREADPOOL_BORROWED = REGISTRY.gauge(
+    "threadpool_borrowed_tokens", "Worker threads in use by sync endpoints and dependencies."
+)
+THREADPOOL_TOTAL = REGISTRY.gauge(
+    "threadpool_total_tokens", "Size of the threadpool used for sync endpoints."
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Cache lookups by outcome.", ("cache", "result")
+)
+FIRESTORE_OPS = REGISTRY.counter(
+    "firestore_operations_total", "Firestore operations issued by requests.", ("op",)
+)
+FIRESTORE_SECONDS = REGISTRY.counter(
+    "firestore_seconds_total", "Time spent waiting on Firestore by requests."
+)
+FIRESTORE_FLIGHTS = REGISTRY.counter(
+    "firestore_single_flight_total",
+    "Firestore reads by whether they issued the backend call or joined an identical one in flight.",
+    ("op", "result"),
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_flight(op: str, coalesced: bool) -> None:
+    FIRESTORE_FLIGHTS.inc(op=op, result="coalesced" if coalesced else "issued")
+
+
+def record_firestore(stats: Any) -> None:
+    for op in ("reads", "writes", "queries", "documents"):
+        amount = getattr(stats, op)
+        if amount:
+            FIRESTORE_OPS.inc(amount, op=op)
+    FIRESTORE_SECONDS.inc(stats.seconds)
+
+
+def collect_threadpool() -> None:
+    """Sample the AnyIO default thread limiter; must run on the event loop."""
+    import anyio.to_thread
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_BORROWED.set(limiter.borrowed_tokens)
+    THREADPOOL_TOTAL.set(limiter.total_tokens)
+
+
+# -- multi-worker aggregation ------------------------------------------------
+
+def _snapshot_path(directory: str, pid: int) -> Path:
+    return Path(directory) / f"metrics_{pid}.json"
+
+
+def write_snapshot(directory: str, registry: Registry = REGISTRY) -> None:
+    snapshot = registry.snapshot()
+    path = _snapshot_path(directory, snapshot["pid"])
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(snapshot))
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Sum counters and histograms across workers; sum gauges of live workers."""
+    merged: dict[str, Any] = {}
+    for snapshot in snapshots:
+        alive = snapshot.get("alive", True)
+        for name, metric in snapshot["metrics"].items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["type"] == "histogram":
+                    current = target["samples"].get(key)
+                    if current is None:
+                        target["samples"][key] = {"buckets": list(value["buckets"]), "sum": value["sum"]}
+                    else:
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                else:
+                    target["samples"][key] = target["samples"].get(key, 0.0) + value
+    for metric in merged.values():
+        metric["samples"] = [[list(k), v] for k, v in metric["samples"].items()]
+    return {"metrics": merged}
+
+
+def collect(directory: Optional[str] = None, registry: Registry = REGISTRY) -> dict[str, Any]:
+    """Snapshot of this process, or of every worker when ``directory`` is set."""
+    if not directory:
+        return registry.snapshot()
+    write_snapshot(directory, registry)
+    snapshots = []
+    for path in Path(directory).glob("metrics_*.json"):
+        try:
+            snapshot = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        snapshot["alive"] = _pid_alive(snapshot["pid"])
+        snapshots.append(snapshot)
+    return merge_snapshots(snapshots)
+
+
+class SnapshotWriter:
+    """Background thread dumping this worker's metrics every ``interval`` seconds."""
+
+    def __init__(self, directory: str, interval: float, registry: Registry = REGISTRY) -> None:
+        self.directory = directory
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+
+    def start(self) -> None:
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        write_snapshot(self.directory, self.registry)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                write_snapshot(self.directory, self.registry)
+            except OSError:
+                pass
+
+
+# -- exposition ----------------------------------------------------------------
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"'
+        for n, v in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(snapshot: dict[str, Any]) -> str:
+    """Prometheus text format (version 0.0.4) for a (merged) snapshot."""
+    lines: list[str] = []
+    metrics = snapshot["metrics"]
+    for name in sorted(metrics):
+        metric = metrics[name]
+        labels = metric["labels"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for label_values, value in metric["samples"]:
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels, label_values)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [float("inf")], value["buckets"]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{name}_bucket{_format_labels(labels, label_values, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels, label_values)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels, label_values)} {cumulative}")
+    # Derived ratios are easier to read on a plain scrape.
+    cache = metrics.get("cache_requests_total")
+    if cache and cache["samples"]:
+        totals: dict[str, list[float]] = {}
+        for (cache_name, result), value in cache["samples"]:
+            hit_total = totals.setdefault(cache_name, [0.0, 0.0])
+            hit_total[0] += value if result == "hit" else 0.0
+            hit_total[1] += value
+        lines.append("# HELP cache_hit_ratio Share of cache lookups that were hits.")
+        lines.append("# TYPE cache_hit_ratio gauge")
+        for cache_name, (hits, total) in sorted(totals.items()):
+            lines.append(f'cache_hit_ratio{{cache="{cache_name}"}} {_format_value(hits / total if total else 0.0)}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec(method=method)
+            # Label by route template (not raw path) to bound cardinality.
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=method, route=template)
+            HTTP_REQUESTS.inc(method=method, route=template, status=str(status_code))
@@ -1,8 +1,9 @@
 import uuid
 from enum import Enum
-from typing import Optional
-from pydantic import BaseModel
-from google.cloud.firestore import DocumentReference
+from typing import Annotated, Any, Optional
+from pydantic import BaseModel, Field
+
+from app.models.exercise import ExerciseSummary
 
 
 
@@ -29,14 +30,78 @@ class ActivityUpdate(ActivityBase):
 
 class Activity(ActivityBase):
     id: str = str(uuid.uuid4())
+    exercise_summaries: dict[str, ExerciseSummary] = {}  # by exercise ID
     
 
 
 class ActivityPublic(ActivityBase):
     id: str
+    exercise_summaries: dict[str, ExerciseSummary] = {}  # by exercise ID
     
 
 
 class ActivitiesPublic(BaseModel):
     data: list[ActivityPublic]
     count: int
+
+
+class CalendarAssignment(BaseModel):
+    date: str
+    activity_id: str
+    schedule_id: Optional[str] = None  # set for occurrences of a schedule
+
+
+class ActivityCalendar(BaseModel):
+    user_id: str
+    start: str
+    end: str
+    assignments: list[CalendarAssignment]  # sorted by date
+    activities: dict[str, ActivityPublic]  # each assigned activity once
+    exercises: dict[str, dict[str, Any]]  # each referenced exercise once
+
+
+class Recurrence(BaseModel):
+    start: str  # first day, "Mon Jan 06 2025" or "2025-01-06"
+    end: str  # last day (inclusive)
+    # 0 = Monday ... 6 = Sunday
+    weekdays: list[Annotated[int, Field(ge=0, le=6)]] = Field(min_length=1)
+
+
+class BulkAssignRequest(BaseModel):
+    user_ids: list[str] = Field(min_length=1, max_length=500)
+    dates: list[str] = []
+    recurrence: Optional[Recurrence] = None
+
+
+class BulkAssignTargetResult(BaseModel):
+    user_id: str
+    date: str
+    # assigned | already_assigned | user_not_found | failed
+    status: str
+
+
+class BulkAssignResult(BaseModel):
+    activity_id: str
+    assigned: int
+    results: list[BulkAssignTargetResult]
+
+
+class ScheduleCreate(Recurrence):
+    activity_id: str
+    user_id: str
+
+
+class SchedulePublic(BaseModel):
+    id: str
+    activity_id: str
+    user_id: str
+    weekdays: list[int]
+    start: str  # ISO date
+    end: str  # ISO date (inclusive)
+    cancelled: list[str] = []  # ISO dates of cancelled occurrences
+    occurrences: int
+
+
+class SchedulesPublic(BaseModel):
+    data: list[SchedulePublic]
+    count: int
@@ -2,7 +2,6 @@ import uuid
 from enum import Enum
 from typing import Optional
 from pydantic import BaseModel
-from google.cloud.firestore import DocumentReference
 
 
 class ExerciseCategory(str, Enum):
@@ -48,6 +47,16 @@ class ExerciseBase(BaseModel):
 
 
 
+class ExerciseSummary(BaseModel):
+    # Embedded in activities (see app.utils.exercise_summaries)
+    title: Optional[str] = None
+    category: Optional[ExerciseCategory] = None
+    muscle_group: Optional[MuscleGroup] = None
+    sets: Optional[int] = None
+    reps: Optional[int] = None
+    image_url: Optional[str] = None
+
+
 class ExerciseCreate(ExerciseBase):
     pass
 
@@ -67,6 +76,41 @@ class ExercisePublic(ExerciseBase):
     owner_id: str
 
 
+class ExerciseFacets(BaseModel):
+    category: dict[str, int]
+    muscle_group: dict[str, int]
+    difficulty: dict[str, int]
+
+
 class ExercisesPublic(BaseModel):
     data: list[ExercisePublic]
     count: int
+    facets: Optional[ExerciseFacets] = None
+
+
+class ExerciseSearchHit(ExercisePublic):
+    score: float
+
+
+class ExerciseSearchResults(BaseModel):
+    data: list[ExerciseSearchHit]
+    count: int
+
+
+class SimilarExercise(ExercisePublic):
+    similarity: float
+
+
+class SimilarExercises(BaseModel):
+    data: list[SimilarExercise]
+    count: int
+
+
+class ExerciseUsage(BaseModel):
+    exercise_id: str
+    activity_count: int
+    user_count: int
+    activity_ids: list[str]
+    # False once the exercise is in more activities than are listed
+    activity_ids_complete: bool
+    user_ids: list[str]
@@ -1,7 +1,6 @@
 import uuid
 from typing import Optional
 from pydantic import BaseModel
-from google.cloud.firestore import DocumentReference
 
 
 # Shared properties
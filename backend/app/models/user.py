@@ -1,8 +1,8 @@
 import uuid
 from enum import Enum
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import date
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 # Define possible roles
@@ -103,6 +103,127 @@ class UpdateExercisePerformanceRequest(BaseModel):
     performance: float
 
 
+class BulkExercisePerformanceRequest(BaseModel):
+    entries: List[UpdateExercisePerformanceRequest] = Field(min_length=1, max_length=500)
+
+
+class ExercisePerformanceResult(BaseModel):
+    exercise_id: str
+    date: str
+    performance: Optional[float] = None  # None when invalid, as JSON has no NaN
+    applied: bool
+    # created | updated | unchanged | superseded (a later entry for the same
+    # exercise and date won) | invalid (not a finite number)
+    status: str
+
+
+class BulkExercisePerformanceResult(BaseModel):
+    applied: int
+    results: List[ExercisePerformanceResult]
+
+
+class WeeklyProgress(BaseModel):
+    week_start: str  # ISO date of the Monday
+    average: float
+    delta: Optional[float] = None  # change from the previous week with data
+
+
+class ExerciseProgress(BaseModel):
+    exercise_id: str
+    title: Optional[str] = None
+    data_points: int
+    first_date: str
+    last_date: str
+    latest: float
+    personal_best: float
+    personal_best_date: str
+    rolling_average: float  # over the last `window` entries
+    trend_per_day: Optional[float] = None  # least-squares slope
+    total_volume: float  # sum of performance x reps x sets
+    weekly: List[WeeklyProgress]
+
+
+class UserProgress(BaseModel):
+    user_id: str
+    window: int
+    data_points: int
+    total_volume: float
+    exercises: List[ExerciseProgress]
+
+
+class ChartPoint(BaseModel):
+    date: str  # ISO date
+    value: float
+
+
+class ExerciseChart(BaseModel):
+    user_id: str
+    exercise_id: str
+    method: str  # lttb | minmax
+    total_points: int  # points in the requested range before downsampling
+    points: List[ChartPoint]
+
+
+class PersonalRecord(BaseModel):
+    value: float
+    date: str  # ISO date, the earliest one with that value
+
+
+class UserStats(BaseModel):
+    user_id: str
+    sessions: int  # activity assignments
+    entries: int  # performance values
+    workout_days: int  # logged days with at least one performance value
+    last_workout_date: Optional[str] = None
+    current_streak: int  # consecutive workout days ending on last_workout_date
+    longest_streak: int
+    personal_records: dict[str, PersonalRecord]
+
+
+class RecentRecord(PersonalRecord):
+    exercise_id: str
+
+
+class ClientSummary(BaseModel):
+    user_id: str
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    last_session_date: Optional[str] = None  # last day performance was logged
+    sessions_this_week: int  # planned, assigned or scheduled
+    completed_this_week: int  # planned on days with logged performance
+    planned_last_4_weeks: int
+    completed_last_4_weeks: int
+    current_streak: int
+    recent_records: List[RecentRecord]
+
+
+class TrainerRoster(BaseModel):
+    trainer_id: str
+    week_start: str  # ISO date of this week's Monday
+    count: int
+    clients: List[ClientSummary]
+
+
+class ClientTrainingLoad(BaseModel):
+    user_id: str
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    as_of: str  # ISO date the loads were computed for
+    acute_load: float  # 7-day exponentially weighted daily load
+    chronic_load: float  # 28-day exponentially weighted daily load
+    acwr: Optional[float] = None  # acute:chronic ratio, None without chronic load
+    weekly_load: float
+    monotony: Optional[float] = None  # mean / standard deviation of the last 7 days
+    strain: Optional[float] = None  # weekly load x monotony
+    risk: Optional[Literal["high", "elevated", "low", "optimal"]] = None
+
+
+class TrainingLoadRoster(BaseModel):
+    trainer_id: str
+    count: int
+    clients: List[ClientTrainingLoad]  # highest risk first
+
+
 # Firestore database model
 class User(UserBase):
     id: str = str(uuid.uuid4())
@@ -0,0 +1,289 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+A background thread snapshots the stacks of all threads (``sys._current_frames``)
+every ``PROFILE_INTERVAL_MS`` while at least one profiled request is in
+flight. A request's profile is made of the samples taken between its start
+and end, restricted to stacks that run application code (sync endpoints run
+on threadpool workers, not on the event loop). On a busy worker, concurrent
+requests can therefore show up in the same profile.
+
+Profiles are taken when a superuser sends ``X-Profile: 1`` (or
+``?profile=1``) and, if ``PROFILE_SLOW_REQUEST_MS`` is set, for every request
+slower than that. They are written as speedscope JSON (default) or collapsed
+stacks for flamegraph.pl into ``PROFILE_DIR``, oldest first evicted once the
+directory exceeds ``PROFILE_MAX_BYTES``. The response carries the file name
+in ``X-Profile-Id``; superusers can fetch it under ``/admin/profiles/``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Iterable, Optional
+from urllib.parse import parse_qs
+
+import anyio.to_thread
+import jwt
+
+import app as _app_package
+from app.config import settings
+from app.database_engine import get_firestore_client
+
+
+_APP_DIR = os.path.dirname(os.path.abspath(_app_package.__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+# (function name, file, first line) from the root to the leaf of a stack.
+Frame = tuple[str, str, int]
+Sample = tuple[float, int, tuple[Frame, ...]]
+
+_SAFE_NAME = re.compile(r"^[\w.-]+$")
+FORMATS = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt"}
+
+
+class SamplingProfiler:
+    """Samples every thread's stack while at least one client has acquired it."""
+
+    def __init__(self, interval: float, max_samples: int = 200_000) -> None:
+        self.interval = interval
+        self._samples: deque[Sample] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self._users = 0
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._users += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                self._wake.clear()
+                self._samples.clear()
+
+    def samples_between(self, start: float, end: float) -> list[Sample]:
+        with self._lock:
+            return [s for s in self._samples if start <= s[0] <= end]
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            now = time.monotonic()
+            taken = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _stack(frame)
+                if stack:
+                    taken.append((now, thread_id, stack))
+            with self._lock:
+                if self._users:
+                    self._samples.extend(taken)
+
+
+def _stack(frame: Any) -> Optional[tuple[Frame, ...]]:
+    """Root-to-leaf stack, or None if no application code is on it."""
+    frames = []
+    in_app = False
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            in_app = True
+        frames.append((code.co_name, filename, code.co_firstlineno))
+        frame = frame.f_back
+    if not in_app:
+        return None
+    frames.reverse()
+    return tuple(frames)
+
+
+def to_speedscope(samples: Iterable[Sample], name: str, interval: float) -> str:
+    """Speedscope "sampled" profile, one per thread."""
+    frame_index: dict[Frame, int] = {}
+    by_thread: dict[int, list[list[int]]] = {}
+    for _, thread_id, stack in samples:
+        by_thread.setdefault(thread_id, []).append(
+            [frame_index.setdefault(frame, len(frame_index)) for frame in stack]
+        )
+    profiles = [
+        {
+            "type": "sampled",
+            "name": f"{name} (thread {thread_id})",
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": len(stacks) * interval,
+            "samples": stacks,
+            "weights": [interval] * len(stacks),
+        }
+        for thread_id, stacks in by_thread.items()
+    ]
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "app.profiling",
+        "activeProfileIndex": 0,
+        "shared": {
+            "frames": [
+                {"name": fn, "file": file, "line": line}
+                for (fn, file, line) in frame_index
+            ]
+        },
+        "profiles": profiles,
+    })
+
+
+def to_collapsed(samples: Iterable[Sample]) -> str:
+    """Brendan Gregg's folded stacks (``a;b;c count``) for flamegraph.pl."""
+    counts: dict[str, int] = {}
+    for _, _, stack in samples:
+        key = ";".join(f"{fn} ({os.path.basename(file)}:{line})" for fn, file, line in stack)
+        counts[key] = counts.get(key, 0) + 1
+    return "".join(f"{key} {count}\n" for key, count in sorted(counts.items()))
+
+
+class ProfileStore:
+    """Profile files in one directory, bounded to ``max_bytes`` in total."""
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def save(self, name: str, content: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / name
+        path.write_text(content)
+        self.prune()
+        return path
+
+    def prune(self) -> None:
+        files = sorted(self.list(), key=lambda f: f["created"])
+        total = sum(f["size"] for f in files)
+        for info in files:
+            if total <= self.max_bytes:
+                break
+            (self.directory / info["name"]).unlink(missing_ok=True)
+            total -= info["size"]
+
+    def list(self) -> list[dict[str, Any]]:
+        if not self.directory.is_dir():
+            return []
+        result = []
+        for path in self.directory.iterdir():
+            if path.suffix in (".json", ".txt"):
+                stat = path.stat()
+                result.append({"name": path.name, "size": stat.st_size, "created": stat.st_mtime})
+        return result
+
+    def path(self, name: str) -> Optional[Path]:
+        if not _SAFE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+def get_profile_store() -> ProfileStore:
+    directory = settings.PROFILE_DIR or os.path.join(tempfile.gettempdir(), "gym-api-profiles")
+    return ProfileStore(directory, settings.PROFILE_MAX_BYTES)
+
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000)
+    return _profiler
+
+
+def _is_superuser(authorization: str) -> bool:
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.SECURITY_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return False
+    doc = get_firestore_client().collection("users").document(str(payload.get("sub"))).get()
+    return bool(doc.exists and (doc.to_dict() or {}).get("is_superuser"))
+
+
+def _requested_format(scope: dict) -> Optional[str]:
+    """Profile format asked for by header or query flag, else None."""
+    headers = dict(scope.get("headers") or [])
+    query = parse_qs(scope.get("query_string", b"").decode())
+    flag = headers.get(b"x-profile", b"").decode() or (query.get("profile") or [""])[0]
+    if flag.lower() not in ("1", "true", "yes"):
+        return None
+    requested = headers.get(b"x-profile-format", b"").decode() or (query.get("profile_format") or [""])[0]
+    return requested if requested in FORMATS else "speedscope"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling flagged (superuser) and slow requests."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        fmt = _requested_format(scope)
+        if fmt is not None:
+            authorization = dict(scope.get("headers") or []).get(b"authorization", b"").decode()
+            if not await anyio.to_thread.run_sync(_is_superuser, authorization):
+                fmt = None
+        threshold = settings.PROFILE_SLOW_REQUEST_MS
+        if fmt is None and threshold is None:
+            await self.app(scope, receive, send)
+            return
+
+        profiler = get_profiler()
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{time.monotonic_ns() % 10**9:09d}"
+        filename = name + FORMATS[fmt or "speedscope"]
+
+        async def send_with_id(message: dict) -> None:
+            if fmt is not None and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", filename.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler.acquire()
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            end = time.monotonic()
+            keep = fmt is not None or (end - start) * 1000 >= threshold
+            samples = profiler.samples_between(start, end) if keep else []
+            profiler.release()
+            if keep:
+                title = f"{scope['method']} {scope['path']} {(end - start) * 1000:.1f}ms"
+                content = (
+                    to_collapsed(samples)
+                    if fmt == "collapsed"
+                    else to_speedscope(samples, title, profiler.interval)
+                )
+                await anyio.to_thread.run_sync(get_profile_store().save, filename, content)
@@ -0,0 +1,54 @@
+"""
+Rebuild the exercise_refs reverse index from the activities.
+
+    python -m app.rebuild_exercise_refs
+
+Activities are streamed once and the refs of every exercise they contain
+are written with batched writes; refs of exercises no activity contains
+any more are deleted. Run it once to index activities written before the
+index existed, or to repair it.
+"""
+import argparse
+import logging
+from typing import Any
+
+from app.database_engine import get_firestore_client
+from app.logging_config import setup_logging
+from app.utils.documents import BatchWriter
+from app.utils.exercise_refs import REFS_COLLECTION, add_ref, empty_refs, ref_changes
+
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_exercise_refs(session: Any) -> int:
+    """Overwrite the refs document of every exercise in an activity."""
+    refs: dict[str, dict] = {}
+    for doc in session.collection("activities").stream():
+        _, added = ref_changes(None, doc.to_dict())
+        for exercise_id, user_id in added.items():
+            if exercise_id not in refs:
+                refs[exercise_id] = empty_refs(exercise_id)
+            add_ref(refs[exercise_id], doc.id, user_id)
+
+    refs_collection = session.collection(REFS_COLLECTION)
+    stale = [doc.reference for doc in refs_collection.stream() if doc.id not in refs]
+    batch = BatchWriter(session)
+    for reference in stale:
+        batch.delete(reference)
+    for exercise_id, document in refs.items():
+        batch.set(refs_collection.document(exercise_id), document)
+    batch.commit()
+    return len(refs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+    setup_logging()
+    count = rebuild_exercise_refs(get_firestore_client())
+    logger.info("Rebuilt the refs of %d exercises", count)
+
+
+if __name__ == "__main__":
+    main()
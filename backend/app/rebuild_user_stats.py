@@ -0,0 +1,50 @@
+"""
+Rebuild user_stats documents from the raw user documents.
+
+    python -m app.rebuild_user_stats            # every user
+    python -m app.rebuild_user_stats ID [ID...] # some users
+
+Users are streamed and their stats written with batched writes, so the
+whole collection is rebuilt with one read per user and one write per user.
+"""
+import argparse
+import logging
+from typing import Any, Iterable, Optional
+
+from app.database_engine import get_firestore_client
+from app.logging_config import setup_logging
+from app.utils.documents import BatchWriter, get_documents
+from app.utils.user_stats import STATS_COLLECTION, build_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+def _users(session: Any, user_ids: Optional[list[str]]) -> Iterable[tuple[str, dict]]:
+    if user_ids:
+        yield from get_documents(session, "users", user_ids).items()
+        return
+    for doc in session.collection("users").stream():
+        yield doc.id, doc.to_dict() or {}
+
+
+def rebuild_user_stats(session: Any, user_ids: Optional[list[str]] = None) -> int:
+    """Recompute and overwrite the stats of the given users (default: all)."""
+    stats_ref = session.collection(STATS_COLLECTION)
+    batch = BatchWriter(session)
+    for user_id, user_data in _users(session, user_ids):
+        batch.set(stats_ref.document(user_id), build_stats(user_id, user_data))
+    return batch.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("user_ids", nargs="*", help="users to rebuild (default: all)")
+    args = parser.parse_args()
+    setup_logging()
+    count = rebuild_user_stats(get_firestore_client(), args.user_ids or None)
+    logger.info("Rebuilt stats of %d users", count)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import uuid
 from fastapi.testclient import TestClient
 
 from app.config import settings
+from app.tests.utils.firestore import assert_firestore_budget
 
 
 def test_create_activity(
@@ -314,3 +315,391 @@ def test_delete_activity_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_activity_calendar(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    exercise_ids = []
+    for title in ("Calendar squat", "Calendar row"):
+        r = client.post(
+            f"{settings.API_V1_STR}/exercises/",
+            headers=superuser_token_headers,
+            json={"title": title},
+        )
+        exercise_ids.append(r.json()["id"])
+    activity_ids = []
+    for title in ("Calendar A", "Calendar B"):
+        r = client.post(
+            f"{settings.API_V1_STR}/activities/",
+            headers=superuser_token_headers,
+            json={"title": title, "exercises": exercise_ids, "user_id": "superuser"},
+        )
+        activity_ids.append(r.json()["id"])
+    for activity_id, date in [
+        (activity_ids[0], "Mon Mar 03 2031"),
+        (activity_ids[1], "Wed Mar 05 2031"),
+        (activity_ids[0], "Fri Mar 07 2031"),
+        (activity_ids[1], "Tue Apr 01 2031"),
+    ]:
+        r = client.post(
+            f"{settings.API_V1_STR}/activities/assign/{activity_id}",
+            headers=superuser_token_headers,
+            params={"date": date},
+        )
+        assert r.status_code == 200
+
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/calendar/superuser",
+        headers=superuser_token_headers,
+        params={"from": "2031-03-01", "to": "Mon Mar 31 2031"},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["assignments"] == [
+        {"date": "Mon Mar 03 2031", "activity_id": activity_ids[0]},
+        {"date": "Wed Mar 05 2031", "activity_id": activity_ids[1]},
+        {"date": "Fri Mar 07 2031", "activity_id": activity_ids[0]},
+    ]
+    assert set(content["activities"]) == set(activity_ids)
+    assert set(content["exercises"]) == set(exercise_ids)
+    assert content["exercises"][exercise_ids[0]]["title"] == "Calendar squat"
+
+
+def test_activity_calendar_invalid_range(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/calendar/superuser",
+        headers=superuser_token_headers,
+        params={"from": "2031-03-31", "to": "2031-03-01"},
+    )
+    assert r.status_code == 400
+
+
+def test_activity_calendar_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/calendar/superuser",
+        headers=normal_user_token_headers,
+        params={"from": "2031-03-01", "to": "2031-03-31"},
+    )
+    assert r.status_code == 400
+
+
+def _create_assignable_activity(client: TestClient, headers: dict[str, str], title: str) -> str:
+    r = client.post(
+        f"{settings.API_V1_STR}/exercises/", headers=headers, json={"title": f"{title} exercise"}
+    )
+    exercise_id = r.json()["id"]
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=headers,
+        json={"title": title, "exercises": [exercise_id], "user_id": "superuser"},
+    )
+    return r.json()["id"]
+
+
+def test_multiple_activities_per_day(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    first = _create_assignable_activity(client, superuser_token_headers, "Morning")
+    second = _create_assignable_activity(client, superuser_token_headers, "Evening")
+    day = "Thu Jun 05 2031"
+    for activity_id in (first, second):
+        r = client.post(
+            f"{settings.API_V1_STR}/activities/assign/{activity_id}",
+            headers=superuser_token_headers,
+            params={"date": day},
+        )
+        assert r.status_code == 200
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/assign/{first}",
+        headers=superuser_token_headers,
+        params={"date": day},
+    )
+    assert r.status_code == 400
+
+    # ISO dates resolve to the same day
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/exercises/superuser/2031-06-05",
+        headers=superuser_token_headers,
+    )
+    content = r.json()
+    assert [a["id"] for a in content["activities"]] == [first, second]
+    assert content["activity"]["id"] == first
+    assert content["exercises_count"] == 2
+
+    r = client.put(
+        f"{settings.API_V1_STR}/activities/assign/{second}",
+        headers=superuser_token_headers,
+        params={"old_date": day, "new_date": "Fri Jun 06 2031"},
+    )
+    assert r.status_code == 200
+    r = client.delete(
+        f"{settings.API_V1_STR}/activities/unassign/{first}",
+        headers=superuser_token_headers,
+        params={"date": day},
+    )
+    assert r.status_code == 200
+
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/exercises/superuser/{day}",
+        headers=superuser_token_headers,
+    )
+    assert r.json()["activities"] == []
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers
+    )
+    assignments = [a for a in r.json()["activities"] if a["id"] in (first, second)]
+    assert assignments == [{"id": second, "date": "Fri Jun 06 2031"}]
+
+
+def test_bulk_assign_activity(
+    client: TestClient, superuser_token_headers: dict[str, str], normal_user_token_headers: dict[str, str]
+) -> None:
+    activity_id = _create_assignable_activity(client, superuser_token_headers, "Bulk program")
+    normal_user_id = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()["id"]
+    url = f"{settings.API_V1_STR}/activities/assign/{activity_id}/bulk"
+
+    r = client.post(
+        url,
+        headers=superuser_token_headers,
+        json={"user_ids": ["superuser"], "dates": ["Mon Sep 01 2031"]},
+    )
+    assert r.json()["assigned"] == 1
+
+    r = client.post(
+        url,
+        headers=superuser_token_headers,
+        json={
+            "user_ids": ["superuser", normal_user_id, "missing-user"],
+            # Mondays and Wednesdays: Sep 01, 03, 08, 10
+            "recurrence": {"start": "2031-09-01", "end": "2031-09-10", "weekdays": [0, 2]},
+        },
+    )
+    assert r.status_code == 200
+    content = r.json()
+    statuses = {(t["user_id"], t["date"]): t["status"] for t in content["results"]}
+    assert statuses[("superuser", "Mon Sep 01 2031")] == "already_assigned"
+    assert statuses[("superuser", "Wed Sep 10 2031")] == "assigned"
+    assert statuses[(normal_user_id, "Mon Sep 08 2031")] == "assigned"
+    assert statuses[("missing-user", "Mon Sep 01 2031")] == "user_not_found"
+    assert content["assigned"] == 7
+
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/calendar/{normal_user_id}",
+        headers=normal_user_token_headers,
+        params={"from": "2031-09-01", "to": "2031-09-30"},
+    )
+    assert [a["date"] for a in r.json()["assignments"]] == [
+        "Mon Sep 01 2031", "Wed Sep 03 2031", "Mon Sep 08 2031", "Wed Sep 10 2031",
+    ]
+
+
+def test_bulk_assign_activity_trainers_only(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/assign/whatever/bulk",
+        headers=normal_user_token_headers,
+        json={"user_ids": ["superuser"], "dates": ["Mon Sep 01 2031"]},
+    )
+    assert r.status_code == 403
+
+
+def test_bulk_assign_activity_rejects_invalid_weekdays(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/assign/whatever/bulk",
+        headers=superuser_token_headers,
+        json={
+            "user_ids": ["superuser"],
+            "recurrence": {"start": "2031-09-01", "end": "2031-09-10", "weekdays": [9]},
+        },
+    )
+    assert r.status_code == 422
+
+
+def test_schedule_expanded_at_read_time(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    activity_id = _create_assignable_activity(client, superuser_token_headers, "Scheduled")
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/schedules",
+        headers=superuser_token_headers,
+        json={
+            "activity_id": activity_id,
+            "user_id": "superuser",
+            # Tuesdays and Thursdays: Nov 02, 04, 09, 11
+            "start": "Mon Nov 01 2032",
+            "end": "2032-11-14",
+            "weekdays": [1, 3],
+        },
+    )
+    assert r.status_code == 200
+    schedule = r.json()
+    assert schedule["start"] == "2032-11-01"
+    assert schedule["occurrences"] == 4
+
+    def calendar() -> list[dict]:
+        r = client.get(
+            f"{settings.API_V1_STR}/activities/calendar/superuser",
+            headers=superuser_token_headers,
+            params={"from": "2032-11-01", "to": "2032-11-14"},
+        )
+        return [a for a in r.json()["assignments"] if a["activity_id"] == activity_id]
+
+    assert [a["date"] for a in calendar()] == [
+        "Tue Nov 02 2032", "Thu Nov 04 2032", "Tue Nov 09 2032", "Thu Nov 11 2032",
+    ]
+    assert all(a["schedule_id"] == schedule["id"] for a in calendar())
+
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/exercises/superuser/Thu Nov 04 2032",
+        headers=superuser_token_headers,
+    )
+    assert r.json()["activity"]["id"] == activity_id
+
+    # Nothing is stored per occurrence until performance is logged
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers)
+    assert not [a for a in r.json()["activities"] if a["id"] == activity_id]
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/activities/unassign/{activity_id}",
+        headers=superuser_token_headers,
+        params={"date": "Tue Nov 02 2032"},
+    )
+    assert r.status_code == 200
+    exercise_id = client.get(
+        f"{settings.API_V1_STR}/activities/{activity_id}", headers=superuser_token_headers
+    ).json()["exercises"][0]
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance",
+        headers=superuser_token_headers,
+        json={"exercise_id": exercise_id, "date": "Thu Nov 04 2032", "performance": 42.5},
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers)
+    assert [a for a in r.json()["activities"] if a["id"] == activity_id] == [
+        {"id": activity_id, "date": "Thu Nov 04 2032"}
+    ]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/schedules/superuser", headers=superuser_token_headers
+    )
+    assert schedule["id"] in [s["id"] for s in r.json()["data"]]
+    r = client.delete(
+        f"{settings.API_V1_STR}/activities/schedules/superuser/{schedule['id']}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    # Only the occurrence with logged performance is left
+    assert calendar() == [
+        {"date": "Thu Nov 04 2032", "activity_id": activity_id}
+    ]
+
+
+def test_create_schedule_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/schedules",
+        headers=normal_user_token_headers,
+        json={
+            "activity_id": "whatever",
+            "user_id": "superuser",
+            "start": "2032-11-01",
+            "end": "2032-11-14",
+            "weekdays": [0],
+        },
+    )
+    assert r.status_code == 403
+
+
+def test_activity_embeds_exercise_summaries(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    def create_exercise(title: str) -> str:
+        r = client.post(
+            f"{settings.API_V1_STR}/exercises/",
+            headers=superuser_token_headers,
+            json={"title": title, "category": "strength", "muscle_group": "legs", "sets": 4, "reps": 8},
+        )
+        return r.json()["id"]
+
+    squat, lunge, row = create_exercise("Summary squat"), create_exercise("Summary lunge"), create_exercise("Summary row")
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=superuser_token_headers,
+        json={"title": "Summaries", "exercises": [squat, lunge], "user_id": "superuser"},
+    )
+    assert r.status_code == 200
+    activity = r.json()
+    assert activity["exercise_summaries"][squat] == {
+        "title": "Summary squat", "category": "strength", "muscle_group": "legs",
+        "sets": 4, "reps": 8, "image_url": None,
+    }
+
+    client.post(f"{settings.API_V1_STR}/activities/{activity['id']}/exercises/{row}", headers=superuser_token_headers)
+    r = client.delete(f"{settings.API_V1_STR}/activities/{activity['id']}/exercises/{lunge}", headers=superuser_token_headers)
+    assert set(r.json()["exercise_summaries"]) == {squat, row}
+
+    # Renaming an exercise reaches every activity containing it
+    client.put(f"{settings.API_V1_STR}/exercises/{squat}", headers=superuser_token_headers, json={"title": "Summary back squat"})
+    r = client.get(f"{settings.API_V1_STR}/activities/{activity['id']}", headers=superuser_token_headers)
+    assert r.json()["exercise_summaries"][squat]["title"] == "Summary back squat"
+
+    r = client.put(
+        f"{settings.API_V1_STR}/activities/{activity['id']}",
+        headers=superuser_token_headers,
+        json={"exercises": [row, lunge], "user_id": "superuser"},
+    )
+    assert set(r.json()["exercise_summaries"]) == {row, lunge}
+
+    # The day view can render from the summaries alone
+    day = "Tue Jul 01 2031"
+    client.post(
+        f"{settings.API_V1_STR}/activities/assign/{activity['id']}",
+        headers=superuser_token_headers,
+        params={"date": day},
+    )
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/exercises/superuser/{day}",
+        headers=superuser_token_headers,
+        params={"summary": True},
+    )
+    assert [(e["id"], e["title"]) for e in r.json()["exercises"]] == [(row, "Summary row"), (lunge, "Summary lunge")]
+    assert_firestore_budget(r, reads=3, writes=0, queries=0)
+
+
+def test_backfill_exercise_summaries() -> None:
+    from app.backfill_exercise_summaries import backfill_exercise_summaries
+    from app.database_memory import MemoryFirestoreClient
+
+    store = MemoryFirestoreClient()
+    store.collection("exercises").document("squat").set({"title": "Squat", "reps": 5})
+    store.collection("activities").document("old").set({"title": "Old", "exercises": ["squat", "gone"], "user_id": "u"})
+    store.collection("activities").document("empty").set({"title": "Empty", "exercises": [], "user_id": "u"})
+    assert backfill_exercise_summaries(store) == 1
+    summaries = store.collection("activities").document("old").get().to_dict()["exercise_summaries"]
+    assert list(summaries) == ["squat"] and summaries["squat"]["title"] == "Squat"
+    assert backfill_exercise_summaries(store) == 0
+
+
+def test_rebuild_exercise_refs() -> None:
+    from app.database_memory import MemoryFirestoreClient
+    from app.rebuild_exercise_refs import rebuild_exercise_refs
+
+    store = MemoryFirestoreClient()
+    store.collection("activities").document("a1").set({"exercises": ["squat", "row"], "user_id": "u1"})
+    store.collection("activities").document("a2").set({"exercises": ["squat"], "user_id": "u2"})
+    store.collection("exercise_refs").document("gone").set({"activity_count": 1})
+    assert rebuild_exercise_refs(store) == 2
+    squat = store.collection("exercise_refs").document("squat").get().to_dict()
+    assert squat["activity_ids"] == ["a1", "a2"] and squat["users"] == {"u1": 1, "u2": 1}
+    assert not store.collection("exercise_refs").document("gone").get().exists
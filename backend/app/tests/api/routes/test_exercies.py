@@ -357,3 +357,225 @@ def test_delete_exercise_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_search_exercises(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    title = f"Zercher {uuid.uuid4().hex[:8]} squat"
+    create_response = client.post(
+        f"{settings.API_V1_STR}/exercises/",
+        headers=superuser_token_headers,
+        json={"title": title, "description": "Bar in the crook of the elbows"},
+    )
+    assert create_response.status_code == 200
+    exercise_id = create_response.json()["id"]
+
+    # Typo in the first word, prefix for the last one
+    response = client.get(
+        f"{settings.API_V1_STR}/exercises/search",
+        headers=superuser_token_headers,
+        params={"q": "zecher squ"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] >= 1
+    assert content["data"][0]["id"] == exercise_id
+    assert content["data"][0]["title"] == title
+    assert content["data"][0]["score"] > 0
+
+    # Updates and soft deletes are reflected right away
+    client.put(
+        f"{settings.API_V1_STR}/exercises/{exercise_id}",
+        headers=superuser_token_headers,
+        json={"title": "Anderson squat"},
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/exercises/search",
+        headers=superuser_token_headers,
+        params={"q": "zercher"},
+    )
+    assert exercise_id not in [hit["id"] for hit in response.json()["data"]]
+    client.delete(
+        f"{settings.API_V1_STR}/exercises/{exercise_id}",
+        headers=superuser_token_headers,
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/exercises/search",
+        headers=superuser_token_headers,
+        params={"q": "anderson"},
+    )
+    assert exercise_id not in [hit["id"] for hit in response.json()["data"]]
+
+
+def test_search_exercises_only_own(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    word = f"landmine{uuid.uuid4().hex[:8]}"
+    for headers in (superuser_token_headers, normal_user_token_headers):
+        client.post(
+            f"{settings.API_V1_STR}/exercises/",
+            headers=headers,
+            json={"title": f"{word} press"},
+        )
+    response = client.get(
+        f"{settings.API_V1_STR}/exercises/search",
+        headers=normal_user_token_headers,
+        params={"q": word},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == 1
+    response = client.get(
+        f"{settings.API_V1_STR}/exercises/search",
+        headers=superuser_token_headers,
+        params={"q": word},
+    )
+    assert response.json()["count"] == 2
+
+
+def test_read_exercises_filters_and_facets(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/exercises/", headers=normal_user_token_headers)
+    before = r.json()["facets"]
+    for category, muscle_group, difficulty in [
+        ("strength", "legs", "hard"),
+        ("strength", "legs", "easy"),
+        ("cardio", "legs", "hard"),
+    ]:
+        client.post(
+            f"{settings.API_V1_STR}/exercises/",
+            headers=normal_user_token_headers,
+            json={
+                "title": f"Facet {category} {difficulty}",
+                "category": category,
+                "muscle_group": muscle_group,
+                "difficulty": difficulty,
+            },
+        )
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/",
+        headers=normal_user_token_headers,
+        params={"category": "strength", "muscle_group": "legs", "difficulty": "hard"},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["count"] == len(content["data"])
+    assert all(
+        (e["category"], e["muscle_group"], e["difficulty"]) == ("strength", "legs", "hard")
+        for e in content["data"]
+    )
+    facets = content["facets"]
+    assert facets["difficulty"]["easy"] == before["difficulty"]["easy"] + 1
+    assert facets["category"]["cardio"] == before["category"]["cardio"] + 1
+
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/",
+        headers=normal_user_token_headers,
+        params={"category": "yoga"},
+    )
+    assert r.status_code == 422
+
+
+def test_read_similar_exercises(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    word = f"hack{uuid.uuid4().hex[:8]}"
+    ids = []
+    for title, category, muscle_group in [
+        (f"{word} squat", "strength", "legs"),
+        (f"{word} squat pause", "strength", "legs"),
+        (f"{word} stretch", "flexibility", "back"),
+    ]:
+        r = client.post(
+            f"{settings.API_V1_STR}/exercises/",
+            headers=normal_user_token_headers,
+            json={"title": title, "category": category, "muscle_group": muscle_group, "difficulty": "medium"},
+        )
+        ids.append(r.json()["id"])
+
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/{ids[0]}/similar",
+        headers=normal_user_token_headers,
+        params={"limit": 2},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert [e["id"] for e in content["data"]] == ids[1:]
+    assert content["data"][0]["similarity"] > content["data"][1]["similarity"]
+
+    # Deactivated exercises are no longer suggested
+    client.delete(f"{settings.API_V1_STR}/exercises/{ids[1]}", headers=normal_user_token_headers)
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/{ids[0]}/similar",
+        headers=normal_user_token_headers,
+    )
+    assert ids[1] not in [e["id"] for e in r.json()["data"]]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/{ids[1]}/similar",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 404
+
+    superuser_exercise = client.post(
+        f"{settings.API_V1_STR}/exercises/",
+        headers=superuser_token_headers,
+        json={"title": f"{word} press"},
+    ).json()
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/{superuser_exercise['id']}/similar",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 400
+
+
+def test_exercise_usage(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    exercise = client.post(
+        f"{settings.API_V1_STR}/exercises/",
+        headers=superuser_token_headers,
+        json={"title": "Usage deadlift"},
+    ).json()
+    url = f"{settings.API_V1_STR}/exercises/{exercise['id']}"
+    activity_ids = [
+        client.post(
+            f"{settings.API_V1_STR}/activities/",
+            headers=superuser_token_headers,
+            json={"title": "Usage", "exercises": [exercise["id"]], "user_id": user_id},
+        ).json()["id"]
+        for user_id in ["usage-a", "usage-a", "usage-b"]
+    ]
+
+    r = client.get(f"{url}/usage", headers=superuser_token_headers)
+    assert r.status_code == 200
+    usage = r.json()
+    assert usage["activity_count"] == 3 and usage["user_count"] == 2
+    assert sorted(usage["activity_ids"]) == sorted(activity_ids)
+    assert sorted(usage["user_ids"]) == ["usage-a", "usage-b"]
+
+    # Moving an activity to another user and dropping the exercise elsewhere
+    client.put(
+        f"{settings.API_V1_STR}/activities/{activity_ids[2]}",
+        headers=superuser_token_headers,
+        json={"user_id": "usage-a"},
+    )
+    client.delete(
+        f"{settings.API_V1_STR}/activities/{activity_ids[0]}/exercises/{exercise['id']}",
+        headers=superuser_token_headers,
+    )
+    usage = client.get(f"{url}/usage", headers=superuser_token_headers).json()
+    assert usage["activity_count"] == 2 and usage["user_ids"] == ["usage-a"]
+
+    client.delete(f"{settings.API_V1_STR}/activities/{activity_ids[1]}", headers=superuser_token_headers)
+    usage = client.get(f"{url}/usage", headers=superuser_token_headers).json()
+    assert usage["activity_ids"] == [activity_ids[2]]
+
+    # Deleting an exercise still in an activity works as before
+    r = client.delete(url, headers=superuser_token_headers)
+    assert r.status_code == 200
@@ -0,0 +1,105 @@
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.tests.utils.firestore import assert_firestore_budget, firestore_ops
+
+
+def test_server_timing_header(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert "firestore;dur=" in r.headers["server-timing"]
+    ops = firestore_ops(r)
+    # get_current_user reads the user document by id
+    assert ops["reads"] == 1
+    assert ops["writes"] == 0
+
+
+def test_read_user_me_budget(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    assert r.status_code == 200
+    assert_firestore_budget(r, reads=1, writes=0, queries=0)
+
+
+def test_create_exercise_budget(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/exercises/",
+        headers=superuser_token_headers,
+        json={"title": "Budget squat"},
+    )
+    assert r.status_code == 200
+    # The exercise and the exercises collection version
+    assert_firestore_budget(r, reads=2, writes=2, queries=0)
+
+
+def test_read_activity_budget(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=superuser_token_headers,
+        json={"title": "Budget", "exercises": [], "user_id": "budget-user"},
+    )
+    assert r.status_code == 200
+    r = client.get(
+        f"{settings.API_V1_STR}/activities/{r.json()['id']}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert_firestore_budget(r, reads=2, writes=0, queries=0)
+
+
+def test_read_exercises_budget(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/exercises/?limit=1"
+    client.post(f"{settings.API_V1_STR}/exercises/", headers=superuser_token_headers, json={"title": "Budget row"})
+    r = client.get(url, headers=superuser_token_headers)
+    assert r.status_code == 200
+    # The collection version and one page query; the count comes from the
+    # exercise index.
+    assert_firestore_budget(r, reads=2, writes=0, queries=1)
+    # The same page again is served from the query cache
+    r = client.get(url, headers=superuser_token_headers)
+    assert_firestore_budget(r, reads=2, writes=0, queries=0)
+
+
+def test_bulk_performance_budget(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    entries = [
+        {"exercise_id": f"budget-{i}", "date": "Mon Jan 06 2031", "performance": i}
+        for i in range(10)
+    ]
+    url = f"{settings.API_V1_STR}/users/me/exercise-performance/bulk"
+    # The first write may build the user_stats document from the user document
+    client.patch(url, headers=normal_user_token_headers, json={"entries": entries[:1]})
+    r = client.patch(url, headers=normal_user_token_headers, json={"entries": entries})
+    assert r.status_code == 200
+    # get_current_user plus one transactional read, one write for all entries,
+    # and one read and one write of the user_stats document
+    assert_firestore_budget(r, reads=3, writes=2, queries=0)
+
+
+def test_read_activities_cached_until_write(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/activities/"
+    params = {"user_id": "cached-user"}
+    client.post(url, headers=superuser_token_headers, json={"title": "Cached", "exercises": [], "user_id": "cached-user"})
+    r = client.get(url, headers=superuser_token_headers, params=params)
+    assert r.json()["count"] == 1
+    r = client.get(url, headers=superuser_token_headers, params=params)
+    assert r.json()["count"] == 1
+    assert_firestore_budget(r, reads=2, writes=0, queries=0)
+
+    # A write makes the next read miss
+    client.post(url, headers=superuser_token_headers, json={"title": "Cached", "exercises": [], "user_id": "cached-user"})
+    r = client.get(url, headers=superuser_token_headers, params=params)
+    assert r.json()["count"] == 2
+    assert firestore_ops(r)["queries"] == 2
@@ -0,0 +1,37 @@
+from fastapi.testclient import TestClient
+
+from app.config import settings
+
+
+def _sample(body: str, prefix: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_exposition(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers)
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = r.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    # Labelled by route template rather than the raw path.
+    assert 'route="/api/v1/users/me"' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/users/me",le="+Inf"}' in body
+    assert "threadpool_total_tokens" in body
+    assert _sample(body, 'firestore_operations_total{op="reads"}') >= 1
+
+
+def test_metrics_count_requests(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    prefix = 'http_requests_total{method="GET",route="/api/v1/exercises/{id}",status="404"}'
+    before = _sample(client.get("/metrics").text, prefix)
+    for _ in range(3):
+        client.get(f"{settings.API_V1_STR}/exercises/missing", headers=superuser_token_headers)
+    after = _sample(client.get("/metrics").text, prefix)
+    assert after - before == 3
@@ -0,0 +1,37 @@
+from fastapi.testclient import TestClient
+
+from app.config import settings
+
+
+def test_superuser_can_profile_a_request(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/",
+        headers={**superuser_token_headers, "X-Profile": "1"},
+    )
+    assert r.status_code == 200
+    name = r.headers["x-profile-id"]
+    assert name.endswith(".speedscope.json")
+
+    r = client.get(f"{settings.API_V1_STR}/admin/profiles/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert name in [p["name"] for p in r.json()]
+
+    r = client.get(f"{settings.API_V1_STR}/admin/profiles/{name}", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert r.json()["exporter"] == "app.profiling"
+
+
+def test_profile_flag_ignored_for_normal_users(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/exercises/",
+        params={"profile": "1"},
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    r = client.get(f"{settings.API_V1_STR}/admin/profiles/", headers=normal_user_token_headers)
+    assert r.status_code == 403
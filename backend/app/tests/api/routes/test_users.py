@@ -448,3 +448,372 @@ def test_delete_user_without_privileges(
     )
     assert r.status_code == 403
     assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_update_exercise_performance_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/me/exercise-performance"
+    r = client.patch(
+        url,
+        headers=normal_user_token_headers,
+        json={"exercise_id": "bulk-squat", "date": "Mon Jan 06 2031", "performance": 50},
+    )
+    assert r.status_code == 200
+
+    entries = [
+        {"exercise_id": "bulk-squat", "date": "Mon Jan 06 2031", "performance": 50},
+        {"exercise_id": "bulk-squat", "date": "Wed Jan 08 2031", "performance": 52.5},
+        {"exercise_id": "bulk-row", "date": "Wed Jan 08 2031", "performance": 30},
+        {"exercise_id": "bulk-row", "date": "Wed Jan 08 2031", "performance": 32},
+        {"exercise_id": "bulk-squat", "date": "Mon Jan 06 2031", "performance": 55},
+    ]
+    r = client.patch(f"{url}/bulk", headers=normal_user_token_headers, json={"entries": entries})
+    assert r.status_code == 200
+    content = r.json()
+    assert [result["status"] for result in content["results"]] == [
+        "superseded", "created", "superseded", "created", "updated",
+    ]
+    assert content["applied"] == 3
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    performance = {e["id"]: e["performance"] for e in r.json()["exercises"]}
+    assert performance["bulk-squat"] == {"Mon Jan 06 2031": 55, "Wed Jan 08 2031": 52.5}
+    assert performance["bulk-row"] == {"Wed Jan 08 2031": 32}
+
+
+def test_update_exercise_performance_bulk_skips_invalid_duplicates(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    # NaN is not valid JSON for most encoders, so the body is written by hand
+    body = (
+        '{"entries": ['
+        '{"exercise_id": "nan-squat", "date": "Mon Feb 03 2031", "performance": 50},'
+        '{"exercise_id": "nan-squat", "date": "Mon Feb 03 2031", "performance": NaN}]}'
+    )
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance/bulk",
+        headers={**normal_user_token_headers, "Content-Type": "application/json"},
+        content=body,
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert [result["status"] for result in content["results"]] == ["created", "invalid"]
+    assert content["applied"] == 1
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    performance = {e["id"]: e["performance"] for e in r.json()["exercises"]}
+    assert performance["nan-squat"] == {"Mon Feb 03 2031": 50}
+
+
+def test_update_exercise_performance_bulk_rejects_empty(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance/bulk",
+        headers=normal_user_token_headers,
+        json={"entries": []},
+    )
+    assert r.status_code == 422
+
+
+def test_read_user_progress(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    user_id = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()["id"]
+    url = f"{settings.API_V1_STR}/users/{user_id}/progress"
+    entries = [
+        {"exercise_id": "progress-press", "date": "Mon Feb 03 2031", "performance": 40},
+        {"exercise_id": "progress-press", "date": "Mon Feb 10 2031", "performance": 45},
+    ]
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance/bulk",
+        headers=normal_user_token_headers,
+        json={"entries": entries},
+    )
+    assert r.status_code == 200
+
+    r = client.get(url, headers=normal_user_token_headers)
+    assert r.status_code == 200
+    press = next(e for e in r.json()["exercises"] if e["exercise_id"] == "progress-press")
+    assert press["personal_best"] == 45
+    assert press["weekly"][-1]["delta"] == 5
+
+    # A performance write invalidates the cached result
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance",
+        headers=normal_user_token_headers,
+        json={"exercise_id": "progress-press", "date": "Mon Feb 17 2031", "performance": 50},
+    )
+    assert r.status_code == 200
+    r = client.get(url, headers=normal_user_token_headers)
+    press = next(e for e in r.json()["exercises"] if e["exercise_id"] == "progress-press")
+    assert press["personal_best"] == 50
+    assert press["data_points"] == 3
+
+
+def test_admin_exercise_update_invalidates_progress(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    user = crud.create_user(
+        session=firestore_client,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    url = f"{settings.API_V1_STR}/users/{user.id}/progress"
+    assert client.get(url, headers=superuser_token_headers).json()["data_points"] == 0
+
+    exercises = [{"id": "admin-press", "performance": {"Mon Feb 03 2031": 40, "Mon Feb 10 2031": 45}}]
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"exercises": exercises},
+    )
+    assert r.status_code == 200
+    assert client.get(url, headers=superuser_token_headers).json()["data_points"] == 2
+
+
+def test_read_user_progress_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/superuser/progress", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
+
+
+def test_read_exercise_chart(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    user_id = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()["id"]
+    entries = [
+        {"exercise_id": "chart-deadlift", "date": f"2032-03-{day:02d}", "performance": 100 + day}
+        for day in range(1, 31)
+    ]
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance/bulk",
+        headers=normal_user_token_headers,
+        json={"entries": entries},
+    )
+    assert r.status_code == 200
+    url = f"{settings.API_V1_STR}/users/{user_id}/exercises/chart-deadlift/chart"
+
+    r = client.get(url, headers=normal_user_token_headers, params={"points": 10})
+    assert r.status_code == 200
+    content = r.json()
+    assert content["total_points"] == 30
+    assert len(content["points"]) == 10
+    assert content["points"][0] == {"date": "2032-03-01", "value": 101}
+    assert content["points"][-1] == {"date": "2032-03-30", "value": 130}
+
+    r = client.get(
+        url,
+        headers=normal_user_token_headers,
+        params={"method": "minmax", "points": 4, "from": "Mon Mar 08 2032", "to": "2032-03-15"},
+    )
+    content = r.json()
+    assert content["total_points"] == 8
+    assert [p["date"] for p in content["points"]] == [
+        "2032-03-08", "2032-03-11", "2032-03-12", "2032-03-15",
+    ]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/{user_id}/exercises/missing/chart",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 404
+
+
+def test_read_user_stats_follows_writes(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/superuser/stats"
+    before = client.get(url, headers=superuser_token_headers).json()
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance",
+        headers=superuser_token_headers,
+        json={"exercise_id": "stats-bench", "date": "Wed Jul 07 2032", "performance": 80},
+    )
+    assert r.status_code == 200
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance",
+        headers=superuser_token_headers,
+        json={"exercise_id": "stats-bench", "date": "Thu Jul 08 2032", "performance": 85},
+    )
+    stats = client.get(url, headers=superuser_token_headers).json()
+    assert stats["entries"] == before["entries"] + 2
+    assert stats["personal_records"]["stats-bench"] == {"value": 85, "date": "2032-07-08"}
+
+    user = client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers).json()
+    assert stats["sessions"] == len(user["activities"])
+    assert stats["entries"] == sum(len(e["performance"]) for e in user["exercises"])
+
+
+def test_assigning_ahead_does_not_move_workout_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/superuser/stats"
+    for day in ["Mon Jan 06 2025", "Tue Jan 07 2025"]:
+        client.patch(
+            f"{settings.API_V1_STR}/users/me/exercise-performance",
+            headers=superuser_token_headers,
+            json={"exercise_id": "ahead-squat", "date": day, "performance": 50},
+        )
+    activity = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=superuser_token_headers,
+        json={"title": "Ahead", "exercises": ["ahead-squat"], "user_id": "superuser"},
+    ).json()
+    fields = ("workout_days", "last_workout_date", "current_streak", "longest_streak")
+    before = client.get(url, headers=superuser_token_headers).json()
+
+    r = client.post(
+        f"{settings.API_V1_STR}/activities/assign/{activity['id']}",
+        headers=superuser_token_headers,
+        params={"date": "Mon Dec 01 2036"},
+    )
+    assert r.status_code == 200
+    stats = client.get(url, headers=superuser_token_headers).json()
+    assert stats["sessions"] == before["sessions"] + 1
+    assert {f: stats[f] for f in fields} == {f: before[f] for f in fields}
+
+
+def test_trainer_roster(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    from datetime import date
+
+    client_id = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()["id"]
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/clients/{client_id}", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+
+    today = date.today().strftime("%a %b %d %Y")
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance",
+        headers=normal_user_token_headers,
+        json={"exercise_id": "roster-squat", "date": today, "performance": 70},
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients", headers=superuser_token_headers)
+    assert r.status_code == 200
+    roster = r.json()
+    summary = next(c for c in roster["clients"] if c["user_id"] == client_id)
+    assert summary["last_session_date"] == date.today().isoformat()
+    assert {"exercise_id": "roster-squat", "value": 70, "date": date.today().isoformat()} in summary["recent_records"]
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/me/clients/{client_id}", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients", headers=superuser_token_headers)
+    assert client_id not in [c["user_id"] for c in r.json()["clients"]]
+
+
+def test_deleted_client_leaves_roster(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    from app.compute_training_load import compute_training_load
+
+    user = crud.create_user(
+        session=firestore_client,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    r = client.post(f"{settings.API_V1_STR}/users/me/clients/{user.id}", headers=superuser_token_headers)
+    assert r.status_code == 200
+    compute_training_load(firestore_client)
+
+    r = client.delete(f"{settings.API_V1_STR}/users/{user.id}", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert not firestore_client.collection("user_stats").document(user.id).get().exists
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients", headers=superuser_token_headers)
+    assert user.id not in [c["user_id"] for c in r.json()["clients"]]
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients/training-load", headers=superuser_token_headers)
+    assert user.id not in [c["user_id"] for c in r.json()["clients"]]
+
+
+def test_admin_update_rebuilds_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    user = crud.create_user(
+        session=firestore_client,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    r = client.post(f"{settings.API_V1_STR}/users/me/clients/{user.id}", headers=superuser_token_headers)
+    assert r.status_code == 200
+
+    exercises = [{"id": "admin-squat", "performance": {"Mon Feb 03 2031": 60, "Mon Feb 10 2031": 65}}]
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"exercises": exercises, "full_name": "Renamed Client"},
+    )
+    assert r.status_code == 200
+
+    stats = client.get(f"{settings.API_V1_STR}/users/{user.id}/stats", headers=superuser_token_headers).json()
+    assert stats["entries"] == 2
+    assert stats["personal_records"]["admin-squat"] == {"value": 65, "date": "2031-02-10"}
+    roster = client.get(f"{settings.API_V1_STR}/users/me/clients", headers=superuser_token_headers).json()
+    assert next(c for c in roster["clients"] if c["user_id"] == user.id)["full_name"] == "Renamed Client"
+
+
+def test_trainer_roster_trainers_only(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients", headers=normal_user_token_headers)
+    assert r.status_code == 403
+
+
+def test_trainer_training_load(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    from datetime import date, timedelta
+
+    from app.compute_training_load import compute_training_load
+    from app.database_engine import get_firestore_client
+
+    client_id = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()["id"]
+    client.post(f"{settings.API_V1_STR}/users/me/clients/{client_id}", headers=superuser_token_headers)
+    entries = [
+        {
+            "exercise_id": "load-squat",
+            "date": (date.today() - timedelta(days=i)).strftime("%a %b %d %Y"),
+            "performance": 100 if i < 7 else 20,
+        }
+        for i in range(28)
+    ]
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me/exercise-performance/bulk",
+        headers=normal_user_token_headers,
+        json={"entries": entries},
+    )
+    assert r.status_code == 200
+    compute_training_load(get_firestore_client())
+
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients/training-load", headers=superuser_token_headers)
+    assert r.status_code == 200
+    load = next(c for c in r.json()["clients"] if c["user_id"] == client_id)
+    assert load["as_of"] == date.today().isoformat()
+    assert load["acwr"] > 1.5
+    assert load["risk"] == "high"
+
+    client.delete(f"{settings.API_V1_STR}/users/me/clients/{client_id}", headers=superuser_token_headers)
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients/training-load", headers=superuser_token_headers)
+    assert client_id not in [c["user_id"] for c in r.json()["clients"]]
+
+    r = client.get(f"{settings.API_V1_STR}/users/me/clients/training-load", headers=normal_user_token_headers)
+    assert r.status_code == 403
@@ -5,7 +5,7 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session, delete
 
 from app.config import settings
-from app.database_engine import  firestore_client
+from app.database_engine import get_firestore_client, set_firestore_client
 from app.database import init_db
 from app.main import app
 from app.models.item import Item
@@ -13,12 +13,24 @@ from app.models.user import User
 from app.tests.utils.user import authentication_token_from_email
 from app.tests.utils.utils import get_superuser_token_headers
 
+if settings.FIRESTORE_BACKEND == "memory":
+    # Inject one store for the whole session so every TestClient lifespan and
+    # test module shares it; nothing to back up or restore afterwards.
+    from app.database_memory import MemoryFirestoreClient
+
+    set_firestore_client(MemoryFirestoreClient())
+
 
 @pytest.fixture(scope="session", autouse=True)
 def db() -> Generator[Session | None, None, None]:
-    if settings.USE_FIREBASE:
+    if settings.USE_FIREBASE and settings.FIRESTORE_BACKEND == "memory":
+        init_db()
+        yield None
+        get_firestore_client().clear()
+    elif settings.USE_FIREBASE:
         # For Firestore, we don't use SQLModel sessions
         init_db()
+        firestore_client = get_firestore_client()
         
         # Backup initial state before tests
         initial_state = {}
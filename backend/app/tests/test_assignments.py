@@ -0,0 +1,46 @@
+from app.database_memory import MemoryFirestoreClient
+from app.utils.assignments import (
+    INDEX_FIELD,
+    add_to_index,
+    assignment_index,
+    assignments_on,
+    build_assignment_index,
+    canonical_date,
+    find_assignment,
+    index_updates,
+    remove_from_index,
+)
+
+
+def test_canonical_date() -> None:
+    assert canonical_date("Mon Jan 06 2025") == "2025-01-06"
+    assert canonical_date("2025-01-06") == "2025-01-06"
+    assert canonical_date("06/01/2025") == "06/01/2025"
+
+
+def test_index_built_for_documents_without_one() -> None:
+    user = {"activities": [
+        {"id": "a", "date": "Mon Jan 06 2025"},
+        {"id": "b", "date": "Mon Jan 06 2025"},
+        {"id": "a", "date": "Wed Jan 08 2025"},
+    ]}
+    index = assignment_index(user)
+    assert [a["id"] for a in assignments_on(index, "2025-01-06")] == ["a", "b"]
+    assert find_assignment(index, "2025-01-08", "a") == {"id": "a", "date": "Wed Jan 08 2025"}
+    # Without a stored index, the whole index is written.
+    assert index_updates(user, index, "2025-01-06") == {INDEX_FIELD: index}
+
+
+def test_index_updates_touch_single_days() -> None:
+    store = MemoryFirestoreClient()
+    ref = store.collection("users").document("u")
+    activities = [{"id": "a", "date": "Mon Jan 06 2025"}]
+    ref.set({"activities": activities, INDEX_FIELD: build_assignment_index(activities)})
+
+    user = ref.get().to_dict()
+    index = assignment_index(user)
+    add_to_index(index, {"id": "b", "date": "Tue Jan 07 2025"})
+    remove_from_index(index, {"id": "a", "date": "Mon Jan 06 2025"})
+    ref.update(index_updates(user, index, "Mon Jan 06 2025", "Tue Jan 07 2025"))
+
+    assert ref.get().to_dict()[INDEX_FIELD] == {"2025-01-07": [{"id": "b", "date": "Tue Jan 07 2025"}]}
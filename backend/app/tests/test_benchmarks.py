@@ -0,0 +1,38 @@
+from app.benchmarks.dataset import DatasetSpec, generate, seed
+from app.benchmarks.endpoints import percentile
+from app.database_memory import MemoryFirestoreClient
+
+
+SPEC = DatasetSpec(trainers=1, clients=3, exercises=10, days=14)
+
+
+def test_dataset_is_deterministic() -> None:
+    first, second = generate(SPEC), generate(SPEC)
+    for name in ("users", "exercises", "activities"):
+        a = {k: {f: v for f, v in d.items() if f != "hashed_password"} for k, d in first.collections[name].items()}
+        b = {k: {f: v for f, v in d.items() if f != "hashed_password"} for k, d in second.collections[name].items()}
+        assert a == b
+    assert first.document_count == 1 + 1 + 3 + 10 + 3 * SPEC.activities_per_client
+
+
+def test_dataset_history_matches_spec() -> None:
+    dataset = generate(SPEC)
+    client = dataset.collections["users"][dataset.client_ids[0]]
+    assert len(client["activities"]) == len(dataset.training_dates())
+    for exercise in client["exercises"]:
+        assert set(exercise["performance"]) <= set(dataset.training_dates())
+
+
+def test_seed_writes_every_document() -> None:
+    dataset = generate(SPEC)
+    store = MemoryFirestoreClient()
+    seed(store, dataset, batch_size=7)
+    for name, documents in dataset.collections.items():
+        assert len(list(store.collection(name).stream())) == len(documents)
+
+
+def test_percentile_nearest_rank() -> None:
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.cloud import firestore
+
+from app.database_coalescing import CoalescingClient
+from app.database_memory import MemoryFirestoreClient
+from app.metrics import FIRESTORE_FLIGHTS
+
+
+def _client(delay: float = 0.05) -> tuple[CoalescingClient, dict[str, int]]:
+    """A client whose backend reads are slow enough to overlap, and their counts."""
+    store = MemoryFirestoreClient()
+    store.collection("activities").document("a1").set({"title": "Legs", "user_id": "u1"})
+    store.collection("activities").document("a2").set({"title": "Back", "user_id": "u1"})
+    calls = {"read": 0, "scan": 0}
+    read, scan = store._read, store._scan
+
+    def slow(name, method):
+        def call(*args):
+            calls[name] += 1
+            result = method(*args)
+            time.sleep(delay)
+            return result
+        return call
+
+    store._read, store._scan = slow("read", read), slow("scan", scan)
+    return CoalescingClient(store), calls
+
+
+def _concurrently(fn, n: int = 8) -> list:
+    barrier = threading.Barrier(n)
+
+    def run(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(run, range(n)))
+
+
+def test_concurrent_gets_and_queries_share_one_call() -> None:
+    client, calls = _client()
+    coalesced = FIRESTORE_FLIGHTS.value(op="get", result="coalesced")
+
+    snapshots = _concurrently(lambda: client.collection("activities").document("a1").get())
+    assert calls["read"] == 1
+    assert all(s.to_dict() == {"title": "Legs", "user_id": "u1"} for s in snapshots)
+    assert FIRESTORE_FLIGHTS.value(op="get", result="coalesced") == coalesced + 7
+    # Callers get their own copy of the data
+    snapshots[0].to_dict()["title"] = "changed"
+    assert snapshots[1].to_dict()["title"] == "Legs"
+
+    pages = _concurrently(
+        lambda: [d.id for d in client.collection("activities").where("user_id", "==", "u1").limit(5).stream()]
+    )
+    assert calls["scan"] == 1 and pages == [["a1", "a2"]] * 8
+
+    # Different queries are not merged
+    _concurrently(lambda: list(client.collection("activities").limit(1).stream()), n=2)
+    _concurrently(lambda: list(client.collection("activities").limit(2).stream()), n=1)
+    assert calls["scan"] == 3
+
+
+def test_reads_do_not_join_calls_started_before_a_write() -> None:
+    client, calls = _client(delay=0.2)
+    activity = client.collection("activities").document("a1")
+    with ThreadPoolExecutor(2) as pool:
+        before = pool.submit(activity.get)
+        time.sleep(0.05)
+        activity.update({"title": "Legs day"})
+        after = pool.submit(activity.get)
+        assert before.result().get("title") == "Legs"
+        assert after.result().get("title") == "Legs day"
+    assert calls["read"] == 2
+
+
+def test_async_and_thread_callers_share_one_call() -> None:
+    client, calls = _client()
+    activity = client.collection("activities").document("a2")
+
+    async def main():
+        thread = asyncio.get_running_loop().run_in_executor(None, activity.get)
+        snapshots = await asyncio.gather(*(activity.get_async() for _ in range(5)), thread)
+        return [s.get("title") for s in snapshots]
+
+    assert asyncio.run(main()) == ["Back"] * 6
+    assert calls["read"] == 1
+
+
+def test_writes_through_batches_and_transactions() -> None:
+    client, _ = _client(delay=0)
+    activities = client.collection("activities")
+    batch = client.batch()
+    for doc in activities.stream():
+        batch.update(doc.reference, {"done": True})
+    batch.commit()
+
+    @firestore.transactional
+    def rename(transaction, ref):
+        snapshot = next(transaction.get(ref))
+        transaction.update(ref, {"title": snapshot.get("title") + "!"})
+
+    rename(client.transaction(), activities.document("a1"))
+    assert activities.document("a1").get().to_dict() == {"title": "Legs!", "user_id": "u1", "done": True}
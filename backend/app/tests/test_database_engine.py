@@ -0,0 +1,97 @@
+import subprocess
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+import app.database_engine as database_engine
+
+
+def test_import_does_not_initialize_firebase() -> None:
+    code = (
+        "import sys, app.main; "
+        "assert 'firebase_admin' not in sys.modules, 'firebase_admin imported eagerly'"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+
+def test_client_is_created_once_across_threads() -> None:
+    previous = database_engine._client, database_engine._client_owned
+    database_engine._client, database_engine._client_owned = None, False
+    created = MagicMock()
+    try:
+        with patch.object(
+            database_engine, "_create_firestore_client", return_value=created
+        ) as factory:
+            clients = []
+            threads = [
+                threading.Thread(target=lambda: clients.append(database_engine.get_firestore_client()))
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            assert factory.call_count == 1
+            assert all(c is created for c in clients)
+
+            database_engine.close_firestore_client()
+            created.close.assert_called_once()
+            assert database_engine._client is None
+    finally:
+        database_engine._client, database_engine._client_owned = previous
+
+
+def test_injected_client_survives_close() -> None:
+    previous = database_engine._client, database_engine._client_owned
+    injected = MagicMock()
+    try:
+        database_engine.set_firestore_client(injected)
+        database_engine.close_firestore_client()
+        assert database_engine.get_firestore_client() is injected
+        injected.close.assert_not_called()
+    finally:
+        database_engine._client, database_engine._client_owned = previous
+
+
+def test_firebase_client_reopens_after_close() -> None:
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    from app.config import settings
+
+    previous = database_engine._client, database_engine._client_owned
+    database_engine._client, database_engine._client_owned = None, False
+    apps: list = []
+    # firebase_admin hands out one cached client per app
+    cached: dict[int, MagicMock] = {}
+
+    def initialize_app(cred):
+        apps.append(object())
+        return apps[-1]
+
+    def get_app():
+        if not apps:
+            raise ValueError("no app")
+        return apps[-1]
+
+    try:
+        with patch.object(settings, "FIRESTORE_BACKEND", "firestore"), \
+                patch.object(settings, "FIREBASE_CREDENTIALS_PATH", "credentials.json"), \
+                patch.object(credentials, "Certificate"), \
+                patch.object(firebase_admin, "get_app", side_effect=get_app), \
+                patch.object(firebase_admin, "initialize_app", side_effect=initialize_app), \
+                patch.object(firebase_admin, "delete_app", side_effect=apps.remove) as delete_app, \
+                patch.object(firestore, "client", side_effect=lambda app: cached.setdefault(id(app), MagicMock())):
+            first = database_engine.get_firestore_client()
+            database_engine.close_firestore_client()
+            first.close.assert_called_once()
+            delete_app.assert_called_once()
+
+            second = database_engine.get_firestore_client()
+            assert second is not first
+            second.close.assert_not_called()
+            database_engine.close_firestore_client()
+    finally:
+        database_engine._client, database_engine._client_owned = previous
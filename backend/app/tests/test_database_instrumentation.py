@@ -0,0 +1,55 @@
+from google.cloud import firestore
+
+from app.database_instrumentation import (
+    InstrumentedClient,
+    OpStats,
+    parse_server_timing,
+    server_timing,
+)
+from app.database_memory import MemoryFirestoreClient
+
+
+def _client() -> tuple[InstrumentedClient, OpStats]:
+    store = MemoryFirestoreClient()
+    for i in range(5):
+        store.collection("exercises").document(f"e{i}").set({"is_active": i % 2 == 0})
+    stats = OpStats()
+    return InstrumentedClient(store, stats), stats
+
+
+def test_counts_reads_queries_and_documents() -> None:
+    client, stats = _client()
+    exercises = client.collection("exercises")
+    assert exercises.document("e0").get().exists
+    docs = list(exercises.where("is_active", "==", True).stream())
+    assert len(docs) == 3
+    snapshots = list(client.get_all([exercises.document("e1"), exercises.document("e2")]))
+    assert len(snapshots) == 2
+    assert (stats.reads, stats.queries, stats.documents, stats.writes) == (3, 1, 3, 0)
+
+
+def test_counts_writes_through_snapshots_batches_and_transactions() -> None:
+    client, stats = _client()
+    exercises = client.collection("exercises")
+    for doc in exercises.limit(2).stream():
+        doc.reference.update({"is_active": False})
+    batch = client.batch()
+    batch.set(exercises.document("e9"), {"is_active": True})
+    batch.delete(exercises.document("e4"))
+    batch.commit()
+
+    @firestore.transactional
+    def toggle(transaction, ref):
+        snapshot = next(transaction.get(ref))
+        transaction.update(ref, {"is_active": not snapshot.get("is_active")})
+
+    toggle(client.transaction(), exercises.document("e0"))
+    assert stats.writes == 2 + 2 + 1
+    assert stats.reads == 1
+
+
+def test_server_timing_roundtrip() -> None:
+    stats = OpStats()
+    stats.record(0.0125, reads=2, writes=1, queries=3, documents=7)
+    ops = parse_server_timing(server_timing(stats, 0.02))
+    assert ops == {"ms": 12.5, "reads": 2, "writes": 1, "queries": 3, "docs": 7}
@@ -0,0 +1,98 @@
+import pytest
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+
+from app.database_memory import MemoryFirestoreClient
+
+
+@pytest.fixture()
+def store() -> MemoryFirestoreClient:
+    client = MemoryFirestoreClient()
+    users = client.collection("users")
+    users.document("a").set({"email": "a@example.com", "role": "trainer", "age": 30})
+    users.document("b").set({"email": "b@example.com", "role": "user", "age": 25})
+    users.document("c").set({"email": "c@example.com", "role": "user", "age": 41})
+    return client
+
+
+def test_document_roundtrip_is_copied(store: MemoryFirestoreClient) -> None:
+    doc = store.collection("users").document("a").get()
+    assert doc.exists
+    data = doc.to_dict()
+    data["email"] = "mutated"
+    assert store.collection("users").document("a").get().to_dict()["email"] == "a@example.com"
+    assert not store.collection("users").document("missing").get().exists
+
+
+def test_add_returns_timestamp_and_reference(store: MemoryFirestoreClient) -> None:
+    _, ref = store.collection("items").add({"title": "Foo"})
+    assert len(ref.id) == 20
+    assert ref.get().to_dict() == {"title": "Foo"}
+
+
+def test_query_filters_order_offset_limit(store: MemoryFirestoreClient) -> None:
+    users = store.collection("users")
+    docs = list(users.where("role", "==", "user").order_by("age", direction="DESCENDING").stream())
+    assert [d.id for d in docs] == ["c", "b"]
+    docs = list(users.order_by("age").offset(1).limit(1).stream())
+    assert [d.id for d in docs] == ["a"]
+    docs = list(users.where(filter=firestore.FieldFilter("age", ">=", 30)).stream())
+    assert sorted(d.id for d in docs) == ["a", "c"]
+    assert users.where("role", "==", "user").count().get()[0][0].value == 2
+
+
+def test_update_supports_field_paths_and_transforms(store: MemoryFirestoreClient) -> None:
+    ref = store.collection("users").document("a")
+    ref.update({"stats.sessions": firestore.Increment(2), "tags": firestore.ArrayUnion(["x"])})
+    ref.update({"stats.sessions": firestore.Increment(1), "age": firestore.DELETE_FIELD})
+    data = ref.get().to_dict()
+    assert data["stats"] == {"sessions": 3}
+    assert data["tags"] == ["x"]
+    assert "age" not in data
+    with pytest.raises(NotFound):
+        store.collection("users").document("missing").update({"age": 1})
+
+
+def test_batch_and_get_all(store: MemoryFirestoreClient) -> None:
+    users = store.collection("users")
+    batch = store.batch()
+    batch.set(users.document("d"), {"email": "d@example.com"})
+    batch.update(users.document("a"), {"role": "admin"})
+    batch.delete(users.document("b"))
+    batch.commit()
+    snapshots = {s.id: s for s in store.get_all([users.document(i) for i in "abd"])}
+    assert snapshots["a"].to_dict()["role"] == "admin"
+    assert not snapshots["b"].exists
+    assert snapshots["d"].exists
+
+
+def test_failed_batch_leaves_store_untouched(store: MemoryFirestoreClient) -> None:
+    users = store.collection("users")
+    batch = store.batch()
+    batch.update(users.document("a"), {"role": "admin"})
+    batch.update(users.document("missing"), {"role": "admin"})
+    with pytest.raises(NotFound):
+        batch.commit()
+    assert users.document("a").get().to_dict()["role"] == "trainer"
+
+
+def test_transactional_decorator(store: MemoryFirestoreClient) -> None:
+    ref = store.collection("users").document("a")
+
+    @firestore.transactional
+    def bump(transaction, doc_ref):
+        snapshot = next(transaction.get(doc_ref))
+        transaction.update(doc_ref, {"age": snapshot.get("age") + 1})
+        return snapshot.get("age")
+
+    assert bump(store.transaction(), ref) == 30
+    assert ref.get().to_dict()["age"] == 31
+
+    @firestore.transactional
+    def fail(transaction, doc_ref):
+        transaction.update(doc_ref, {"age": 0})
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        fail(store.transaction(), ref)
+    assert ref.get().to_dict()["age"] == 31
@@ -0,0 +1,24 @@
+import numpy as np
+
+from app.utils.downsampling import lttb, min_max
+
+
+def test_lttb_keeps_ends_and_peaks() -> None:
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 100.0
+    kept = lttb(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 500 in kept
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_short_series_is_unchanged() -> None:
+    assert lttb(np.arange(5), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_min_max_keeps_extremes_of_each_bucket() -> None:
+    y = np.array([5.0, 1.0, 9.0, 3.0, 2.0, 8.0, 7.0, 0.0])
+    kept = min_max(y, 4)
+    assert kept.tolist() == [1, 2, 5, 7]
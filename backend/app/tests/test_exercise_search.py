@@ -0,0 +1,148 @@
+from app.database_memory import MemoryFirestoreClient
+from app.utils.exercise_search import ExerciseIndex, exercise_written, tokenize
+
+
+def _index() -> ExerciseIndex:
+    index = ExerciseIndex()
+    index.build([
+        ("squat", {"title": "Back squat", "description": "Barbell on the upper back", "owner_id": "a"}),
+        ("split", {"title": "Bulgarian split squat", "description": "Rear foot elevated", "owner_id": "b"}),
+        ("press", {"title": "Bench press", "description": "Barbell press lying on a bench", "owner_id": "a"}),
+        ("old", {"title": "Squat jump", "owner_id": "a", "is_active": False}),
+    ])
+    return index
+
+
+def _ids(hits: list[tuple[str, float]]) -> list[str]:
+    return [exercise_id for exercise_id, _ in hits]
+
+
+def test_tokenize_strips_case_and_accents() -> None:
+    assert tokenize("Développé-Couché 3x10") == ["developpe", "couche", "3x10"]
+    assert tokenize(None) == []
+
+
+def test_search_ranks_title_matches_first() -> None:
+    hits, count = _index().search("barbell")
+    assert count == 2
+    assert _ids(hits) == ["press", "squat"] or _ids(hits) == ["squat", "press"]
+    hits, count = _index().search("squat")
+    # "old" is inactive and not indexed
+    assert count == 2
+    assert _ids(hits)[0] == "squat"
+
+
+def test_search_matches_all_words() -> None:
+    hits, count = _index().search("bulgarian squat")
+    assert (_ids(hits), count) == (["split"], 1)
+    assert _index().search("bulgarian bench") == ([], 0)
+
+
+def test_search_matches_prefix_of_last_word() -> None:
+    assert _ids(_index().search("bulg")[0]) == ["split"]
+    assert _ids(_index().search("bench pr")[0]) == ["press"]
+    # Only the last word is a prefix
+    assert _index().search("bul squat")[1] == 0
+
+
+def test_search_tolerates_one_typo() -> None:
+    assert _ids(_index().search("bulgrian")[0]) == ["split"]
+    assert _ids(_index().search("sqaut")[0])[0] == "squat"
+    assert _ids(_index().search("bnch")[0]) == ["press"]
+    assert _index().search("bak")[1] == 0  # too short for typos
+
+
+def test_exact_match_outranks_typo() -> None:
+    index = ExerciseIndex()
+    index.build([
+        ("row", {"title": "Cable row", "owner_id": "a"}),
+        ("rows", {"title": "Cable rows", "owner_id": "a"}),
+    ])
+    assert _ids(index.search("rows")[0]) == ["rows", "row"]
+
+
+def test_search_by_owner_and_limit() -> None:
+    index = _index()
+    assert _ids(index.search("squat", owner_id="b")[0]) == ["split"]
+    assert index.search("squat", owner_id="nobody") == ([], 0)
+    hits, count = index.search("barbell", limit=1)
+    assert (len(hits), count) == (1, 2)
+
+
+def test_upsert_and_remove_update_the_index() -> None:
+    index = _index()
+    index.upsert("press", {"title": "Overhead press", "owner_id": "a"})
+    assert index.search("bench")[1] == 0
+    assert _ids(index.search("overhead")[0]) == ["press"]
+    index.upsert("press", {"title": "Overhead press", "owner_id": "a", "is_active": False})
+    assert index.search("overhead")[1] == 0
+    index.remove("split")
+    index.remove("missing")
+    assert index.search("bulgarian")[1] == 0
+    assert len(index) == 1
+    # Freed slots and vanished terms are reused cleanly
+    index.upsert("new", {"title": "Bulgarian bag swing", "owner_id": "c"})
+    assert _ids(index.search("bulgarian")[0]) == ["new"]
+
+
+def test_refresh_picks_up_writes_of_other_workers() -> None:
+    store = MemoryFirestoreClient()
+    exercises = store.collection("exercises")
+    exercises.document("legacy").set({"title": "Farmer carry", "owner_id": "a", "is_active": True})
+    index = ExerciseIndex()
+    index.build((doc.id, doc.to_dict()) for doc in exercises.stream())
+    exercises.document("new").set({"title": "Suitcase carry", "owner_id": "a", "is_active": True, **exercise_written()})
+    assert index.refresh(store) == 1
+    assert sorted(_ids(index.search("carry")[0])) == ["legacy", "new"]
+    exercises.document("new").update({"is_active": False, **exercise_written()})
+    index.refresh(store)
+    assert _ids(index.search("carry")[0]) == ["legacy"]
+
+
+def test_facet_counts() -> None:
+    index = ExerciseIndex()
+    index.build([
+        ("a", {"title": "A", "owner_id": "u", "category": "strength", "muscle_group": "legs", "difficulty": "hard"}),
+        ("b", {"title": "B", "owner_id": "u", "category": "strength", "muscle_group": "legs", "difficulty": "easy"}),
+        ("c", {"title": "C", "owner_id": "u", "category": "strength", "muscle_group": "chest", "difficulty": "hard"}),
+        ("d", {"title": "D", "owner_id": "v", "category": "cardio", "muscle_group": "legs"}),
+        ("e", {"title": "E", "owner_id": "u", "category": "strength", "is_active": False}),
+    ])
+    count, facets = index.facet_counts({"category": "strength", "muscle_group": "legs", "difficulty": "hard"})
+    assert count == 1
+    # Each facet is counted under the filters on the other facets
+    assert facets["category"]["strength"] == 1 and facets["category"]["cardio"] == 0
+    assert facets["muscle_group"] == {**dict.fromkeys(facets["muscle_group"], 0), "legs": 1, "chest": 1}
+    assert facets["difficulty"] == {"easy": 1, "medium": 0, "hard": 1}
+
+    count, facets = index.facet_counts({"muscle_group": "legs"}, owner_id="v")
+    assert count == 1
+    assert facets["category"]["cardio"] == 1
+    assert sum(facets["difficulty"].values()) == 0  # unset
+
+    assert index.facet_counts({}, owner_id="nobody")[0] == 0
+    index.upsert("d", {"title": "D", "owner_id": "v", "category": "cardio", "muscle_group": "legs", "is_active": False})
+    assert index.facet_counts({"muscle_group": "legs"})[0] == 2
+
+
+def test_similar_exercises() -> None:
+    index = ExerciseIndex()
+    index.build([
+        ("back", {"title": "Back squat", "owner_id": "a", "category": "strength", "muscle_group": "legs", "difficulty": "medium", "reps": 8, "sets": 4}),
+        ("front", {"title": "Front squat", "owner_id": "a", "category": "strength", "muscle_group": "legs", "difficulty": "hard", "reps": 6, "sets": 4}),
+        ("goblet", {"title": "Goblet squat", "owner_id": "b", "category": "strength", "muscle_group": "legs", "difficulty": "easy", "reps": 12, "sets": 3}),
+        ("run", {"title": "Treadmill run", "owner_id": "a", "category": "cardio", "muscle_group": "full_body", "duration": 1800}),
+        ("bench", {"title": "Bench press", "owner_id": "a", "category": "strength", "muscle_group": "chest", "difficulty": "medium", "reps": 8, "sets": 4}),
+    ])
+    neighbours = index.similar("back")
+    assert [exercise_id for exercise_id, _ in neighbours][:2] == ["front", "goblet"]
+    assert neighbours[-1][0] == "run"
+    assert all(-1 <= similarity <= 1 for _, similarity in neighbours)
+    assert [exercise_id for exercise_id, _ in index.similar("back", owner_id="a", limit=2)] == ["front", "bench"]
+    assert index.similar("missing") is None
+
+    # Writes invalidate cached neighbours
+    index.upsert("bench", {"title": "Box squat", "owner_id": "a", "category": "strength", "muscle_group": "legs", "difficulty": "medium", "reps": 8, "sets": 4})
+    assert index.similar("back")[0][0] == "bench"
+    index.remove("bench")
+    assert "bench" not in [exercise_id for exercise_id, _ in index.similar("back")]
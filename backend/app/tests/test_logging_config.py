@@ -0,0 +1,67 @@
+import io
+import json
+import logging
+
+from app.logging_config import (
+    DebugSamplingFilter,
+    JsonFormatter,
+    RedactingFilter,
+    parse_levels,
+    redact_text,
+)
+
+
+def _record(msg: str, *args, level: int = logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_redacts_message_and_extra_fields() -> None:
+    record = _record(
+        "login with password=%s", "hunter2",
+        headers={"Authorization": "Bearer abc.def", "accept": "*/*"},
+        hashed_password="$2b$12$" + "a" * 53,
+    )
+    assert RedactingFilter().filter(record)
+    assert record.getMessage() == "login with password=***"
+    assert record.headers == {"Authorization": "***", "accept": "*/*"}
+    assert record.hashed_password == "***"
+    assert redact_text("Authorization: Bearer eyJx.eyJy.sig") == "Authorization: Bearer ***"
+
+
+def test_debug_sampling_only_drops_debug() -> None:
+    sampler = DebugSamplingFilter(0.0)
+    assert not sampler.filter(_record("x", level=logging.DEBUG))
+    assert sampler.filter(_record("x", level=logging.INFO))
+    assert DebugSamplingFilter(1.0).filter(_record("x", level=logging.DEBUG))
+
+
+def test_json_formatter_includes_extra_fields() -> None:
+    line = JsonFormatter().format(_record("request", status_code=200, firestore={"reads": 1}))
+    data = json.loads(line)
+    assert data["message"] == "request"
+    assert data["status_code"] == 200
+    assert data["firestore"] == {"reads": 1}
+    assert data["level"] == "INFO"
+
+
+def test_parse_levels() -> None:
+    assert parse_levels("app.request=debug, httpx=WARNING,") == {
+        "app.request": "DEBUG",
+        "httpx": "WARNING",
+    }
+
+
+def test_queue_listener_writes_in_background() -> None:
+    from app import logging_config
+
+    logging_config.shutdown_logging()
+    stream = io.StringIO()
+    logging_config.setup_logging(stream)
+    try:
+        logging.getLogger("app.test").warning("token=%s", "s3cret")
+    finally:
+        logging_config.shutdown_logging()
+    data = json.loads(stream.getvalue().strip().splitlines()[-1])
+    assert data["message"] == "token=***"
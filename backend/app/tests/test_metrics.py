@@ -0,0 +1,40 @@
+import os
+
+from app.metrics import Registry, collect, merge_snapshots, render, write_snapshot
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="/a")
+    body = render(registry.snapshot())
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in body
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in body
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in body
+    assert 'latency_seconds_count{route="/a"} 4' in body
+
+
+def test_cache_hit_ratio() -> None:
+    registry = Registry()
+    cache = registry.counter("cache_requests_total", "Cache lookups.", ("cache", "result"))
+    cache.inc(3, cache="exercises", result="hit")
+    cache.inc(1, cache="exercises", result="miss")
+    assert 'cache_hit_ratio{cache="exercises"} 0.75' in render(registry.snapshot())
+
+
+def test_merge_keeps_counters_of_exited_workers(tmp_path) -> None:
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.")
+    in_flight = registry.gauge("in_flight", "In flight.")
+    requests.inc(2)
+    in_flight.set(1)
+    exited = registry.snapshot()
+    exited["alive"] = False
+    merged = merge_snapshots([exited, registry.snapshot()])
+    assert merged["metrics"]["requests_total"]["samples"] == [[[], 4.0]]
+    assert merged["metrics"]["in_flight"]["samples"] == [[[], 1.0]]
+
+    write_snapshot(str(tmp_path), registry)
+    assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+    assert collect(str(tmp_path), registry)["metrics"]["requests_total"]["samples"] == [[[], 2.0]]
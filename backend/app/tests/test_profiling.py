@@ -0,0 +1,43 @@
+import json
+import threading
+import time
+
+from app.profiling import ProfileStore, SamplingProfiler, to_collapsed, to_speedscope
+
+
+def _busy_app_function(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_samples_threads_running_app_code() -> None:
+    profiler = SamplingProfiler(interval=0.001)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_app_function, args=(stop,))
+    profiler.acquire()
+    start = time.monotonic()
+    worker.start()
+    time.sleep(0.1)
+    stop.set()
+    worker.join()
+    samples = profiler.samples_between(start, time.monotonic())
+    profiler.release()
+    assert samples
+    assert any(frame[0] == "_busy_app_function" for _, _, stack in samples for frame in stack)
+
+    speedscope = json.loads(to_speedscope(samples, "test", profiler.interval))
+    assert speedscope["profiles"][0]["type"] == "sampled"
+    names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+    assert "_busy_app_function" in names
+    assert "_busy_app_function (test_profiling.py" in to_collapsed(samples)
+
+
+def test_store_is_bounded(tmp_path) -> None:
+    store = ProfileStore(str(tmp_path), max_bytes=250)
+    for i in range(5):
+        store.save(f"p{i}.speedscope.json", "x" * 100)
+        time.sleep(0.01)
+    names = sorted(p["name"] for p in store.list())
+    assert names == ["p3.speedscope.json", "p4.speedscope.json"]
+    assert store.path("../p4.speedscope.json") is None
+    assert store.path("p4.speedscope.json") is not None
@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.utils.progress import (
+    exercise_progress,
+    performance_series,
+    rolling_mean,
+    trend_slope,
+    weekly_means,
+)
+
+
+def test_performance_series_sorts_and_skips_bad_entries() -> None:
+    days, values = performance_series({
+        "Wed Jan 08 2031": 52.5,
+        "2031-01-06": 50,
+        "not a date": 10,
+        "Fri Jan 10 2031": "n/a",
+    })
+    assert [str(day) for day in days] == ["2031-01-06", "2031-01-08"]
+    assert values.tolist() == [50.0, 52.5]
+
+
+def test_rolling_mean() -> None:
+    values = np.array([1.0, 2.0, 3.0, 4.0])
+    assert rolling_mean(values, 2).tolist() == [1.0, 1.5, 2.5, 3.5]
+    assert rolling_mean(values, 10).tolist() == [1.0, 1.5, 2.0, 2.5]
+
+
+def test_weekly_means_start_on_monday() -> None:
+    days = np.array(["2031-01-05", "2031-01-06", "2031-01-08", "2031-01-13"], dtype="datetime64[D]")
+    mondays, means = weekly_means(days, np.array([1.0, 2.0, 4.0, 10.0]))
+    # Jan 05 2031 is a Sunday
+    assert [str(day) for day in mondays] == ["2030-12-30", "2031-01-06", "2031-01-13"]
+    assert means.tolist() == [1.0, 3.0, 10.0]
+
+
+def test_trend_slope() -> None:
+    days = np.array(["2031-01-01", "2031-01-03", "2031-01-05"], dtype="datetime64[D]")
+    assert trend_slope(days, np.array([10.0, 11.0, 12.0])) == 0.5
+    assert trend_slope(days[:1], np.array([10.0])) is None
+
+
+def test_exercise_progress() -> None:
+    performance = {"Mon Jan 06 2031": 50, "Wed Jan 08 2031": 60, "Mon Jan 13 2031": 55}
+    progress = exercise_progress("squat", performance, {"title": "Squat", "reps": 5, "sets": 3}, window=2)
+    assert progress["personal_best"] == 60
+    assert progress["personal_best_date"] == "2031-01-08"
+    assert progress["latest"] == 55
+    assert progress["rolling_average"] == 57.5
+    assert progress["total_volume"] == 165 * 15
+    assert [week["delta"] for week in progress["weekly"]] == [None, 0.0]
+    assert exercise_progress("empty", {}, None, window=2) is None
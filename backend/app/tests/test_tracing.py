@@ -0,0 +1,73 @@
+import json
+
+from app.database_instrumentation import InstrumentedClient, OpStats
+from app.database_memory import MemoryFirestoreClient
+from app.tracing import (
+    SpanExporter,
+    _current_span,
+    _parse_traceparent,
+    otlp_payload,
+    start_span,
+    start_trace,
+)
+
+
+def _collect(monkeypatch) -> list:
+    exported: list = []
+    monkeypatch.setattr("app.tracing.get_exporter", lambda: type("E", (), {"submit": staticmethod(exported.append)})())
+    return exported
+
+
+def test_spans_nest_and_record_firestore_ops(monkeypatch) -> None:
+    exported = _collect(monkeypatch)
+    store = MemoryFirestoreClient()
+    store.collection("exercises").document("e1").set({"title": "Squat"})
+    client = InstrumentedClient(store, OpStats())
+
+    root = start_trace("GET /exercises/")
+    token = _current_span.set(root)
+    try:
+        with start_span("get_current_user") as span:
+            client.collection("exercises").document("e1").get()
+        list(client.collection("exercises").stream())
+    finally:
+        _current_span.reset(token)
+    root.end()
+
+    by_name = {s.name: s for s in exported}
+    assert by_name["get_current_user"].parent_id == root.span_id
+    get = by_name["firestore.get"]
+    assert get.parent_id == span.span_id
+    assert get.attributes["db.collection"] == "exercises"
+    query = by_name["firestore.query"]
+    assert query.parent_id == root.span_id
+    assert query.attributes["db.firestore.documents"] == 1
+    assert {s.trace_id for s in exported} == {root.trace_id}
+
+
+def test_no_spans_outside_a_trace(monkeypatch) -> None:
+    exported = _collect(monkeypatch)
+    with start_span("get_db") as span:
+        assert span is None
+    assert exported == []
+
+
+def test_traceparent_sampling_flag() -> None:
+    assert _parse_traceparent("00-" + "a" * 32 + "-" + "b" * 16 + "-01") == ("a" * 32, "b" * 16, True)
+    assert start_trace("x", "00-" + "a" * 32 + "-" + "b" * 16 + "-00") is None
+    assert start_trace("x", "00-" + "a" * 32 + "-" + "b" * 16 + "-01").parent_id == "b" * 16
+
+
+def test_exporter_writes_otlp_json(tmp_path) -> None:
+    lines = []
+    exporter = SpanExporter(lambda payload: lines.append(json.dumps(payload)), interval=0.01)
+    span = start_trace("GET /")
+    span.set_attribute("http.response.status_code", 200)
+    span.end_ns = span.start_ns + 1000
+    exporter.submit(span)
+    exporter.shutdown()
+    payload = json.loads(lines[0])
+    exported = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert exported["traceId"] == span.trace_id
+    assert exported["attributes"] == [{"key": "http.response.status_code", "value": {"intValue": "200"}}]
+    assert otlp_payload([span])["resourceSpans"][0]["resource"]["attributes"][0]["key"] == "service.name"
@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.compute_training_load import compute_training_load
+from app.database_memory import MemoryFirestoreClient
+from app.utils.training_load import (
+    TRAINING_LOAD_COLLECTION,
+    LoadColumns,
+    ewma_weights,
+    exercise_multipliers,
+    risk_level,
+    training_load,
+)
+
+TODAY = date(2031, 3, 31)
+
+
+def _day(days_ago: int) -> str:
+    return (TODAY - timedelta(days=days_ago)).strftime("%a %b %d %Y")
+
+
+def _iso(days_ago: int) -> str:
+    return (TODAY - timedelta(days=days_ago)).isoformat()
+
+
+def test_ewma_weights_favour_recent_days() -> None:
+    weights = ewma_weights(7, 56)
+    assert weights[-1] == 0.25
+    assert np.all(np.diff(weights) > 0)
+    assert abs(weights.sum() - 1) < 1e-6
+
+
+def test_load_columns_sum_entries_per_day() -> None:
+    columns = LoadColumns(TODAY, window=7)
+    columns.add_user("a", {"exercises": [
+        {"id": "squat", "performance": {_day(0): 100, "2031-03-31": 20, _day(1): 50, _day(7): 80, _day(-1): 90}},
+        {"id": "plank", "performance": {_day(0): "n/a", _day(2): True}},
+    ], "logged_days": [_iso(i) for i in range(-1, 8)]}, {"squat": 2.0})
+    columns.add_user("b", {}, {})
+    matrix = columns.matrix()
+    assert matrix.shape == (2, 7)
+    # Entries before the window, in the future or not numbers are left out
+    assert matrix[0].tolist() == [0, 0, 0, 0, 0, 100, 240]
+    assert matrix[1].sum() == 0
+
+
+def test_unlogged_days_carry_no_load() -> None:
+    columns = LoadColumns(TODAY, window=7)
+    # Both days were assigned (and seeded), only the first was performed
+    columns.add_user("a", {
+        "exercises": [{"id": "squat", "performance": {_day(1): 100, _day(0): 100}}],
+        "logged_days": [_iso(1)],
+    }, {})
+    columns.add_user("b", {"exercises": [{"id": "squat", "performance": {_day(0): 100}}]}, {})
+    matrix = columns.matrix()
+    assert matrix[0].tolist() == [0, 0, 0, 0, 0, 100, 0]
+    assert matrix[1].sum() == 0
+
+
+def test_training_load_metrics() -> None:
+    steady = np.full(56, 100.0)
+    spike = np.concatenate((np.full(49, 50.0), np.full(7, 200.0)))
+    rested = np.zeros(56)
+    week = np.concatenate((np.zeros(49), [100, 0, 100, 0, 100, 0, 100]))
+    metrics = training_load(np.vstack((steady, spike, rested, week)))
+    assert abs(metrics["acwr"][0] - 1) < 0.05
+    assert metrics["acwr"][1] > 1.5
+    assert np.isnan(metrics["acwr"][2])
+    assert metrics["weekly_load"].tolist() == [700, 1400, 0, 400]
+    # Constant loads have no spread, hence no monotony
+    assert np.isnan(metrics["monotony"][0])
+    assert metrics["monotony"][3] == (400 / 7) / np.std([100, 0, 100, 0, 100, 0, 100])
+    assert metrics["strain"][3] == 400 * metrics["monotony"][3]
+
+
+def test_risk_level() -> None:
+    assert risk_level(None, None) is None
+    assert risk_level(1.6, None) == "high"
+    assert risk_level(1.4, None) == "elevated"
+    assert risk_level(1.0, 2.5) == "elevated"
+    assert risk_level(0.5, 1.0) == "low"
+    assert risk_level(1.0, 1.0) == "optimal"
+
+
+def test_exercise_multipliers() -> None:
+    assert exercise_multipliers([("a", {"reps": 10, "sets": 3}), ("b", {"sets": 4}), ("c", {})]) == {"a": 30.0, "b": 4.0}
+
+
+def test_compute_training_load() -> None:
+    store = MemoryFirestoreClient()
+    store.collection("exercises").document("squat").set({"title": "Squat", "reps": 5, "sets": 5})
+    store.collection("users").document("a").set({
+        "full_name": "Ann",
+        "trainer_ids": ["t"],
+        "exercises": [{"id": "squat", "performance": {_day(i): 100 for i in range(0, 56, 2)}}],
+        "logged_days": [_iso(i) for i in range(0, 56, 2)],
+    })
+    store.collection("users").document("b").set({"email": "b@example.com"})
+    assert compute_training_load(store, today=TODAY) == 2
+    doc = store.collection(TRAINING_LOAD_COLLECTION).document("a").get().to_dict()
+    assert doc["as_of"] == "2031-03-31"
+    assert doc["full_name"] == "Ann" and doc["trainer_ids"] == ["t"]
+    assert doc["weekly_load"] == 4 * 100 * 25
+    assert doc["risk"] == "optimal"
+    doc = store.collection(TRAINING_LOAD_COLLECTION).document("b").get().to_dict()
+    assert (doc["acwr"], doc["risk"], doc["trainer_ids"]) == (None, None, [])
+
+
+def test_compute_training_load_deletes_deleted_users() -> None:
+    store = MemoryFirestoreClient()
+    store.collection("users").document("a").set({"email": "a@example.com"})
+    store.collection(TRAINING_LOAD_COLLECTION).document("gone").set({"trainer_ids": ["t"]})
+    assert compute_training_load(store, today=TODAY) == 2
+    assert store.collection(TRAINING_LOAD_COLLECTION).document("a").get().exists
+    assert not store.collection(TRAINING_LOAD_COLLECTION).document("gone").get().exists
@@ -0,0 +1,136 @@
+import random
+
+from app.database_memory import MemoryFirestoreClient
+from app.rebuild_user_stats import rebuild_user_stats
+from app.utils.user_stats import (
+    STATS_COLLECTION,
+    apply_changes,
+    build_stats,
+    empty_stats,
+    performance_changes,
+    performance_snapshot,
+)
+
+
+def test_streaks_and_records() -> None:
+    exercises = [{"id": "squat", "performance": {}}]
+    stats = empty_stats("u")
+    for date, value in [("2031-01-06", 50), ("2031-01-08", 60), ("2031-01-07", 55), ("2031-01-10", 40)]:
+        exercises[0]["performance"][date] = value
+        apply_changes(stats, [("squat", date, None, value)], exercises, logged=[date])
+    assert stats["workout_days"] == 4
+    assert stats["longest_streak"] == 3
+    assert stats["current_streak"] == 1
+    assert stats["last_workout_date"] == "2031-01-10"
+    assert stats["personal_records"]["squat"] == {"value": 60.0, "date": "2031-01-08"}
+
+    # Removing the record entry falls back to the next best value
+    del exercises[0]["performance"]["2031-01-08"]
+    apply_changes(stats, [("squat", "2031-01-08", 60, None)], exercises)
+    assert stats["personal_records"]["squat"] == {"value": 55.0, "date": "2031-01-07"}
+    assert stats["longest_streak"] == 2
+    assert stats == build_stats("u", {"exercises": exercises, "logged_days": list(stats["logged"])})
+
+
+def test_incremental_stats_match_rebuild() -> None:
+    rng = random.Random(7)
+    dates = [f"2031-02-{day:02d}" for day in range(1, 21)]
+    exercise_ids = ["a", "b", "c"]
+    exercises = [{"id": exercise_id, "performance": {}} for exercise_id in exercise_ids]
+    stats = empty_stats("u")
+    logged_days = set()
+    for _ in range(300):
+        exercise_id, date = rng.choice(exercise_ids), rng.choice(dates)
+        before = performance_snapshot(exercises, [exercise_id], [date])
+        performance = next(e for e in exercises if e["id"] == exercise_id)["performance"]
+        roll = rng.random()
+        logged = []
+        if roll < 0.3:
+            performance.pop(date, None)
+        elif roll < 0.5:
+            # Seeded by an assignment, not logged
+            performance[date] = 0
+        else:
+            performance[date] = rng.randint(0, 10)
+            logged = [date]
+            logged_days.add(date)
+        changes = performance_changes(before, exercises, [exercise_id], [date])
+        apply_changes(stats, changes, exercises, logged=logged)
+        assert stats == build_stats("u", {"exercises": exercises, "logged_days": sorted(logged_days)})
+
+
+def test_rebuild_user_stats() -> None:
+    session = MemoryFirestoreClient()
+    session.collection("users").document("u1").set({
+        "activities": [{"id": "a1", "date": "Mon Jan 06 2031"}],
+        "exercises": [{"id": "squat", "performance": {"Mon Jan 06 2031": 50}}],
+    })
+    session.collection("users").document("u2").set({})
+    assert rebuild_user_stats(session) == 2
+    stats = session.collection(STATS_COLLECTION).document("u1").get().to_dict()
+    assert stats["sessions"] == 1
+    assert stats["personal_records"] == {"squat": {"value": 50.0, "date": "2031-01-06"}}
+
+
+def test_client_summary_counts_planned_and_completed() -> None:
+    from datetime import date
+
+    from app.utils.user_stats import client_summary
+
+    user_data = {
+        "activities": [{"id": "a1", "date": "Mon Mar 01 2032"}, {"id": "a2", "date": "Wed Mar 03 2032"}],
+        "logged_days": ["2032-03-01"],
+        "schedules": {
+            "s1": {"activity_id": "a3", "weekdays": [4], "start": "2032-02-01", "end": "2032-03-31", "cancelled": []},
+        },
+        "exercises": [{"id": "squat", "performance": {"Mon Mar 01 2032": 60}}],
+    }
+    summary = client_summary(build_stats("u", user_data), today=date(2032, 3, 4))
+    # Mon a1 (done), Wed a2, Fri a3 from the schedule
+    assert summary["sessions_this_week"] == 3
+    assert summary["completed_this_week"] == 1
+    # Fridays Feb 06 .. Feb 27 from the schedule, plus Mon and Wed
+    assert summary["planned_last_4_weeks"] == 6
+    assert summary["last_session_date"] == "2032-03-01"
+    assert summary["recent_records"] == [{"exercise_id": "squat", "value": 60.0, "date": "2032-03-01"}]
+
+
+def test_client_summary_streak_ignores_planned_sessions() -> None:
+    from datetime import date
+
+    from app.utils.user_stats import client_summary
+
+    user_data = {
+        "activities": [{"id": "a1", "date": "Wed Mar 03 2032"}, {"id": "a1", "date": "Thu Mar 04 2032"}],
+        "logged_days": ["2032-03-01", "2032-03-02", "2032-03-10"],
+        "exercises": [{"id": "squat", "performance": {
+            "Mon Mar 01 2032": 60, "Tue Mar 02 2032": 60, "Wed Mar 03 2032": 60,
+            "Thu Mar 04 2032": 60, "Wed Mar 10 2032": 60,
+        }}],
+    }
+    summary = client_summary(build_stats("u", user_data), today=date(2032, 3, 5))
+    # Mar 03 and 04 were only planned; Mar 10 is logged ahead of today
+    assert summary["last_session_date"] == "2032-03-02"
+    assert summary["current_streak"] == 2
+
+
+def test_seeded_days_are_not_workouts() -> None:
+    exercises = [{"id": "squat", "performance": {}}]
+    stats = empty_stats("u")
+    for date in ["2025-01-06", "2025-01-07"]:
+        exercises[0]["performance"][date] = 50
+        apply_changes(stats, [("squat", date, None, 50)], exercises, logged=[date])
+    # Assigning an activity seeds the last value on the planned date
+    exercises[0]["performance"]["2025-12-01"] = 50
+    apply_changes(
+        stats, [("squat", "2025-12-01", None, 50)], exercises,
+        assigned=[{"id": "a1", "date": "2025-12-01"}],
+    )
+    assert stats["workout_days"] == 2
+    assert stats["last_workout_date"] == "2025-01-07"
+    assert stats["current_streak"] == 2
+    assert list(stats["days"]) == ["2025-01-06", "2025-01-07"]
+
+    # Logging on the planned day makes it a workout day
+    apply_changes(stats, [("squat", "2025-12-01", 50, 55)], exercises, logged=["2025-12-01"])
+    assert (stats["workout_days"], stats["last_workout_date"], stats["current_streak"]) == (3, "2025-12-01", 1)
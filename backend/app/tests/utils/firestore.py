@@ -0,0 +1,31 @@
+from typing import Optional
+
+from httpx import Response
+
+from app.database_instrumentation import parse_server_timing
+
+
+def firestore_ops(response: Response) -> dict[str, float]:
+    """Firestore work reported by the ``Server-Timing`` header of a response."""
+    header = response.headers.get("server-timing")
+    assert header, "response has no Server-Timing header"
+    return parse_server_timing(header)
+
+
+def assert_firestore_budget(
+    response: Response,
+    *,
+    reads: Optional[int] = None,
+    writes: Optional[int] = None,
+    queries: Optional[int] = None,
+    docs: Optional[int] = None,
+) -> None:
+    """Fail if the request used more Firestore operations than allowed."""
+    ops = firestore_ops(response)
+    budget = {"reads": reads, "writes": writes, "queries": queries, "docs": docs}
+    for name, limit in budget.items():
+        if limit is not None:
+            assert ops.get(name, 0) <= limit, (
+                f"{response.request.method} {response.request.url.path}: "
+                f"{name}={ops.get(name, 0):g} exceeds budget {limit} ({ops})"
+            )
@@ -6,7 +6,7 @@ from tenacity import after_log, before_log, retry, stop_after_attempt, wait_fixe
 from google.cloud import firestore
 
 from app.config import settings
-from app.database_engine import firestore_client
+from app.database_engine import get_firestore_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -41,6 +41,7 @@ def main() -> None:
     
     if settings.USE_FIREBASE:
         logger.info("Testing Firestore connection")
+        firestore_client = get_firestore_client()
         if not firestore_client:
             raise Exception("Firestore client not initialized")
         init_firestore(firestore_client)
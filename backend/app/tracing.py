@@ -0,0 +1,311 @@
+"""
+Lightweight OpenTelemetry-style tracing.
+
+``TracingMiddleware`` opens a root span per request (continuing an incoming
+W3C ``traceparent``), dependencies open child spans with ``start_span`` /
+``traced`` and ``app.database_instrumentation`` adds one span per Firestore
+operation. The current span lives in a ``ContextVar``, so spans opened in
+threadpool endpoints nest under the request.
+
+Finished spans are exported in batches by a background thread as OTLP/JSON:
+``TRACING_EXPORTER="file"`` appends one ``ExportTraceServiceRequest`` per
+line to ``TRACING_FILE`` (the collector's file exporter format) and
+``"otlp"`` posts it to ``TRACING_OTLP_ENDPOINT``/v1/traces. With
+``TRACING_EXPORTER="none"`` (the default) nothing is recorded.
+``TRACES_SAMPLE_RATE`` decides per trace whether it is recorded.
+"""
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "gym-api"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, start_ns: Optional[int] = None) -> None:
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def child(self, name: str, start_ns: Optional[int] = None) -> "Span":
+        return Span(name, self.trace_id, self.span_id, start_ns)
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.submit(self)
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2 if self.parent_id is None else 1,  # SERVER / INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 0},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current one; a no-op outside a sampled trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = parent.child(name)
+    span.attributes.update(attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = type(exc).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def traced(name: str) -> Callable:
+    """Decorator running a (sync) function inside ``start_span(name)``."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_span(name: str, duration_ns: int, attributes: dict[str, Any]) -> None:
+    """Add an already finished child span that ended just now."""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    span = parent.child(name, start_ns=end_ns - duration_ns)
+    span.attributes.update(attributes)
+    span.end(end_ns)
+
+
+def _parse_traceparent(header: str) -> Optional[tuple[str, str, bool]]:
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def start_trace(name: str, traceparent: str = "") -> Optional[Span]:
+    """Root span for a request, or None when the trace is not sampled."""
+    parsed = _parse_traceparent(traceparent) if traceparent else None
+    if parsed is not None:
+        trace_id, parent_id, sampled = parsed
+    else:
+        trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+        sampled = random.random() < settings.TRACES_SAMPLE_RATE
+    if not sampled:
+        return None
+    return Span(name, trace_id, parent_id)
+
+
+class SpanExporter:
+    """Batches finished spans on a background thread and hands them to ``write``."""
+
+    def __init__(self, write: Callable[[dict[str, Any]], None], batch_size: int = 512, interval: float = 1.0) -> None:
+        self._write = write
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._batch_size = batch_size
+        self._interval = interval
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            batch: list[Span] = []
+            deadline = time.monotonic() + self._interval
+            stop = False
+            while len(batch) < self._batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self._write(otlp_payload(batch))
+                except Exception:
+                    logger.warning("Dropped %d spans", len(batch), exc_info=True)
+            if stop:
+                return
+
+
+def otlp_payload(spans: list[Span]) -> dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                _otlp_attribute("service.name", SERVICE_NAME),
+                _otlp_attribute("service.version", settings.APP_VERSION),
+                _otlp_attribute("deployment.environment", settings.ENVIRONMENT),
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "app.tracing"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]
+    }
+
+
+def file_writer(path: str) -> Callable[[dict[str, Any]], None]:
+    def write(payload: dict[str, Any]) -> None:
+        with open(path, "a") as f:
+            f.write(json.dumps(payload) + "\n")
+    return write
+
+
+def otlp_http_writer(endpoint: str) -> Callable[[dict[str, Any]], None]:
+    url = endpoint.rstrip("/") + "/v1/traces"
+
+    def write(payload: dict[str, Any]) -> None:
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=5):
+            pass
+    return write
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    global _exporter
+    if _exporter is None and settings.TRACING_EXPORTER != "none":
+        with _exporter_lock:
+            if _exporter is None:
+                if settings.TRACING_EXPORTER == "otlp":
+                    if not settings.TRACING_OTLP_ENDPOINT:
+                        raise RuntimeError("TRACING_OTLP_ENDPOINT must be set for the otlp exporter")
+                    write = otlp_http_writer(str(settings.TRACING_OTLP_ENDPOINT))
+                else:
+                    write = file_writer(settings.TRACING_FILE)
+                _exporter = SpanExporter(write)
+                atexit.register(shutdown_tracing)
+    return _exporter
+
+
+def shutdown_tracing() -> None:
+    """Export pending spans and stop the exporter thread."""
+    global _exporter
+    with _exporter_lock:
+        exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.shutdown()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of every sampled request."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        span = start_trace(f"{scope['method']} {scope['path']}", headers.get(b"traceparent", b"").decode())
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        span.set_attribute("http.request.method", scope["method"])
+        span.set_attribute("url.path", scope["path"])
+
+        async def send_with_status(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as exc:
+            span.error = type(exc).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.route", route)
+            span.end()
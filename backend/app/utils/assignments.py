@@ -0,0 +1,92 @@
+"""
+Date index over a user's activity assignments.
+
+User documents keep the ``activities`` list the frontend reads
+(``[{"id": ..., "date": "Mon Jan 06 2025"}, ...]``) plus an
+``activities_by_date`` map from canonical ISO date to the entries of that
+list assigned that day, so lookups by date don't scan the whole history and
+several activities can share a day.
+Documents written before the index existed get it built on first use.
+"""
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from google.cloud.firestore import DELETE_FIELD
+from google.cloud.firestore_v1.field_path import FieldPath
+
+
+# Assignment dates are stored as JavaScript Date.toDateString() values.
+ASSIGNMENT_DATE_FORMAT = "%a %b %d %Y"
+INDEX_FIELD = "activities_by_date"
+
+
+def parse_assignment_date(value: Optional[str]) -> Optional[datetime]:
+    for fmt in (ASSIGNMENT_DATE_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def canonical_date(value: str) -> str:
+    """ISO date for any accepted format; unknown formats are kept verbatim."""
+    parsed = parse_assignment_date(value)
+    return parsed.date().isoformat() if parsed else value
+
+
+def build_assignment_index(assignments: Iterable[Any]) -> dict[str, list[dict]]:
+    index: dict[str, list[dict]] = {}
+    for assignment in assignments:
+        if isinstance(assignment, dict) and assignment.get("id") and assignment.get("date"):
+            add_to_index(index, assignment)
+    return index
+
+
+def assignment_index(user_data: dict) -> dict[str, list[dict]]:
+    """The stored index, or one built from ``activities`` for older documents."""
+    index = user_data.get(INDEX_FIELD)
+    if isinstance(index, dict):
+        return index
+    return build_assignment_index(user_data.get("activities", []))
+
+
+def assignments_on(index: dict[str, list[dict]], date: str) -> list[dict]:
+    """``activities`` entries assigned on ``date``, as stored."""
+    return list(index.get(canonical_date(date), []))
+
+
+def find_assignment(index: dict[str, list[dict]], date: str, activity_id: str) -> Optional[dict]:
+    for assignment in index.get(canonical_date(date), []):
+        if assignment["id"] == activity_id:
+            return assignment
+    return None
+
+
+def add_to_index(index: dict[str, list[dict]], assignment: dict) -> None:
+    entries = index.setdefault(canonical_date(assignment["date"]), [])
+    if not any(entry["id"] == assignment["id"] for entry in entries):
+        entries.append({"id": assignment["id"], "date": assignment["date"]})
+
+
+def remove_from_index(index: dict[str, list[dict]], assignment: dict) -> None:
+    key = canonical_date(assignment["date"])
+    entries = [entry for entry in index.get(key, []) if entry["id"] != assignment["id"]]
+    if entries:
+        index[key] = entries
+    else:
+        index.pop(key, None)
+
+
+def index_updates(user_data: dict, index: dict[str, list[dict]], *dates: str) -> dict[str, Any]:
+    """
+    ``update()`` payload writing only the index days of ``dates``, or the
+    whole index if the document doesn't have one stored yet.
+    """
+    if not isinstance(user_data.get(INDEX_FIELD), dict):
+        return {INDEX_FIELD: index}
+    updates: dict[str, Any] = {}
+    for date in dates:
+        key = canonical_date(date)
+        updates[FieldPath(INDEX_FIELD, key).to_api_repr()] = index.get(key, DELETE_FIELD)
+    return updates
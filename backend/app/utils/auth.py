@@ -1,3 +1,4 @@
+import logging
 from collections.abc import Generator
 from typing import Annotated, Any
 
@@ -9,9 +10,14 @@ from pydantic import ValidationError
 from sqlmodel import Session, select
 
 from app.config import settings
-from app.database_engine import firestore_client
+from app.database_coalescing import CoalescingClient
+from app.database_engine import get_firestore_client
+from app.database_instrumentation import InstrumentedClient, current_op_stats
 from app.models.user import User
 from app.models.auth import TokenPayload
+from app.tracing import start_span, traced
+
+logger = logging.getLogger(__name__)
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -20,7 +26,13 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 def get_db() -> Generator[Any, None, None]:
     if settings.USE_FIREBASE:
-        yield firestore_client
+        with start_span("get_db"):
+            client = get_firestore_client()
+            if settings.FIRESTORE_SINGLE_FLIGHT:
+                client = CoalescingClient(client)
+            if settings.FIRESTORE_INSTRUMENTATION:
+                client = InstrumentedClient(client, current_op_stats())
+        yield client
     else:
         from app.database_engine import engine
         with Session(engine) as session:
@@ -31,44 +43,37 @@ SessionDep = Annotated[Any, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
+@traced("get_current_user")
 def get_current_user(db_client: SessionDep, token: TokenDep) -> User:
-    print(f"get_current_user called with token: {token[:20]}..." if token else "No token")
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.SECURITY_ALGORITHM]
         )
         token_data = TokenPayload(**payload)
-        print(f"Token decoded successfully, user_id: {token_data.sub}")
     except (InvalidTokenError, ValidationError) as e:
-        print(f"Token validation failed: {e}")
+        logger.debug("Token validation failed", extra={"error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
     
     if settings.USE_FIREBASE:
-        print("Using Firebase for user lookup")
         # Firestore user lookup - use the client passed from get_db
         if not db_client:
-            print("No Firestore client available")
             raise HTTPException(status_code=500, detail="Database not available")
         
         # Get user document directly by document ID
         users_ref = db_client.collection("users")
         doc = users_ref.document(token_data.sub).get()
         
-        print(f"Looking for document with ID: {token_data.sub}")
-        
         if not doc.exists:
-            print(f"User document not found in Firestore with id: {token_data.sub}")
+            logger.debug("User document not found", extra={"user_id": token_data.sub})
             raise HTTPException(status_code=404, detail="User not found")
         
         user_data = doc.to_dict()
         user_data["id"] = doc.id  # Add the document ID as the id field
         user = User(**user_data)
-        print(f"User found: {user.email}")
     else:
-        print("Using PostgreSQL for user lookup")
         # PostgreSQL user lookup
         if not db_client:
             raise HTTPException(status_code=500, detail="Database session not available")
@@ -78,10 +83,8 @@ def get_current_user(db_client: SessionDep, token: TokenDep) -> User:
             raise HTTPException(status_code=404, detail="User not found")
     
     if not user.is_active:
-        print(f"User {user.email} is not active")
+        logger.debug("Inactive user", extra={"user_id": str(user.id)})
         raise HTTPException(status_code=400, detail="Inactive user")
-    
-    print(f"Authentication successful for user: {user.email}")
     return user
 
 
@@ -0,0 +1,66 @@
+"""
+Batched Firestore reads and writes shared by the routers and jobs.
+"""
+from typing import Any, Iterable
+
+
+# Documents fetched per batched read
+GET_ALL_CHUNK_SIZE = 300
+
+# Firestore accepts at most 500 writes per batch
+WRITE_BATCH_SIZE = 500
+
+
+def get_documents(session: Any, collection: str, ids: Iterable[str]) -> dict[str, dict]:
+    """
+    Fetch documents by id with batched reads, one round-trip per chunk.
+    Missing documents are left out.
+    """
+    collection_ref = session.collection(collection)
+    ids = list(ids)
+    documents = {}
+    for i in range(0, len(ids), GET_ALL_CHUNK_SIZE):
+        refs = [collection_ref.document(doc_id) for doc_id in ids[i:i + GET_ALL_CHUNK_SIZE]]
+        for snapshot in session.get_all(refs):
+            if snapshot.exists:
+                data = snapshot.to_dict()
+                data["id"] = snapshot.id
+                documents[snapshot.id] = data
+    return documents
+
+
+class BatchWriter:
+    """
+    Write batch committed every WRITE_BATCH_SIZE writes; ``commit`` sends
+    the rest and returns how many writes were committed in all.
+    """
+
+    def __init__(self, session: Any) -> None:
+        self._session = session
+        self._batch = session.batch()
+        self._pending = 0
+        self.written = 0
+
+    def set(self, reference: Any, data: dict, merge: bool = False) -> None:
+        self._batch.set(reference, data, merge=merge)
+        self._wrote()
+
+    def update(self, reference: Any, data: dict) -> None:
+        self._batch.update(reference, data)
+        self._wrote()
+
+    def delete(self, reference: Any) -> None:
+        self._batch.delete(reference)
+        self._wrote()
+
+    def _wrote(self) -> None:
+        self._pending += 1
+        if self._pending == WRITE_BATCH_SIZE:
+            self.commit()
+
+    def commit(self) -> int:
+        if self._pending:
+            self._batch.commit()
+            self.written += self._pending
+            self._batch, self._pending = self._session.batch(), 0
+        return self.written
@@ -12,7 +12,6 @@ from jwt.exceptions import InvalidTokenError
 
 from app.config import settings
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -0,0 +1,145 @@
+"""
+Reverse index from exercises to the activities and users referencing them.
+
+``exercise_refs/{exercise_id}`` keeps the ids of the activities containing
+the exercise and, per user, how many of that user's activities contain it:
+
+    {exercise_id, activity_count, activity_ids, activity_ids_complete,
+     user_count, users: {user_id: activity count}}
+
+Writes changing an activity's ``exercises`` or ``user_id`` go through
+``write_activity``, which writes the activity and the refs of the exercises
+it gained or lost in one transaction, so whether an exercise is in use and
+which activities a change to it touches is a single read. The id list stops
+growing at MAX_LISTED_ACTIVITIES to keep the document far below Firestore's
+1 MiB limit; past that ``activity_ids_complete`` is false and callers that
+need every activity query ``activities`` instead. Activities written before
+the index existed are picked up by ``python -m app.rebuild_exercise_refs``.
+"""
+from typing import Any, Optional
+
+from google.cloud import firestore
+
+from app.utils.query_cache import collection_written
+
+
+REFS_COLLECTION = "exercise_refs"
+
+# Activity ids listed per exercise; the count stays exact past it
+MAX_LISTED_ACTIVITIES = 5000
+
+
+def empty_refs(exercise_id: str) -> dict[str, Any]:
+    return {
+        "exercise_id": exercise_id,
+        "activity_count": 0,
+        "activity_ids": [],
+        "activity_ids_complete": True,
+        "user_count": 0,
+        "users": {},
+    }
+
+
+def _members(activity: Optional[dict]) -> dict[str, Optional[str]]:
+    """Exercise id -> user id of an activity's exercises."""
+    if not activity:
+        return {}
+    user_id = activity.get("user_id")
+    user_id = str(user_id) if user_id is not None else None
+    return {str(exercise_id): user_id for exercise_id in activity.get("exercises") or []}
+
+
+def ref_changes(
+    old: Optional[dict], new: Optional[dict]
+) -> tuple[dict[str, Optional[str]], dict[str, Optional[str]]]:
+    """
+    Exercises whose refs lose the activity and exercises whose refs gain it
+    (each with the user of the activity) when ``old`` becomes ``new``. An
+    activity moved to another user counts as removed then added.
+    """
+    before, after = _members(old), _members(new)
+    removed = {i: user for i, user in before.items() if i not in after or after[i] != user}
+    added = {i: user for i, user in after.items() if i not in before or before[i] != user}
+    return removed, added
+
+
+def add_ref(refs: dict, activity_id: str, user_id: Optional[str]) -> None:
+    refs["activity_count"] += 1
+    if activity_id not in refs["activity_ids"]:
+        if len(refs["activity_ids"]) < MAX_LISTED_ACTIVITIES:
+            refs["activity_ids"].append(activity_id)
+        else:
+            refs["activity_ids_complete"] = False
+    if user_id is not None:
+        refs["users"][user_id] = refs["users"].get(user_id, 0) + 1
+    refs["user_count"] = len(refs["users"])
+
+
+def remove_ref(refs: dict, activity_id: str, user_id: Optional[str]) -> None:
+    refs["activity_count"] = max(refs["activity_count"] - 1, 0)
+    if activity_id in refs["activity_ids"]:
+        refs["activity_ids"].remove(activity_id)
+    if not refs["activity_count"]:
+        refs["activity_ids"], refs["activity_ids_complete"] = [], True
+    if user_id in refs["users"]:
+        refs["users"][user_id] -= 1
+        if refs["users"][user_id] <= 0:
+            del refs["users"][user_id]
+    refs["user_count"] = len(refs["users"])
+
+
+def write_activity(
+    session: Any,
+    activity_ref: Any,
+    data: Optional[dict] = None,
+    update: Optional[dict] = None,
+    delete: bool = False,
+) -> None:
+    """
+    Write an activity together with the refs of the exercises it gains or
+    loses, in one transaction: ``data`` replaces the document, ``update``
+    updates some of its fields and ``delete`` removes it. The version of
+    ``activities`` is bumped in the same transaction.
+    """
+    refs_collection = session.collection(REFS_COLLECTION)
+
+    @firestore.transactional
+    def apply(transaction) -> None:
+        snapshot = next(transaction.get(activity_ref))
+        old = snapshot.to_dict() if snapshot.exists else None
+        if delete:
+            new = None
+        elif update is not None:
+            new = {**(old or {}), **update}
+        else:
+            new = data
+        removed, added = ref_changes(old, new)
+        exercise_ids = list(dict.fromkeys([*removed, *added]))
+        refs = {exercise_id: empty_refs(exercise_id) for exercise_id in exercise_ids}
+        if exercise_ids:
+            references = [refs_collection.document(exercise_id) for exercise_id in exercise_ids]
+            for refs_doc in transaction.get_all(references):
+                if refs_doc.exists:
+                    refs[refs_doc.id] = refs_doc.to_dict()
+        for exercise_id, user_id in removed.items():
+            remove_ref(refs[exercise_id], activity_ref.id, user_id)
+        for exercise_id, user_id in added.items():
+            add_ref(refs[exercise_id], activity_ref.id, user_id)
+        for exercise_id in exercise_ids:
+            transaction.set(refs_collection.document(exercise_id), refs[exercise_id])
+
+        if delete:
+            transaction.delete(activity_ref)
+        elif update is not None:
+            transaction.update(activity_ref, update)
+        else:
+            transaction.set(activity_ref, data)
+        collection_written(session, "activities", transaction)
+
+    apply(session.transaction())
+
+
+def exercise_refs(session: Any, exercise_id: str) -> Optional[dict]:
+    """The refs document of an exercise, or None if it was never indexed."""
+    snapshot = session.collection(REFS_COLLECTION).document(exercise_id).get()
+    return snapshot.to_dict() if snapshot.exists else None
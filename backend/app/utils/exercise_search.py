@@ -0,0 +1,507 @@
+"""
+In-process full-text search, facets and similarity over exercises.
+
+Each exercise gets a slot; the index keeps, per term, a posting list
+``{slot: weighted term frequency}`` (title words count ``TITLE_WEIGHT``
+times) whose NumPy arrays are scored at query time, a sorted vocabulary
+for prefix lookups with ``bisect``, and a symmetric-delete map (every term
+and each of its one-character deletions) for typo-tolerant lookups. Hits are
+ranked with BM25 and every query word must match: exactly, as a typo within
+one edit (words of ``FUZZY_MIN_LENGTH`` characters or more) or, for the last
+word only, as a prefix of an indexed word.
+
+Filters and facet counts on the enum fields (``FACETS``) are read from a
+small count cube (exercises per combination of values), one for all
+exercises and one per owner, so they cost the same at any collection size.
+
+Similar exercises are the nearest neighbours by cosine similarity of a
+per-slot unit feature vector (one-hot facets, log-scaled reps, sets and
+duration, hashed title TF-IDF), one matrix-vector product per query;
+neighbour lists are cached until the index changes.
+
+Only active exercises are indexed. The index is built once at startup,
+kept up to date by the exercise endpoints of this worker, and a background
+refresher picks up exercises written by other workers through their
+``updated_at`` stamp.
+"""
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from cachetools import LRUCache
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from app.metrics import record_cache
+from app.models.exercise import Difficulty, ExerciseCategory, MuscleGroup
+
+
+logger = logging.getLogger(__name__)
+
+UPDATED_AT_FIELD = "updated_at"
+# Enum fields that can be filtered on and counted
+FACETS = {
+    "category": [value.value for value in ExerciseCategory],
+    "muscle_group": [value.value for value in MuscleGroup],
+    "difficulty": [value.value for value in Difficulty],
+}
+TITLE_WEIGHT = 3
+FUZZY_MIN_LENGTH = 4
+PREFIX_MIN_LENGTH = 2
+# Completions of the last word that are scored, the most common first
+MAX_PREFIX_TERMS = 50
+# Score multipliers of inexact matches
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Similarity features: reps, sets and duration (seconds) are log-scaled so
+# that these values map to 1, and title words are hashed into TITLE_DIMENSIONS
+# TF-IDF buckets whose block weighs TITLE_SIMILARITY_WEIGHT against the rest.
+NUMERIC_SCALES = {"reps": 30, "sets": 10, "duration": 3600}
+TITLE_DIMENSIONS = 64
+TITLE_SIMILARITY_WEIGHT = 1.5
+# Neighbour lists kept for repeated lookups until the index changes
+SIMILAR_CACHE_SIZE = 1024
+
+_WORD = re.compile(r"[a-z0-9]+")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_CUBE_SHAPE = tuple(len(values) + 1 for values in FACETS.values())
+_TITLE_OFFSET = sum(len(values) for values in FACETS.values()) + len(NUMERIC_SCALES)
+_FEATURES = _TITLE_OFFSET + TITLE_DIMENSIONS
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Lowercase words of ``text`` with accents stripped."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    return _WORD.findall("".join(c for c in text if not unicodedata.combining(c)))
+
+
+def exercise_written() -> dict[str, Any]:
+    """Entries to add to every write of an exercise document."""
+    return {UPDATED_AT_FIELD: SERVER_TIMESTAMP}
+
+
+def _deletes(term: str) -> list[str]:
+    return list(dict.fromkeys(term[:i] + term[i + 1:] for i in range(len(term))))
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if ``a`` and ``b`` differ by one insertion, deletion, substitution or transposition."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (
+        i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+    )
+
+
+class ExerciseIndex:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._reset()
+        self.built = False
+        self.watermark = _EPOCH
+        # Bumped by every change, so cached neighbours of older versions go unused
+        self.version = 0
+        self._similar_cache: LRUCache = LRUCache(maxsize=SIMILAR_CACHE_SIZE)
+
+    def _reset(self) -> None:
+        # Exercises live in slots so scores are dense arrays indexed by slot
+        self._slots: dict[str, int] = {}
+        self._ids: list[Optional[str]] = []
+        self._free: list[int] = []
+        self._terms: list[tuple[str, ...]] = []
+        self._lengths = np.zeros(0, dtype=np.float64)
+        self._owners = np.zeros(0, dtype=np.int64)
+        self._owner_codes: dict[str, int] = {}
+        # Exercises counted per combination of facet values (code 0 is unset),
+        # for all owners and per owner, and the combination of each slot
+        self._cube = np.zeros(_CUBE_SHAPE, dtype=np.int64)
+        self._owner_cubes: dict[int, np.ndarray] = {}
+        self._combinations: list[tuple[int, ...]] = []
+        # Unit feature vector of each slot (zero for free slots)
+        self._features = np.zeros((0, _FEATURES), dtype=np.float32)
+        self._total_length = 0.0
+        # term -> {slot: weighted frequency}, and its arrays built on demand
+        self._postings: dict[str, dict[int, int]] = {}
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._vocabulary: list[str] = []
+        self._variants: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # -- writes ----------------------------------------------------------------
+
+    def build(self, exercises: Iterable[tuple[str, dict]]) -> None:
+        """Replace the whole index with ``(id, document)`` pairs."""
+        with self._lock:
+            self._reset()
+            self.watermark = _EPOCH
+            for exercise_id, data in exercises:
+                self._upsert(exercise_id, data)
+            self.built = True
+
+    def upsert(self, exercise_id: str, data: dict) -> None:
+        """Index or re-index an exercise; inactive exercises are removed."""
+        with self._lock:
+            self._upsert(exercise_id, data)
+
+    def remove(self, exercise_id: str) -> None:
+        with self._lock:
+            self._remove(exercise_id)
+
+    def _allocate(self, exercise_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = exercise_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(exercise_id)
+            self._terms.append(())
+            self._combinations.append(())
+            if slot == len(self._lengths):
+                grown = max(1024, 2 * slot)
+                self._lengths = np.concatenate((self._lengths, np.zeros(grown - slot)))
+                self._owners = np.concatenate((self._owners, np.full(grown - slot, -1)))
+                self._features = np.concatenate(
+                    (self._features, np.zeros((grown - slot, _FEATURES), dtype=np.float32))
+                )
+        self._slots[exercise_id] = slot
+        return slot
+
+    def _upsert(self, exercise_id: str, data: dict) -> None:
+        self._remove(exercise_id)
+        self.version += 1
+        updated_at = data.get(UPDATED_AT_FIELD)
+        if isinstance(updated_at, datetime) and updated_at > self.watermark:
+            self.watermark = updated_at
+        if not data.get("is_active", True):
+            return
+        terms: dict[str, int] = {}
+        for term in tokenize(data.get("title")):
+            terms[term] = terms.get(term, 0) + TITLE_WEIGHT
+        for term in tokenize(data.get("description")):
+            terms[term] = terms.get(term, 0) + 1
+        slot = self._allocate(exercise_id)
+        owner = str(data.get("owner_id"))
+        self._terms[slot] = tuple(terms)
+        self._lengths[slot] = sum(terms.values())
+        self._owners[slot] = self._owner_codes.setdefault(owner, len(self._owner_codes))
+        combination = tuple(
+            values.index(data.get(field)) + 1 if data.get(field) in values else 0
+            for field, values in FACETS.items()
+        )
+        self._combinations[slot] = combination
+        self._cube[combination] += 1
+        owner_cube = self._owner_cubes.get(self._owners[slot])
+        if owner_cube is None:
+            owner_cube = self._owner_cubes[self._owners[slot]] = np.zeros(_CUBE_SHAPE, dtype=np.int64)
+        owner_cube[combination] += 1
+        self._total_length += self._lengths[slot]
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+                for variant in [term, *_deletes(term)]:
+                    self._variants.setdefault(variant, set()).add(term)
+            postings[slot] = frequency
+            self._arrays.pop(term, None)
+        self._features[slot] = self._feature_vector(data)
+
+    def _feature_vector(self, data: dict) -> np.ndarray:
+        """
+        One-hot facets, scaled numbers and title TF-IDF, as a unit vector.
+        The IDF is that of the moment the exercise is written.
+        """
+        vector = np.zeros(_FEATURES, dtype=np.float32)
+        offset = 0
+        for field, values in FACETS.items():
+            if data.get(field) in values:
+                vector[offset + values.index(data[field])] = 1
+            offset += len(values)
+        for field, scale in NUMERIC_SCALES.items():
+            value = data.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+                vector[offset] = min(math.log1p(value) / math.log1p(scale), 1.0)
+            offset += 1
+        title = np.zeros(TITLE_DIMENSIONS, dtype=np.float32)
+        count = len(self._slots)
+        for term in tokenize(data.get("title")):
+            frequency = len(self._postings[term])
+            title[zlib.crc32(term.encode()) % TITLE_DIMENSIONS] += math.log(
+                1 + (count - frequency + 0.5) / (frequency + 0.5)
+            )
+        norm = np.linalg.norm(title)
+        if norm:
+            vector[_TITLE_OFFSET:] = TITLE_SIMILARITY_WEIGHT * title / norm
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, exercise_id: str) -> None:
+        slot = self._slots.pop(exercise_id, None)
+        if slot is None:
+            return
+        self.version += 1
+        self._total_length -= self._lengths[slot]
+        self._cube[self._combinations[slot]] -= 1
+        self._owner_cubes[self._owners[slot]][self._combinations[slot]] -= 1
+        self._lengths[slot] = 0
+        self._features[slot] = 0
+        self._owners[slot] = -1
+        self._ids[slot] = None
+        self._free.append(slot)
+        terms, self._terms[slot] = self._terms[slot], ()
+        for term in terms:
+            postings = self._postings[term]
+            del postings[slot]
+            self._arrays.pop(term, None)
+            if postings:
+                continue
+            del self._postings[term]
+            del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+            for variant in [term, *_deletes(term)]:
+                variants = self._variants[variant]
+                variants.discard(term)
+                if not variants:
+                    del self._variants[variant]
+
+    # -- queries ---------------------------------------------------------------
+
+    def _postings_arrays(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+        return arrays
+
+    def _expansions(self, word: str, last: bool) -> dict[str, float]:
+        """Indexed terms matching a query word, with their score multiplier."""
+        matches: dict[str, float] = {}
+        if len(word) >= FUZZY_MIN_LENGTH:
+            for variant in [word, *_deletes(word)]:
+                for term in self._variants.get(variant, ()):
+                    if _within_one_edit(word, term):
+                        matches[term] = FUZZY_WEIGHT
+        if last and len(word) >= PREFIX_MIN_LENGTH:
+            start = bisect.bisect_left(self._vocabulary, word)
+            end = bisect.bisect_left(self._vocabulary, word + "\uffff", start)
+            completions = self._vocabulary[start:end]
+            if len(completions) > MAX_PREFIX_TERMS:
+                completions = heapq.nlargest(
+                    MAX_PREFIX_TERMS, completions, key=lambda t: len(self._postings[t])
+                )
+            for term in completions:
+                matches[term] = PREFIX_WEIGHT
+        if word in self._postings:
+            matches[word] = 1.0
+        return matches
+
+    def search(
+        self,
+        query: str,
+        owner_id: Optional[str] = None,
+        limit: int = 20,
+    ) -> tuple[list[tuple[str, float]], int]:
+        """
+        Best ``limit`` ``(exercise id, score)`` pairs for ``query`` and the
+        total number of matches. ``owner_id`` restricts hits to one owner.
+        """
+        words = tokenize(query)
+        if not words:
+            return [], 0
+        with self._lock:
+            count = len(self._slots)
+            if not count:
+                return [], 0
+            average_length = self._total_length / count
+            matches = []
+            for word in dict.fromkeys(words):
+                expansions = self._expansions(word, last=word == words[-1])
+                if not expansions:
+                    return [], 0
+                matches.append(self._word_scores(expansions, count, average_length))
+            # Every word must match; start from the most selective one
+            matches.sort(key=lambda match: len(match[0]))
+            slots, scores = matches[0]
+            if owner_id is not None:
+                mine = self._owners[slots] == self._owner_codes.get(owner_id, -2)
+                slots, scores = slots[mine], scores[mine]
+            for other_slots, other_scores in matches[1:]:
+                slots, i, j = np.intersect1d(slots, other_slots, assume_unique=True, return_indices=True)
+                scores = scores[i] + other_scores[j]
+            if len(slots) > limit:
+                best = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                best = np.arange(len(slots))
+            hits = sorted(
+                ((self._ids[slots[k]], float(scores[k])) for k in best),
+                key=lambda hit: (-hit[1], hit[0]),
+            )
+            return hits, len(slots)
+
+    def _word_scores(
+        self, expansions: dict[str, float], count: int, average_length: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Slots matching a query word and their score (that of the best matching term)."""
+        all_slots, all_scores = [], []
+        for term, weight in expansions.items():
+            slots, frequencies = self._postings_arrays(term)
+            idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+            norm = K1 * (1 - B + B * self._lengths[slots] / average_length)
+            all_slots.append(slots)
+            all_scores.append(weight * idf * frequencies * (K1 + 1) / (frequencies + norm))
+        if len(all_slots) == 1:
+            return all_slots[0], all_scores[0]
+        slots, scores = np.concatenate(all_slots), np.concatenate(all_scores)
+        order = np.lexsort((-scores, slots))
+        slots, scores = slots[order], scores[order]
+        first = np.ones(len(slots), dtype=bool)
+        first[1:] = slots[1:] != slots[:-1]
+        return slots[first], scores[first]
+
+    def similar(
+        self, exercise_id: str, owner_id: Optional[str] = None, limit: int = 10
+    ) -> Optional[list[tuple[str, float]]]:
+        """
+        Best ``limit`` ``(exercise id, cosine similarity)`` pairs for an
+        indexed exercise, None if it is not indexed. ``owner_id`` restricts
+        the neighbours to one owner.
+        """
+        with self._lock:
+            slot = self._slots.get(exercise_id)
+            if slot is None:
+                return None
+            key = (exercise_id, owner_id, limit, self.version)
+            cached = self._similar_cache.get(key)
+            record_cache("exercise_similar", cached is not None)
+            if cached is not None:
+                return cached
+            if owner_id is None:
+                candidates = None
+                # Rows past the last allocated slot are spare capacity
+                allocated = len(self._ids)
+                scores = self._features[:allocated] @ self._features[slot]
+                # Free slots have zero vectors; keep them and the exercise out
+                scores[self._owners[:allocated] < 0] = -np.inf
+            else:
+                candidates = np.flatnonzero(self._owners == self._owner_codes.get(owner_id, -2))
+                scores = self._features[candidates] @ self._features[slot]
+            if candidates is None:
+                scores[slot] = -np.inf
+            else:
+                scores[candidates == slot] = -np.inf
+            size = min(limit, int(np.count_nonzero(scores > -np.inf)))
+            if not size:
+                self._similar_cache[key] = []
+                return []
+            best = np.argpartition(-scores, size - 1)[:size]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            slots = best if candidates is None else candidates[best]
+            neighbours = [(self._ids[i], float(scores[j])) for i, j in zip(slots, best)]
+            self._similar_cache[key] = neighbours
+            return neighbours
+
+    def facet_counts(
+        self, filters: dict[str, Optional[str]], owner_id: Optional[str] = None
+    ) -> tuple[int, dict[str, dict[str, int]]]:
+        """
+        Number of exercises matching every filter (facet -> value, None for
+        any) and, per facet, the counts of its values under the filters on
+        the other facets.
+        """
+        with self._lock:
+            if owner_id is None:
+                cube = self._cube
+            else:
+                cube = self._owner_cubes.get(self._owner_codes.get(owner_id, -1))
+                if cube is None:
+                    cube = np.zeros(_CUBE_SHAPE, dtype=np.int64)
+            # Slices rather than integers keep every axis of the cube
+            selection = [
+                slice(None) if filters.get(field) is None
+                else slice(values.index(filters[field]) + 1, values.index(filters[field]) + 2)
+                for field, values in FACETS.items()
+            ]
+            count = int(cube[tuple(selection)].sum())
+            counts = {}
+            for axis, (field, values) in enumerate(FACETS.items()):
+                others = tuple(slice(None) if i == axis else part for i, part in enumerate(selection))
+                per_value = cube[others].sum(axis=tuple(i for i in range(len(FACETS)) if i != axis))
+                counts[field] = {value: int(per_value[i + 1]) for i, value in enumerate(values)}
+            return count, counts
+
+    def refresh(self, session: Any) -> int:
+        """Re-index exercises written since the newest ``updated_at`` seen."""
+        query = session.collection("exercises").where(UPDATED_AT_FIELD, ">=", self.watermark)
+        changed = 0
+        for doc in query.stream():
+            self.upsert(doc.id, doc.to_dict() or {})
+            changed += 1
+        return changed
+
+
+exercise_index = ExerciseIndex()
+
+
+def build_exercise_index(session: Any) -> None:
+    """Index every exercise of the collection."""
+    exercise_index.build(
+        (doc.id, doc.to_dict() or {}) for doc in session.collection("exercises").stream()
+    )
+    logger.info("Exercise search index built", extra={"exercises": len(exercise_index)})
+
+
+def ensure_exercise_index(session: Any) -> ExerciseIndex:
+    """The index, built first if the app started without a database client."""
+    if not exercise_index.built:
+        build_exercise_index(session)
+    return exercise_index
+
+
+class IndexRefresher:
+    """Background thread calling ``refresh`` every ``interval`` seconds."""
+
+    def __init__(self, session: Any, interval: float, index: ExerciseIndex = exercise_index) -> None:
+        self.session = session
+        self.interval = interval
+        self.index = index
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="exercise-index-refresher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.index.refresh(self.session)
+            except Exception:
+                logger.exception("Exercise search index refresh failed")
@@ -0,0 +1,89 @@
+"""
+Exercise summaries embedded in activity documents.
+
+Activities keep, next to their ``exercises`` id list, a map
+``exercise_summaries: {exercise_id: {title, category, ...}}`` so that lists
+of activities render without reading the exercises. The map is written
+whenever an activity's exercises change, and ``update_exercise`` fans a new
+summary out to every activity containing the exercise, listed by its
+``exercise_refs`` document (see app.utils.exercise_refs) or, when that list
+is missing or truncated, found through the array-membership index on
+``activities.exercises``.
+"""
+from typing import Any, Iterable, Optional
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.utils.documents import BatchWriter, get_documents
+from app.utils.exercise_refs import exercise_refs
+from app.utils.query_cache import collection_written
+
+
+SUMMARIES_FIELD = "exercise_summaries"
+SUMMARY_FIELDS = ("title", "category", "muscle_group", "sets", "reps", "image_url")
+
+
+def exercise_summary(exercise: dict) -> dict[str, Any]:
+    return {field: exercise.get(field) for field in SUMMARY_FIELDS}
+
+
+def summary_field(exercise_id: str) -> str:
+    return FieldPath(SUMMARIES_FIELD, exercise_id).to_api_repr()
+
+
+def summaries_for(
+    session: Any, exercise_ids: Iterable[str], known: Optional[dict[str, dict]] = None
+) -> dict[str, dict]:
+    """
+    Summaries of the given exercises, reusing ``known`` ones and fetching the
+    others with one batched read. Missing exercises are left out.
+    """
+    known = known or {}
+    exercise_ids = list(dict.fromkeys(exercise_ids))
+    fetched = get_documents(session, "exercises", [i for i in exercise_ids if i not in known])
+    return {
+        exercise_id: known[exercise_id] if exercise_id in known else exercise_summary(fetched[exercise_id])
+        for exercise_id in exercise_ids
+        if exercise_id in known or exercise_id in fetched
+    }
+
+
+def summary_changed(update: dict) -> bool:
+    return any(field in update for field in SUMMARY_FIELDS)
+
+
+def fan_out_summary(session: Any, exercise_id: str, summary: dict[str, Any]) -> int:
+    """Write ``summary`` into every activity containing the exercise."""
+    activities = session.collection("activities")
+    refs = exercise_refs(session, exercise_id)
+    if refs and refs["activity_ids_complete"]:
+        references = [activities.document(activity_id) for activity_id in refs["activity_ids"]]
+    else:
+        query = activities.where("exercises", "array_contains", exercise_id)
+        references = (doc.reference for doc in query.stream())
+    update = {summary_field(exercise_id): summary}
+    batch = BatchWriter(session)
+    for reference in references:
+        batch.update(reference, update)
+    written = batch.commit()
+    if written:
+        collection_written(session, "activities")
+    return written
+
+
+def day_exercises(activities: Iterable[dict]) -> tuple[list[dict], list[str]]:
+    """
+    Embedded summaries (with their ``id``) of every exercise of some
+    activities, once each, and the ids of exercises without a summary.
+    """
+    exercises, missing = {}, []
+    for activity in activities:
+        summaries = activity.get(SUMMARIES_FIELD) or {}
+        for exercise_id in activity.get("exercises") or []:
+            if exercise_id in exercises or exercise_id in missing:
+                continue
+            if exercise_id in summaries:
+                exercises[exercise_id] = {"id": exercise_id, **summaries[exercise_id]}
+            else:
+                missing.append(exercise_id)
+    return list(exercises.values()), missing
@@ -0,0 +1,161 @@
+"""
+Progress analytics over a user's ``exercises[].performance`` maps.
+
+Each exercise's map is turned once into two NumPy arrays (days and values,
+sorted by day); personal best, rolling average, weekly means and their
+week-over-week deltas, trend slope and volume are then array operations.
+
+Results, and the sorted series served to charts, are cached per user and
+keyed by the document's
+``performance_version``, which every write touching performance values
+increments, so a cached result is served until the next such write.
+"""
+import threading
+from typing import Any, Optional
+
+import numpy as np
+from cachetools import TTLCache
+from google.cloud.firestore import Increment
+
+from app.config import settings
+from app.metrics import record_cache
+from app.utils.assignments import parse_assignment_date
+
+
+PERFORMANCE_VERSION_FIELD = "performance_version"
+
+# Days since the epoch (a Thursday) shifted so that weeks start on Monday
+_MONDAY_OFFSET = 3
+
+
+def performance_written() -> dict[str, Any]:
+    """``update()`` entries to add to any write that changes performance values."""
+    return {PERFORMANCE_VERSION_FIELD: Increment(1)}
+
+
+def performance_series(performance: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Days (``datetime64[D]``) and values of a performance map, sorted by day.
+    Unparseable dates and non-numeric values are left out.
+    """
+    days, values = [], []
+    for date, value in (performance or {}).items():
+        parsed = parse_assignment_date(date)
+        if parsed is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        days.append(parsed.date())
+        values.append(value)
+    days_array = np.array(days, dtype="datetime64[D]")
+    values_array = np.array(values, dtype=np.float64)
+    order = np.argsort(days_array, kind="stable")
+    return days_array[order], values_array[order]
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last ``window`` values at each point (fewer at the start)."""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    return (sums[end] - sums[start]) / (end - start)
+
+
+def weekly_means(days: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Monday of each week with data and the mean value of that week."""
+    weeks = (days.astype(np.int64) + _MONDAY_OFFSET) // 7
+    unique_weeks, starts = np.unique(weeks, return_index=True)
+    counts = np.diff(np.append(starts, len(values)))
+    means = np.add.reduceat(values, starts) / counts
+    mondays = (unique_weeks * 7 - _MONDAY_OFFSET).astype("datetime64[D]")
+    return mondays, means
+
+
+def trend_slope(days: np.ndarray, values: np.ndarray) -> Optional[float]:
+    """Least-squares slope in value per day, None without two distinct days."""
+    x = (days - days[0]).astype(np.float64)
+    x_centered = x - x.mean()
+    variance = np.dot(x_centered, x_centered)
+    if variance == 0:
+        return None
+    return float(np.dot(x_centered, values - values.mean()) / variance)
+
+
+def exercise_progress(
+    exercise_id: str,
+    performance: dict,
+    exercise: Optional[dict],
+    window: int,
+) -> Optional[dict[str, Any]]:
+    """Analytics of one exercise, None if it has no usable data point."""
+    days, values = performance_series(performance)
+    if len(values) == 0:
+        return None
+    exercise = exercise or {}
+    best = int(np.argmax(values))
+    mondays, means = weekly_means(days, values)
+    deltas = np.diff(means)
+    # Volume counts missing reps/sets as 1
+    per_entry = (exercise.get("reps") or 1) * (exercise.get("sets") or 1)
+    return {
+        "exercise_id": exercise_id,
+        "title": exercise.get("title"),
+        "data_points": int(len(values)),
+        "first_date": str(days[0]),
+        "last_date": str(days[-1]),
+        "latest": float(values[-1]),
+        "personal_best": float(values[best]),
+        "personal_best_date": str(days[best]),
+        "rolling_average": float(rolling_mean(values, window)[-1]),
+        "trend_per_day": trend_slope(days, values),
+        "total_volume": float(values.sum() * per_entry),
+        "weekly": [
+            {
+                "week_start": str(monday),
+                "average": float(mean),
+                "delta": float(deltas[i - 1]) if i else None,
+            }
+            for i, (monday, mean) in enumerate(zip(mondays, means))
+        ],
+    }
+
+
+_cache: TTLCache = TTLCache(maxsize=settings.PROGRESS_CACHE_SIZE, ttl=settings.PROGRESS_CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+
+
+def cached_progress(key: tuple) -> Optional[Any]:
+    with _cache_lock:
+        return _cache.get(key)
+
+
+def cache_progress(key: tuple, progress: Any) -> None:
+    with _cache_lock:
+        _cache[key] = progress
+
+
+def clear_progress_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def exercise_series(user_id: str, user_data: dict, exercise_id: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """
+    Sorted series of one exercise of a user document, None if the user has
+    no such exercise. A map is parsed and sorted once per performance version.
+    """
+    key = ("series", user_id, user_data.get(PERFORMANCE_VERSION_FIELD, 0), exercise_id)
+    series = cached_progress(key)
+    record_cache("chart_series", series is not None)
+    if series is None:
+        performance = next(
+            (
+                exercise.get("performance") or {}
+                for exercise in user_data.get("exercises", [])
+                if isinstance(exercise, dict) and exercise.get("id") == exercise_id
+            ),
+            None,
+        )
+        if performance is None:
+            return None
+        series = performance_series(performance)
+        cache_progress(key, series)
+    return series
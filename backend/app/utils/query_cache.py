@@ -0,0 +1,77 @@
+"""
+Result cache for list queries, stamped with collection versions.
+
+Every collection served by a list endpoint has a counter in
+``collection_versions/{collection}`` that each write path to the collection
+increments after (or together with) its write. A list request reads the
+counter, one document read in place of the page and count queries, and
+serves a result cached under the same (collection, version, filters,
+cursor, limit, viewer role) key; any write makes the next request of every
+worker miss. Collections whose counter was never written are not cached.
+The counter is a single document, fine for the write rates of these
+collections but not for ones written many times per second.
+"""
+import threading
+from typing import Any, Callable, Optional, TypeVar
+
+from cachetools import TTLCache
+from google.cloud.firestore import Increment
+
+from app.config import settings
+from app.metrics import record_cache
+
+
+VERSIONS_COLLECTION = "collection_versions"
+
+T = TypeVar("T")
+
+_cache: TTLCache = TTLCache(maxsize=settings.QUERY_CACHE_SIZE, ttl=settings.QUERY_CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+
+
+def collection_written(session: Any, collection: str, writer: Any = None) -> None:
+    """
+    Bump the version of a collection, directly or as part of the batch or
+    transaction ``writer``.
+    """
+    reference = session.collection(VERSIONS_COLLECTION).document(collection)
+    if writer is None:
+        reference.set({"version": Increment(1)}, merge=True)
+    else:
+        writer.set(reference, {"version": Increment(1)}, merge=True)
+
+
+def collection_version(session: Any, collection: str) -> Optional[int]:
+    snapshot = session.collection(VERSIONS_COLLECTION).document(collection).get()
+    return (snapshot.to_dict() or {}).get("version") if snapshot.exists else None
+
+
+def viewer_role(current_user: Any) -> str:
+    if current_user.is_superuser:
+        return "superuser"
+    return getattr(current_user, "role", None) or "user"
+
+
+def cached_query(session: Any, collection: str, key: tuple, run: Callable[[], T]) -> T:
+    """
+    Result of ``run`` for the list query identified by ``key`` (filters,
+    cursor, limit and viewer role), from the cache while ``collection`` is
+    unchanged.
+    """
+    version = collection_version(session, collection)
+    if version is None:
+        return run()
+    cache_key = (collection, version, *key)
+    with _cache_lock:
+        result = _cache.get(cache_key)
+    record_cache(f"{collection}_list", result is not None)
+    if result is None:
+        result = run()
+        with _cache_lock:
+            _cache[cache_key] = result
+    return result
+
+
+def clear_query_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,112 @@
+"""
+Recurring activity schedules, expanded at read time.
+
+A schedule repeats one activity on some weekdays between two dates. It is
+stored once in the user document's ``schedules`` map instead of one
+``activities`` entry per occurrence:
+
+    {"activity_id": ..., "weekdays": [0, 2, 4], "start": "2025-01-06",
+     "end": "2025-03-30", "cancelled": ["2025-01-20"]}
+
+Occurrences are computed when a day or range is read. An occurrence becomes
+a regular assignment (``activities`` list and date index) only when the user
+logs performance for that day or moves it to another day; cancelling one
+just records its date in ``cancelled``.
+"""
+from datetime import date, timedelta
+from typing import Any, Optional
+
+from google.cloud.firestore import ArrayUnion
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.utils.assignments import (
+    ASSIGNMENT_DATE_FORMAT,
+    add_to_index,
+    assignment_index,
+    find_assignment,
+    index_updates,
+    parse_assignment_date,
+)
+
+
+SCHEDULES_FIELD = "schedules"
+
+
+def schedules_of(user_data: dict) -> dict[str, dict]:
+    schedules = user_data.get(SCHEDULES_FIELD)
+    return schedules if isinstance(schedules, dict) else {}
+
+
+def occurs_on(schedule: dict, day: date) -> bool:
+    iso = day.isoformat()
+    return (
+        schedule["start"] <= iso <= schedule["end"]
+        and day.weekday() in schedule["weekdays"]
+        and iso not in schedule.get("cancelled", [])
+    )
+
+
+def scheduled_on(user_data: dict, day: date) -> list[dict]:
+    """Virtual ``activities`` entries the user's schedules put on ``day``."""
+    return [
+        {"id": schedule["activity_id"], "date": day.strftime(ASSIGNMENT_DATE_FORMAT), "schedule_id": schedule_id}
+        for schedule_id, schedule in schedules_of(user_data).items()
+        if occurs_on(schedule, day)
+    ]
+
+
+def scheduled_occurrence(user_data: dict, date_str: str, activity_id: str) -> Optional[dict]:
+    parsed = parse_assignment_date(date_str)
+    if not parsed:
+        return None
+    for occurrence in scheduled_on(user_data, parsed.date()):
+        if occurrence["id"] == activity_id:
+            return occurrence
+    return None
+
+
+def merge_day(assigned: list[dict], scheduled: list[dict]) -> list[dict]:
+    """Assignments of one day; a schedule never repeats an assigned activity."""
+    ids = {assignment["id"] for assignment in assigned}
+    return list(assigned) + [occurrence for occurrence in scheduled if occurrence["id"] not in ids]
+
+
+def materialize_updates(user_data: dict, *dates: str) -> tuple[dict[str, Any], list[dict]]:
+    """
+    ``update()`` payload turning the occurrences scheduled on ``dates`` into
+    regular assignments (``{}`` if there are none left to materialize), and
+    the ``activities`` entries it adds.
+    """
+    index = assignment_index(user_data)
+    new_assignments = []
+    for date_str in dates:
+        parsed = parse_assignment_date(date_str)
+        if not parsed:
+            continue
+        for occurrence in scheduled_on(user_data, parsed.date()):
+            if not find_assignment(index, occurrence["date"], occurrence["id"]):
+                assignment = {"id": occurrence["id"], "date": occurrence["date"]}
+                add_to_index(index, assignment)
+                new_assignments.append(assignment)
+    if not new_assignments:
+        return {}, []
+    return {
+        "activities": ArrayUnion(new_assignments),
+        **index_updates(user_data, index, *(assignment["date"] for assignment in new_assignments)),
+    }, new_assignments
+
+
+def cancel_update(schedule_id: str, day: date) -> dict[str, Any]:
+    """``update()`` payload cancelling one occurrence of a schedule."""
+    path = FieldPath(SCHEDULES_FIELD, schedule_id, "cancelled").to_api_repr()
+    return {path: ArrayUnion([day.isoformat()])}
+
+
+def schedule_field(schedule_id: str) -> str:
+    return FieldPath(SCHEDULES_FIELD, schedule_id).to_api_repr()
+
+
+def occurrence_count(schedule: dict) -> int:
+    start, end = date.fromisoformat(schedule["start"]), date.fromisoformat(schedule["end"])
+    days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+    return sum(1 for day in days if occurs_on(schedule, day))
@@ -0,0 +1,155 @@
+"""
+Training load per client: acute:chronic workload ratio (ACWR) and Foster's
+monotony and strain.
+
+The load of a logged entry is its performance value times the exercise's
+reps and sets (missing ones count as 1), as the volume in progress
+analytics. Only entries on the user's ``logged_days`` count: assigning an
+activity seeds values on its date, and a skipped session carries no load.
+Entries of all users are collected as flat columns (user row, day column,
+load) and summed into one users x days matrix with a single ``bincount``.
+The exponentially weighted acute and chronic loads of every user are then
+two matrix-vector products, and monotony and strain are row-wise
+reductions over the last seven days.
+"""
+from datetime import date, timedelta
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from app.utils.assignments import parse_assignment_date
+from app.utils.user_stats import LOGGED_DAYS_FIELD
+
+
+TRAINING_LOAD_COLLECTION = "training_load"
+
+# Days of history in the matrix; long enough for the chronic average to
+# forget the zeros before the first day
+WINDOW_DAYS = 56
+# Spans of the exponentially weighted averages, lambda = 2 / (span + 1)
+# (Williams et al., 2017)
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+# ACWR above 1.5 comes with a steep rise in injury risk and below 0.8 with
+# undertraining (Gabbett, 2016); monotony above 2 with overtraining (Foster, 1998)
+ACWR_HIGH = 1.5
+ACWR_ELEVATED = 1.3
+ACWR_LOW = 0.8
+MONOTONY_HIGH = 2.0
+
+RISK_ORDER = {"high": 0, "elevated": 1, "low": 2, "optimal": 3, None: 4}
+
+
+def ewma_weights(span: int, window: int = WINDOW_DAYS) -> np.ndarray:
+    """Weight of each day of the window (oldest first) in the last EWMA value."""
+    smoothing = 2 / (span + 1)
+    return smoothing * (1 - smoothing) ** np.arange(window - 1, -1, -1)
+
+
+class LoadColumns:
+    """Daily loads of many users, appended entry by entry."""
+
+    def __init__(self, today: date, window: int = WINDOW_DAYS) -> None:
+        self.first_day = today - timedelta(days=window - 1)
+        self.window = window
+        self.user_ids: list[str] = []
+        self._rows: list[int] = []
+        self._days: list[int] = []
+        self._loads: list[float] = []
+        # Performance dates repeat across users; parse each string once
+        self._day_of: dict[str, Optional[int]] = {}
+
+    def _day(self, date_str: str) -> Optional[int]:
+        if date_str not in self._day_of:
+            parsed = parse_assignment_date(date_str)
+            offset = (parsed.date() - self.first_day).days if parsed else -1
+            self._day_of[date_str] = offset if 0 <= offset < self.window else None
+        return self._day_of[date_str]
+
+    def add_user(self, user_id: str, user_data: dict, multipliers: dict[str, float]) -> None:
+        row = len(self.user_ids)
+        self.user_ids.append(user_id)
+        logged = {self._day(day) for day in user_data.get(LOGGED_DAYS_FIELD) or []}
+        logged.discard(None)
+        if not logged:
+            return
+        for exercise in user_data.get("exercises", []):
+            if not isinstance(exercise, dict):
+                continue
+            multiplier = multipliers.get(exercise.get("id"), 1.0)
+            for date_str, value in (exercise.get("performance") or {}).items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                day = self._day(date_str)
+                if day in logged:
+                    self._rows.append(row)
+                    self._days.append(day)
+                    self._loads.append(value * multiplier)
+
+    def matrix(self) -> np.ndarray:
+        """Users x days matrix of summed loads, oldest day first."""
+        flat = np.array(self._rows, dtype=np.int64) * self.window + np.array(self._days, dtype=np.int64)
+        sums = np.bincount(
+            flat, weights=np.array(self._loads, dtype=np.float64),
+            minlength=len(self.user_ids) * self.window,
+        )
+        return sums.reshape(len(self.user_ids), self.window)
+
+
+def exercise_multipliers(exercises: Iterable[tuple[str, dict]]) -> dict[str, float]:
+    """Reps times sets of each exercise, for the exercises that set either."""
+    return {
+        exercise_id: float((data.get("reps") or 1) * (data.get("sets") or 1))
+        for exercise_id, data in exercises
+        if data.get("reps") or data.get("sets")
+    }
+
+
+def training_load(loads: np.ndarray) -> dict[str, np.ndarray]:
+    """Acute and chronic loads, ACWR, weekly load, monotony and strain per row."""
+    window = loads.shape[1]
+    acute = loads @ ewma_weights(ACUTE_DAYS, window)
+    chronic = loads @ ewma_weights(CHRONIC_DAYS, window)
+    week = loads[:, -7:]
+    weekly = week.sum(axis=1)
+    deviation = week.std(axis=1)
+    acwr = np.full(len(loads), np.nan)
+    np.divide(acute, chronic, out=acwr, where=chronic > 0)
+    monotony = np.full(len(loads), np.nan)
+    np.divide(weekly / 7, deviation, out=monotony, where=deviation > 0)
+    return {
+        "acute_load": acute,
+        "chronic_load": chronic,
+        "acwr": acwr,
+        "weekly_load": weekly,
+        "monotony": monotony,
+        "strain": weekly * monotony,
+    }
+
+
+def risk_level(acwr: Optional[float], monotony: Optional[float]) -> Optional[str]:
+    if acwr is None:
+        return None
+    if acwr > ACWR_HIGH:
+        return "high"
+    if acwr > ACWR_ELEVATED or (monotony is not None and monotony > MONOTONY_HIGH):
+        return "elevated"
+    if acwr < ACWR_LOW:
+        return "low"
+    return "optimal"
+
+
+def load_documents(columns: LoadColumns, today: date) -> Iterable[tuple[str, dict[str, Any]]]:
+    """``(user id, training_load document)`` of every user of ``columns``."""
+    metrics = training_load(columns.matrix())
+    for row, user_id in enumerate(columns.user_ids):
+        values = {
+            name: None if np.isnan(array[row]) else round(float(array[row]), 3)
+            for name, array in metrics.items()
+        }
+        yield user_id, {
+            "user_id": user_id,
+            "as_of": today.isoformat(),
+            **values,
+            "risk": risk_level(values["acwr"], values["monotony"]),
+        }
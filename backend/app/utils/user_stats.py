@@ -0,0 +1,373 @@
+"""
+Materialized per-user statistics in ``user_stats/{user_id}``.
+
+The document summarises what the dashboard used to derive from the whole
+user document on every view:
+
+    {"user_id": ..., "sessions": 12, "entries": 96, "workout_days": 10,
+     "days": {"2025-01-06": 8, ...}, "last_workout_date": "2025-03-03",
+     "current_streak": 2, "longest_streak": 4,
+     "personal_records": {"<exercise id>": {"value": 80.0, "date": "2025-02-10"}},
+     "planned": {"2025-01-06": ["<activity id>"], ...},
+     "logged": {"2025-01-06": True, ...}, "schedules": {...},
+     "trainer_ids": [...], "full_name": ..., "email": ...}
+
+``sessions`` counts activity assignments and ``entries`` performance
+values. Assigning an activity seeds placeholder values on its date, so only
+days the user logged performance on count as workouts: ``logged`` mirrors
+``logged_days`` of the user document, ``days`` holds the entries per logged
+day (a workout day is one with at least one entry) and the streaks are runs
+of consecutive workout days, the current one ending on
+``last_workout_date``. ``planned`` mirrors the assignments by day and
+``schedules`` the user's schedules, so the trainer roster can tell planned
+from completed sessions. ``trainer_ids`` is the trainer-to-client
+membership index the roster queries.
+
+Endpoints that change assignments or performance values describe the
+change as ``(exercise_id, date, old, new)`` tuples and apply it with
+``apply_changes``, writing the stats in the same batch or transaction as
+the user document: counters, the day map and records move in constant time;
+only removing a record entry or a whole workout day rescans (that exercise's
+values, or the day map). A missing document is built from the user document
+instead, and ``python -m app.rebuild_user_stats`` rebuilds them all.
+"""
+from datetime import date, timedelta
+from typing import Any, Iterable, Optional
+
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+
+from app.utils.assignments import canonical_date, parse_assignment_date
+from app.utils.schedules import SCHEDULES_FIELD, occurs_on, schedules_of
+
+
+STATS_COLLECTION = "user_stats"
+# Days the user logged performance on, as ISO dates
+LOGGED_DAYS_FIELD = "logged_days"
+
+# (exercise_id, date as stored, old value or None, new value or None)
+Change = tuple[str, str, Any, Any]
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _day(date_str: str) -> Optional[date]:
+    parsed = parse_assignment_date(date_str)
+    return parsed.date() if parsed else None
+
+
+def performance_snapshot(exercises: list, exercise_ids: Iterable[str], dates: Iterable[str]) -> dict[tuple[str, str], Any]:
+    """Current values of ``exercise_ids`` on ``dates``, to diff against after a write."""
+    ids, dates = set(exercise_ids), list(dates)
+    snapshot = {}
+    for exercise in exercises:
+        if isinstance(exercise, dict) and exercise.get("id") in ids:
+            performance = exercise.get("performance") or {}
+            for date_str in dates:
+                if date_str in performance:
+                    snapshot[(exercise["id"], date_str)] = performance[date_str]
+    return snapshot
+
+
+def performance_changes(
+    before: dict[tuple[str, str], Any], exercises: list, exercise_ids: Iterable[str], dates: Iterable[str]
+) -> list[Change]:
+    after = performance_snapshot(exercises, exercise_ids, dates)
+    changes = []
+    for key in before.keys() | after.keys():
+        if before.get(key) != after.get(key):
+            exercise_id, date_str = key
+            changes.append((exercise_id, date_str, before.get(key), after.get(key)))
+    return changes
+
+
+def empty_stats(user_id: str) -> dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "sessions": 0,
+        "entries": 0,
+        "workout_days": 0,
+        "days": {},
+        "last_workout_date": None,
+        "current_streak": 0,
+        "longest_streak": 0,
+        "personal_records": {},
+        "planned": {},
+        "logged": {},
+        SCHEDULES_FIELD: {},
+        "trainer_ids": [],
+        "full_name": None,
+        "email": None,
+    }
+
+
+def logged_updates(*dates: str) -> dict[str, Any]:
+    """User document ``update()`` entries recording the days performance was logged on."""
+    days = sorted({parsed.date().isoformat() for parsed in map(parse_assignment_date, dates) if parsed})
+    return {LOGGED_DAYS_FIELD: firestore.ArrayUnion(days)} if days else {}
+
+
+def is_complete(stats: dict) -> bool:
+    """False for documents missing fields (older or partial), to be rebuilt."""
+    return set(empty_stats("")) <= set(stats)
+
+
+def _run_length(days: dict[str, int], day: date, step: int) -> int:
+    length = 0
+    while (day + timedelta(days=step * (length + 1))).isoformat() in days:
+        length += 1
+    return length
+
+
+def _add_day(stats: dict, day: date) -> None:
+    """A day got its first entry: extend the streaks around it."""
+    days = stats["days"]
+    before, after = _run_length(days, day, -1), _run_length(days, day, 1)
+    run = before + 1 + after
+    stats["longest_streak"] = max(stats["longest_streak"], run)
+    last = stats["last_workout_date"]
+    if last is None or day.isoformat() > last:
+        stats["last_workout_date"] = day.isoformat()
+    if (day + timedelta(days=after)).isoformat() == stats["last_workout_date"]:
+        stats["current_streak"] = run
+
+
+def _entries_on(exercises: list, key: str) -> int:
+    """Performance values of all exercises on the ISO date ``key``."""
+    return sum(
+        1
+        for exercise in exercises
+        if isinstance(exercise, dict)
+        for date_str in exercise.get("performance") or {}
+        if canonical_date(date_str) == key
+    )
+
+
+def recompute_streaks(stats: dict) -> None:
+    days = sorted(date.fromisoformat(day) for day in stats["days"])
+    longest = run = 0
+    for i, day in enumerate(days):
+        run = run + 1 if i and day - days[i - 1] == timedelta(days=1) else 1
+        longest = max(longest, run)
+    stats["workout_days"] = len(days)
+    stats["last_workout_date"] = days[-1].isoformat() if days else None
+    stats["current_streak"] = run
+    stats["longest_streak"] = longest
+
+
+def _record_of(exercises: list, exercise_id: str) -> Optional[dict[str, Any]]:
+    """Highest value of one exercise, on its earliest date."""
+    record = None
+    for exercise in exercises:
+        if isinstance(exercise, dict) and exercise.get("id") == exercise_id:
+            for date_str, value in (exercise.get("performance") or {}).items():
+                value = _number(value)
+                key = canonical_date(date_str)
+                if value is not None and (
+                    record is None
+                    or value > record["value"]
+                    or (value == record["value"] and key < record["date"])
+                ):
+                    record = {"value": value, "date": key}
+    return record
+
+
+def apply_changes(
+    stats: dict,
+    changes: Iterable[Change],
+    exercises: list,
+    assigned: Iterable[dict] = (),
+    unassigned: Iterable[dict] = (),
+    logged: Iterable[str] = (),
+) -> dict:
+    """
+    Apply assignment and performance deltas to a stats document, in place.
+    ``exercises`` is the user's exercises list after the change, ``assigned``
+    and ``unassigned`` are ``activities`` entries and ``logged`` dates the
+    user logged performance on.
+    """
+    planned = stats["planned"]
+    for assignment in assigned:
+        activity_ids = planned.setdefault(canonical_date(assignment["date"]), [])
+        if assignment["id"] not in activity_ids:
+            activity_ids.append(assignment["id"])
+            stats["sessions"] += 1
+    for assignment in unassigned:
+        key = canonical_date(assignment["date"])
+        if assignment["id"] in planned.get(key, []):
+            planned[key].remove(assignment["id"])
+            stats["sessions"] -= 1
+            if not planned[key]:
+                del planned[key]
+    newly_logged = set()
+    for date_str in logged:
+        key = canonical_date(date_str)
+        if _day(date_str) is not None and key not in stats["logged"]:
+            stats["logged"][key] = True
+            newly_logged.add(key)
+
+    records = stats["personal_records"]
+    days = stats["days"]
+    for exercise_id, date_str, old, new in changes:
+        day = _day(date_str)
+        key = canonical_date(date_str)
+        # Newly logged days are counted from ``exercises`` below
+        if key not in stats["logged"] or key in newly_logged:
+            day = None
+        if old is None and new is not None:
+            stats["entries"] += 1
+            if day is not None:
+                days[key] = days.get(key, 0) + 1
+                if days[key] == 1:
+                    stats["workout_days"] += 1
+                    _add_day(stats, day)
+        elif old is not None and new is None:
+            stats["entries"] -= 1
+            if day is not None and key in days:
+                days[key] -= 1
+                if days[key] <= 0:
+                    del days[key]
+                    recompute_streaks(stats)
+
+        record = records.get(exercise_id)
+        old_value, new_value = _number(old), _number(new)
+        if record and old_value == record["value"] and key == record["date"] and (
+            new_value is None or new_value < old_value
+        ):
+            # The record entry went down or away: look at the other values
+            record = _record_of(exercises, exercise_id)
+        elif new_value is not None and (
+            record is None
+            or new_value > record["value"]
+            or (new_value == record["value"] and key < record["date"])
+        ):
+            record = {"value": new_value, "date": key}
+        if record is None:
+            records.pop(exercise_id, None)
+        else:
+            records[exercise_id] = record
+
+    for key in sorted(newly_logged):
+        entries = _entries_on(exercises, key)
+        if entries:
+            days[key] = entries
+            stats["workout_days"] += 1
+            _add_day(stats, date.fromisoformat(key))
+    return stats
+
+
+def build_stats(user_id: str, user_data: dict) -> dict[str, Any]:
+    """Stats computed from the raw user document."""
+    stats = empty_stats(user_id)
+    stats["full_name"] = user_data.get("full_name")
+    stats["email"] = user_data.get("email")
+    stats["trainer_ids"] = list(user_data.get("trainer_ids") or [])
+    stats[SCHEDULES_FIELD] = schedules_of(user_data)
+    apply_changes(
+        stats, [], [],
+        assigned=[a for a in user_data.get("activities") or [] if isinstance(a, dict) and a.get("id")],
+        logged=user_data.get(LOGGED_DAYS_FIELD) or [],
+    )
+    exercises = user_data.get("exercises") or []
+    for exercise in exercises:
+        if not isinstance(exercise, dict) or not exercise.get("id"):
+            continue
+        performance = exercise.get("performance") or {}
+        stats["entries"] += len(performance)
+        for date_str in performance:
+            key = canonical_date(date_str)
+            if _day(date_str) is not None and key in stats["logged"]:
+                stats["days"][key] = stats["days"].get(key, 0) + 1
+        record = _record_of([exercise], exercise["id"])
+        if record:
+            stats["personal_records"][exercise["id"]] = record
+    recompute_streaks(stats)
+    return stats
+
+
+def read_stats(session: Any, user_id: str, user_data: dict, transaction: Any = None) -> tuple[Any, dict]:
+    """
+    Reference and current stats of a user, read (in ``transaction`` if
+    given) so that a write applies its deltas with ``apply_changes`` and sets
+    the result in the same batch or transaction as the user document. A
+    missing or incomplete document is built from ``user_data``, the user
+    document before the write, so read the stats before changing it.
+    """
+    stats_ref = session.collection(STATS_COLLECTION).document(user_id)
+    snapshot = next(transaction.get(stats_ref)) if transaction is not None else stats_ref.get()
+    stats = snapshot.to_dict() if snapshot.exists else None
+    if stats is None or not is_complete(stats):
+        stats = build_stats(user_id, user_data)
+    return stats_ref, stats
+
+
+def mirror_updates(
+    session: Any, user_id: str, updates: dict[str, Any], collection: str = STATS_COLLECTION
+) -> None:
+    """
+    Apply user document field updates (membership, profile, schedules) to
+    the stats document too, or to another per-user document copying user
+    fields. Without such a document there is nothing to do: it is built
+    from the user document when first needed.
+    """
+    try:
+        session.collection(collection).document(user_id).update(updates)
+    except NotFound:
+        pass
+
+
+def planned_on(stats: dict, day: date) -> set[str]:
+    """Activities assigned or scheduled on ``day``."""
+    activity_ids = set(stats["planned"].get(day.isoformat(), []))
+    activity_ids.update(
+        schedule["activity_id"]
+        for schedule in stats[SCHEDULES_FIELD].values()
+        if occurs_on(schedule, day)
+    )
+    return activity_ids
+
+
+def client_summary(stats: dict, today: date, recent_records: int = 3) -> dict[str, Any]:
+    """Roster entry of one client: this week and the last four weeks."""
+    monday = today - timedelta(days=today.weekday())
+    week = [monday + timedelta(days=i) for i in range(7)]
+    last_weeks = [today - timedelta(days=i) for i in range(28)]
+
+    def sessions(days: list[date], completed: bool) -> int:
+        return sum(
+            len(planned_on(stats, day))
+            for day in days
+            if not completed or day.isoformat() in stats["logged"]
+        )
+
+    logged_days = {day for day in stats["logged"] if day <= today.isoformat()}
+    last_session = max(logged_days, default=None)
+    # Consecutive logged days ending on the last one, like current_streak
+    # but without days logged ahead of today
+    streak = 1 + _run_length(logged_days, date.fromisoformat(last_session), -1) if last_session else 0
+    # Records dated after today come from sessions planned ahead
+    records = sorted(
+        (
+            {"exercise_id": exercise_id, **record}
+            for exercise_id, record in stats["personal_records"].items()
+            if record["date"] <= today.isoformat()
+        ),
+        key=lambda record: record["date"],
+        reverse=True,
+    )
+    return {
+        "user_id": stats["user_id"],
+        "full_name": stats["full_name"],
+        "email": stats["email"],
+        "last_session_date": last_session,
+        "sessions_this_week": sessions(week, completed=False),
+        "completed_this_week": sessions(week, completed=True),
+        "planned_last_4_weeks": sessions(last_weeks, completed=False),
+        "completed_last_4_weeks": sessions(last_weeks, completed=True),
+        "current_streak": streak,
+        "recent_records": records[:recent_records],
+    }
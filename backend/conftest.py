@@ -3,4 +3,8 @@ import os
 
 # Add the backend directory to Python path
 backend_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.insert(0, backend_dir)
\ No newline at end of file
+sys.path.insert(0, backend_dir)
+
+# Run the test suite against the in-memory Firestore backend unless told
+# otherwise (FIRESTORE_BACKEND=firestore uses the configured project).
+os.environ.setdefault("FIRESTORE_BACKEND", "memory")